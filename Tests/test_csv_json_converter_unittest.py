@@ -1,10 +1,19 @@
 import unittest
+import bz2
+import contextlib
+import gzip
+import lzma
 import os
 import json
 import csv
+import io
 import tempfile
 from pathlib import Path
-from csv_json_converter.csv_to_json_converter_tool import csv_to_json, json_to_csv
+from unittest import mock
+from csv_json_converter import csv_to_json_converter_tool as converter
+from csv_json_converter.csv_to_json_converter_tool import (
+    csv_to_json, json_to_csv, main, iter_json_values, iter_json_records, load_schema,
+)
 
 class TestCSVJSONConverter(unittest.TestCase):
     def setUp(self):
@@ -33,6 +42,7 @@ class TestCSVJSONConverter(unittest.TestCase):
     def tearDown(self):
         for p in [self.csv_path, self.json_path,
                   self.csv_path.replace('.csv', '_out.json'),
+                  self.csv_path.replace('.csv', '.jsonl'),
                   self.json_path.replace('.json', '_out.csv')]:
             try:
                 os.remove(p)
@@ -47,6 +57,352 @@ class TestCSVJSONConverter(unittest.TestCase):
             data = json.load(f)
         self.assertEqual(data, self.rows)
 
+    def test_csv_to_json_matches_indented_json_dump(self):
+        out_json = self.csv_path.replace('.csv', '_out.json')
+        self.assertEqual(csv_to_json(self.csv_path, out_json), len(self.rows))
+        with open(out_json, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), json.dumps(self.rows, indent=2))
+
+    def test_compact_output_and_fast_encoders(self):
+        out_json = self.csv_path.replace('.csv', '_out.json')
+        self.assertEqual(csv_to_json(self.csv_path, out_json, compact=True), len(self.rows))
+        with open(out_json, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), json.dumps(self.rows, separators=(',', ':')))
+        self.assertIsNone(csv_to_json(self.csv_path, out_json, encoder='nope'))
+        for encoder in ('orjson', 'msgspec'):
+            if getattr(converter, encoder) is None:
+                continue
+            for compact in (False, True):
+                with self.subTest(encoder=encoder, compact=compact):
+                    csv_to_json(self.csv_path, out_json, typed=True, encoder=encoder, compact=compact)
+                    with open(out_json, 'r', encoding='utf-8') as f:
+                        fast = f.read()
+                    csv_to_json(self.csv_path, out_json, typed=True, compact=compact)
+                    with open(out_json, 'r', encoding='utf-8') as f:
+                        self.assertEqual(fast, f.read())
+
+    def test_csv_to_jsonl(self):
+        out_jsonl = self.csv_path.replace('.csv', '.jsonl')  # Output name inferred from --jsonl
+        main(['--csv-to-json', self.csv_path, '--jsonl'])
+        with open(out_jsonl, 'r', encoding='utf-8') as f:
+            data = [json.loads(line) for line in f]
+        self.assertEqual(data, self.rows)
+
+    def test_parallel_csv_to_json_matches_sequential(self):
+        # Quoted fields with embedded newlines must never be split across chunks
+        rows = [{'id': str(i), 'text': 'line one\nline "two"\n' if i % 3 else 'plain, text'} for i in range(500)]
+        with open(self.csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['id', 'text'])
+            writer.writeheader()
+            writer.writerows(rows)
+        out_json = self.csv_path.replace('.csv', '_out.json')
+        with mock.patch.object(converter, 'PARALLEL_MIN_CHUNK_BYTES', 512):
+            boundaries = converter.find_record_boundaries(self.csv_path, 4)
+            self.assertEqual(len(boundaries), 5)
+            self.assertEqual(csv_to_json(self.csv_path, out_json, workers=4), len(rows))
+        with open(out_json, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), json.dumps(rows, indent=2))
+
+    def test_mmap_fast_path_matches_text_path(self):
+        with open(self.csv_path, 'w', newline='', encoding='utf-8') as f:
+            f.write('id,name,note\r\n1,Ann,plain\r\n2,"Bo, b","two\nlines"\r\n\r\n3,Cy\r\n'
+                    + ''.join(f'{i},n{i},x\r\n' for i in range(4, 60)) + '60,Di,"crlf\r\nkept"\r\n')
+        expected = self.csv_path.replace('.csv', '.jsonl')
+        out_json = self.csv_path.replace('.csv', '_out.json')
+        csv_to_json(self.csv_path, expected, 'json')
+        with mock.patch.object(converter, 'MMAP_MIN_BYTES', 0), mock.patch.object(converter, 'MMAP_BLOCK_SIZE', 16):
+            csv_to_json(self.csv_path, out_json)
+            with open(expected, encoding='utf-8') as a, open(out_json, encoding='utf-8') as b:
+                self.assertEqual(a.read(), b.read())
+            main(['--csv-to-json', self.csv_path, out_json, '--columns', 'note,id'])
+        with open(out_json, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data[:3], [{'note': 'plain', 'id': '1'}, {'note': 'two\nlines', 'id': '2'},
+                                    {'note': None, 'id': '3'}])
+        self.assertEqual(data[-1], {'note': 'crlf\r\nkept', 'id': '60'})
+        self.assertEqual(len(data), 60)
+        self.assertIsNone(csv_to_json(self.csv_path, out_json, columns=['nope']))
+
+    def test_mmap_path_keeps_fields_past_the_header(self):
+        # Ragged rows in plain and quoted blocks: every path must match DictReader's null restkey
+        with open(self.csv_path, 'w', newline='', encoding='utf-8') as f:
+            f.write('a,b\n1,2,3\n' + ''.join(f'{i},{i}\n' for i in range(40))
+                    + '4,"5, five",6,7\n8\n' + ''.join(f'{i},{i}\n' for i in range(40)))
+        expected = self.csv_path.replace('.csv', '.jsonl')
+        out_json = self.csv_path.replace('.csv', '_out.json')
+        csv_to_json(self.csv_path, expected, 'json')
+        with open(expected, encoding='utf-8') as f:
+            text_output = f.read()
+        data = json.loads(text_output)
+        self.assertEqual(data[0], {'a': '1', 'b': '2', 'null': ['3']})
+        self.assertEqual(data[41:43], [{'a': '4', 'b': '5, five', 'null': ['6', '7']}, {'a': '8', 'b': None}])
+        with mock.patch.object(converter, 'MMAP_MIN_BYTES', 0), mock.patch.object(converter, 'MMAP_BLOCK_SIZE', 16):
+            for workers in (1, 3):
+                with self.subTest(workers=workers), mock.patch.object(converter, 'PARALLEL_MIN_CHUNK_BYTES', 64):
+                    csv_to_json(self.csv_path, out_json, workers=workers)
+                    with open(out_json, encoding='utf-8') as f:
+                        self.assertEqual(f.read(), text_output)
+            # Picking columns still ignores the extra fields
+            csv_to_json(self.csv_path, out_json, columns=['b'])
+        with open(out_json, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)[0], {'b': '2'})
+
+    def test_typed_csv_to_json(self):
+        with open(self.csv_path, 'w', newline='', encoding='utf-8') as f:
+            f.write('id,zip,price,active,joined,note\n'
+                    '1,02134,9.5,true,2024-01-02,\n'
+                    '2,10001,,False,2024-02-03,hi\n')
+        out_json = self.csv_path.replace('.csv', '_out.json')
+        csv_to_json(self.csv_path, out_json, typed=True)
+        with open(out_json, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data, [
+            {'id': 1, 'zip': '02134', 'price': 9.5, 'active': True, 'joined': '2024-01-02', 'note': ''},
+            {'id': 2, 'zip': '10001', 'price': None, 'active': False, 'joined': '2024-02-03', 'note': 'hi'},
+        ])
+        self.assertEqual(converter.cast_column(['1', 'oops', ''], 'integer'), [1, 'oops', None])
+        # Values after the sample must fit the same pattern, or stay strings
+        self.assertEqual(converter.cast_column(['7', '02134', '1_0', '+3'], 'integer'), [7, '02134', '1_0', 3])
+        self.assertEqual(converter.cast_column(['1.5', 'nan', 'inf', '1e999', ''], 'number'), [1.5, 'nan', 'inf', '1e999', None])
+
+    @unittest.skipIf(converter.pa is None, "pyarrow not installed")
+    def test_values_after_the_type_sample_are_not_altered(self):
+        with open(self.csv_path, 'w', newline='', encoding='utf-8') as f:
+            f.write('id,price,signed,joined\n'
+                    + ''.join(f'{i},{i}.5,+{i},2024-01-0{i % 9 + 1}\n' for i in range(converter.TYPE_SAMPLE_ROWS))
+                    + '02134,nan,,2024-05-06\n1_0,1e999,-4,2024-05-07\n')
+        out_json = self.csv_path.replace('.csv', '_out.json')
+        csv_to_json(self.csv_path, out_json, typed=True)
+        with open(out_json, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)[-2:], [  # Valid JSON: no NaN or Infinity
+                {'id': '02134', 'price': 'nan', 'signed': None, 'joined': '2024-05-06'},
+                {'id': '1_0', 'price': '1e999', 'signed': -4, 'joined': '2024-05-07'},
+            ])
+        with tempfile.TemporaryDirectory() as tmp:
+            parquet_path = os.path.join(tmp, 'data.parquet')
+            with mock.patch.object(converter, 'ARROW_BLOCK_SIZE', 1024):
+                self.assertEqual(converter.convert_file(self.csv_path, parquet_path), converter.TYPE_SAMPLE_ROWS + 2)
+            table = converter.pq.read_table(parquet_path)
+            self.assertEqual([str(field.type) for field in table.schema], ['string', 'string', 'int64', 'date32[day]'])
+            self.assertEqual(table.to_pylist()[-2]['id'], '02134')
+            self.assertEqual(table.column('signed').to_pylist()[:2], [0, 1])
+
+    @unittest.skipIf(converter.pa is None, "pyarrow not installed")
+    def test_columnar_round_trip(self):
+        with open(self.csv_path, 'w', newline='', encoding='utf-8') as f:
+            f.write('id,zip,price,active,note\n'
+                    '1,02134,9.5,true,"a, b"\n'
+                    '2,10001,,false,hi\n')
+        expected = [
+            {'id': 1, 'zip': '02134', 'price': 9.5, 'active': True, 'note': 'a, b'},
+            {'id': 2, 'zip': '10001', 'price': None, 'active': False, 'note': 'hi'},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            for fmt, compression in (('parquet', 'zstd'), ('feather', 'default'), ('arrow', 'none')):
+                columnar = os.path.join(tmp, f'data.{fmt}')
+                out_json = os.path.join(tmp, f'{fmt}.json')
+                self.assertEqual(converter.convert_file(self.csv_path, columnar, compression=compression), 2)
+                self.assertEqual(converter.convert_file(columnar, out_json), 2)
+                with open(out_json, 'r', encoding='utf-8') as f:
+                    self.assertEqual(json.load(f), expected)
+            preview = converter.preview_file(os.path.join(tmp, 'data.arrow'), rows=1)
+            self.assertEqual((preview['records'], preview['rows']), (expected[:1], 2))
+            # JSON in, Parquet out, CSV back via the CLI
+            main(['--convert', out_json, '--to', 'parquet'])
+            main(['--convert', os.path.join(tmp, 'arrow.parquet'), os.path.join(tmp, 'back.csv')])
+            with open(os.path.join(tmp, 'back.csv'), newline='', encoding='utf-8') as f:
+                self.assertEqual([row['zip'] for row in csv.DictReader(f)], ['02134', '10001'])
+
+    @unittest.skipIf(converter.pa is None, "pyarrow not installed")
+    def test_json_to_parquet_schema_covers_every_batch(self):
+        # 'note' is null in the whole first batch, 'extra' first appears at the start of the second
+        # and 'tag'/'user.name' in the middle of it
+        records = [{'id': i, 'note': None} for i in range(3)] + [
+            {'id': 3, 'note': 'late', 'extra': 1.5}, {'id': 4, 'tag': 'x'}, {'id': 5.5, 'user': {'name': 'Ann'}},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'data.jsonl')
+            with open(json_path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(record) + '\n' for record in records)
+            parquet_path = os.path.join(tmp, 'data.parquet')
+            with mock.patch.object(converter, 'ARROW_BATCH_ROWS', 3):
+                self.assertEqual(converter.convert_file(json_path, parquet_path), 6)
+            table = converter.pq.read_table(parquet_path)
+            self.assertEqual(str(table.schema.field('note').type), 'string')
+            self.assertEqual(table.to_pylist()[3:], [
+                {'id': 3.0, 'note': 'late', 'extra': 1.5, 'tag': None, 'user.name': None},
+                {'id': 4.0, 'note': None, 'extra': None, 'tag': 'x', 'user.name': None},
+                {'id': 5.5, 'note': None, 'extra': None, 'tag': None, 'user.name': 'Ann'},
+            ])
+            # A batch that fails after the writer opened leaves no partial file
+            good = next(converter.iter_record_batches(parquet_path, 'parquet'))
+
+            def failing_batches(path, fmt):
+                yield good
+                raise converter.pa.ArrowInvalid("bad batch")
+            partial_path = os.path.join(tmp, 'partial.arrow')
+            with mock.patch.object(converter, 'iter_record_batches', failing_batches):
+                self.assertIsNone(converter.convert_file(parquet_path, partial_path))
+            self.assertFalse(os.path.exists(partial_path))
+            # A type clash is reported before any output is written
+            with open(json_path, 'a', encoding='utf-8') as f:
+                f.write('{"id": "four"}\n')
+            bad_path = os.path.join(tmp, 'bad.parquet')
+            with mock.patch.object(converter, 'ARROW_BATCH_ROWS', 3):
+                self.assertIsNone(converter.convert_file(json_path, bad_path))
+            self.assertFalse(os.path.exists(bad_path))
+
+    def test_convert_directory_skips_up_to_date_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            in_dir, out_dir = Path(tmp, 'in'), Path(tmp, 'out')
+            (in_dir / 'sub').mkdir(parents=True)
+            for name in ('a.csv', 'b.csv', 'sub/c.csv'):
+                (in_dir / name).write_text('x,y\n1,2\n3,4\n', encoding='utf-8')
+            (in_dir / 'bad.csv').write_bytes(b'x\n\xff\n')
+            manifest = os.path.join(tmp, 'manifest.json')
+            summary = converter.convert_directory(in_dir, out_dir, '**/*.csv', workers=1, manifest_path=manifest)
+            self.assertEqual([(Path(row['input']).name, row['status'], row['rows']) for row in summary],
+                             [('a.csv', 'converted', 2), ('b.csv', 'converted', 2),
+                              ('bad.csv', 'failed', 0), ('c.csv', 'converted', 2)])
+            with open(out_dir / 'sub' / 'c.json', encoding='utf-8') as f:
+                self.assertEqual(json.load(f), [{'x': '1', 'y': '2'}, {'x': '3', 'y': '4'}])
+            self.assertFalse((out_dir / 'bad.json').exists())
+            # Second run: unchanged files are skipped, the edited one is converted again
+            (in_dir / 'b.csv').write_text('x,y\n5,6\n', encoding='utf-8')
+            summary = converter.convert_directory(in_dir, out_dir, '**/*.csv', workers=1, manifest_path=manifest)
+            self.assertEqual([row['status'] for row in summary], ['skipped', 'converted', 'failed', 'skipped'])
+            with open(out_dir / 'conversion_summary.csv', newline='', encoding='utf-8') as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 4)
+
+    def test_convert_directory_in_place_never_reconverts_its_outputs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            Path(tmp, 'a.csv').write_text('x,y\n1,2\n', encoding='utf-8')
+            Path(tmp, 'b.json').write_text('[{"x": 3}]', encoding='utf-8')
+            summary = converter.convert_directory(tmp, tmp, '*', workers=1)
+            self.assertEqual([(Path(row['output']).name, row['status']) for row in summary],
+                             [('a.json', 'converted'), ('b.csv', 'converted')])
+            # The outputs listed in the last summary are not inputs the next time
+            summary = converter.convert_directory(tmp, tmp, '*', workers=1)
+            self.assertEqual([(Path(row['input']).name, row['status']) for row in summary],
+                             [('a.csv', 'skipped'), ('b.json', 'skipped')])
+            with open(Path(tmp, 'b.json'), encoding='utf-8') as f:
+                self.assertEqual(json.load(f), [{'x': 3}])
+            # Without that summary, an output that would overwrite an input stops the run
+            os.remove(Path(tmp, 'conversion_summary.csv'))
+            with mock.patch('sys.stdout', new_callable=io.StringIO) as out:
+                self.assertIsNone(converter.convert_directory(tmp, tmp, '*', workers=1))
+            self.assertIn('would overwrite the input', out.getvalue())
+            self.assertEqual(Path(tmp, 'a.csv').read_text(encoding='utf-8'), 'x,y\n1,2\n')
+
+    def test_compressed_inputs_and_outputs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(self.csv_path, 'rb') as f:
+                raw = f.read()
+            codecs = [('gz', gzip.compress), ('bz2', bz2.compress), ('xz', lzma.compress)]
+            if converter.zstandard is not None:
+                codecs.append(('zst', converter.zstandard.ZstdCompressor().compress))
+            for ext, compress in codecs:
+                with self.subTest(codec=ext):
+                    packed = os.path.join(tmp, f'data.csv.{ext}')
+                    with open(packed, 'wb') as f:
+                        f.write(compress(raw))
+                    out_json = os.path.join(tmp, f'data.jsonl.{ext}')
+                    self.assertEqual(csv_to_json(packed, out_json, columns=['name', 'city']), len(self.rows))
+                    self.assertEqual(converter.detect_compression(out_json), converter.COMPRESSION_EXTENSIONS['.' + ext])
+                    out_csv = os.path.join(tmp, f'back.csv.{ext}')
+                    self.assertEqual(json_to_csv(out_json, out_csv), len(self.rows))
+                    with converter.open_input(out_csv, newline='', encoding='utf-8') as f:
+                        self.assertEqual(list(csv.DictReader(f)),
+                                         [{'name': row['name'], 'city': row['city']} for row in self.rows])
+            # Magic bytes win over the extension: a gzip file without .gz still reads
+            mislabeled = os.path.join(tmp, 'export.csv')
+            with open(mislabeled, 'wb') as f:
+                f.write(gzip.compress(raw))
+            main(['--csv-to-json', mislabeled])
+            with open(os.path.join(tmp, 'export.json'), encoding='utf-8') as f:
+                self.assertEqual(json.load(f), self.rows)
+
+    def test_external_sort_and_dedupe(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'events.csv')
+            rows = [[str(i), str((i * 7919) % 97), ('NY', 'LA', '')[i % 3]] for i in range(3000)]
+            with open(src, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows([['id', 'k', 'city']] + rows)
+            first = {}
+            for row in rows:
+                first.setdefault(int(row[1]), row)
+            expected = [int(row[0]) for row in sorted(first.values(), key=lambda row: (int(row[1]), row[2]))]
+            out_json = os.path.join(tmp, 'events.json')
+            # A tiny budget forces many spilled runs and more than one merge round
+            with mock.patch.object(converter, 'MERGE_FAN_IN', 4):
+                for budget in (1 << 30, 64 << 10):
+                    with self.subTest(budget=budget):
+                        count = csv_to_json(src, out_json, typed=True, sort_by=['k', 'city'], dedupe_on=['k'],
+                                            memory_budget=budget)
+                        self.assertEqual(count, 97)
+                        with open(out_json, encoding='utf-8') as f:
+                            self.assertEqual([record['id'] for record in json.load(f)], expected)
+            main(['--json-to-csv', out_json, os.path.join(tmp, 'cities.csv'), '--dedupe-on', 'city',
+                  '--memory-budget', '2K'])
+            with open(os.path.join(tmp, 'cities.csv'), newline='', encoding='utf-8') as f:
+                self.assertEqual([row['city'] for row in csv.DictReader(f)], ['', 'LA', 'NY'])
+            self.assertIsNone(csv_to_json(src, out_json, sort_by=['missing']))
+
+    def test_where_and_select_expressions(self):
+        out_json = self.csv_path.replace('.csv', '_out.json')
+        count = csv_to_json(self.csv_path, out_json, where='age > 28 and city != "SF"',
+                            select='name, city.lower() as town, age * 2 as double')
+        self.assertEqual(count, 2)
+        with open(out_json, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), [{'name': 'Alice', 'town': 'ny', 'double': 60},
+                                            {'name': 'Eve', 'town': 'sea', 'double': 80}])
+        # Columns used only by --where are read but not written; the mmap path gives the same result
+        with mock.patch.object(converter, 'MMAP_MIN_BYTES', 0):
+            csv_to_json(self.csv_path, out_json, where='name.startswith("D") or age < 26', columns=['city'])
+        with open(out_json, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), [{'city': 'LA'}, {'city': 'CHI'}])
+        for bad in ('__import__("os").system("true")', 'name.__class__', 'missing == 1', 'age >'):
+            with self.subTest(where=bad):
+                self.assertIsNone(csv_to_json(self.csv_path, out_json, where=bad))
+
+        records = [{'id': 1, 'user': {'name': 'Ann', 'age': 41}}, {'id': 2, 'user': {'name': 'Ben'}},
+                   {'id': 3, 'user': {'name': 'Cy', 'age': 19}}]
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f)
+        out_csv = self.json_path.replace('.json', '_out.csv')
+        self.assertEqual(json_to_csv(self.json_path, out_csv, where='user.age >= 18', select='id, user.name as name'), 2)
+        with open(out_csv, newline='', encoding='utf-8') as f:
+            self.assertEqual(list(csv.DictReader(f)), [{'id': '1', 'name': 'Ann'}, {'id': '3', 'name': 'Cy'}])
+
+    def test_preview_reads_only_the_head(self):
+        preview = converter.preview_file(self.csv_path, rows=2)
+        self.assertEqual(preview['columns'], self.fieldnames)
+        self.assertEqual(preview['types'], {'name': 'string', 'age': 'integer', 'city': 'string'})
+        self.assertEqual(preview['records'], self.rows[:2])
+        self.assertEqual((preview['rows'], preview['exact']), (5, True))
+        with tempfile.TemporaryDirectory() as tmp:
+            rows = [{'id': i, 'note': 'a, "quoted"\nvalue' if i % 4 == 0 else 'plain'} for i in range(20000)]
+            big_csv = os.path.join(tmp, 'big.csv')
+            with open(big_csv, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=['id', 'note'])
+                writer.writeheader()
+                writer.writerows(rows)
+            for path in (big_csv, big_csv + '.gz', os.path.join(tmp, 'big.json'), os.path.join(tmp, 'big.jsonl')):
+                if path.endswith('.gz'):
+                    with open(big_csv, 'rb') as f, gzip.open(path, 'wb') as out:
+                        out.write(f.read())
+                elif not path.endswith('.csv'):
+                    converter.write_json_records(iter(rows), path, converter.json_output_format(path))
+                with self.subTest(path=os.path.basename(path)), \
+                        mock.patch.object(converter, 'PREVIEW_HEAD_BYTES', 16 << 10):
+                    preview = converter.preview_file(path, rows=3)
+                    self.assertEqual([str(record['id']) for record in preview['records']], ['0', '1', '2'])
+                    self.assertFalse(preview['exact'])
+                    self.assertAlmostEqual(preview['rows'], len(rows), delta=len(rows) * 0.15)
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                main(['--preview', big_csv, '--preview-rows', '1'])
+            self.assertIn('20,000 rows, 2 columns', out.getvalue())
+
     def test_json_to_csv(self):
         out_csv = self.json_path.replace('.json', '_out.csv')
         json_to_csv(self.json_path, out_csv)
@@ -56,6 +412,84 @@ class TestCSVJSONConverter(unittest.TestCase):
             rows2 = list(reader)
         self.assertEqual(rows2, self.rows)
 
+    def test_jsonl_to_csv(self):
+        fd, jsonl_path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        with open(jsonl_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(row) + '\n' for row in self.rows)
+        out_csv = jsonl_path.replace('.jsonl', '_out.csv')
+        self.assertEqual(json_to_csv(jsonl_path, out_csv), len(self.rows))
+        with open(out_csv, 'r', encoding='utf-8') as f:
+            self.assertEqual(list(csv.DictReader(f)), self.rows)
+        os.remove(jsonl_path)
+        os.remove(out_csv)
+
+    def test_incremental_json_parser(self):
+        data = [{'n': 123456, 'text': 'a, "quoted" ] value'}, [1, 2.5, None], 'tail']
+        for text in (json.dumps(data), json.dumps(data, indent=2)):
+            # Tiny chunks force items and numbers to straddle chunk boundaries
+            self.assertEqual(list(iter_json_values(io.StringIO(text), chunk_size=3)), data)
+        self.assertEqual(list(iter_json_values(io.StringIO('{"a": 1}\n{"a": 2}\n'))), [{'a': 1}, {'a': 2}])
+        self.assertEqual(list(iter_json_records(self.json_path, parser='python')), self.rows)
+        with self.assertRaises(ValueError):
+            list(iter_json_values(io.StringIO('[1, 2'), chunk_size=2))
+
+    def test_heterogeneous_json_to_csv_uses_union_schema(self):
+        records = [
+            {'id': 1, 'user': {'name': 'Ann', 'address': {'city': 'NY'}}},
+            {'id': 2, 'user': {'name': 'Ben'}, 'tags': ['a', 'b'], 'vip': True},
+        ]
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f)
+        out_csv = self.json_path.replace('.json', '_out.csv')
+        schema_path = self.json_path.replace('.json', '.schema.json')
+
+        json_to_csv(self.json_path, out_csv, schema=schema_path)
+        with open(out_csv, 'r', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(list(rows[0]), ['id', 'user.name', 'user.address.city', 'tags', 'vip'])
+        self.assertEqual(rows[1], {'id': '2', 'user.name': 'Ben', 'user.address.city': '',
+                                   'tags': '["a", "b"]', 'vip': 'True'})
+
+        schema = load_schema(schema_path)
+        self.assertEqual(schema['records'], 2)
+        self.assertEqual(schema['columns'][0], {'name': 'id', 'types': {'integer': 2}})
+
+        # Sampling only the first record misses the later columns
+        json_to_csv(self.json_path, out_csv, sample=1)
+        with open(out_csv, 'r', encoding='utf-8') as f:
+            self.assertEqual(next(csv.reader(f)), ['id', 'user.name', 'user.address.city'])
+        os.remove(schema_path)
+
+    def test_nested_records_round_trip(self):
+        records = [{'id': i, 'user': {'name': f'u{i}', 'address': {'city': 'NY'}}, 'tags': ['a', 'b', 'c'][:i % 4],
+                    'items': [{'sku': f's{j}', 'qty': j} for j in range(1, i % 3 + 2)]} for i in range(300)]
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f)
+        out_csv = self.json_path.replace('.json', '_out.csv')
+        json_to_csv(self.json_path, out_csv, flatten_arrays=True)
+        with open(out_csv, newline='', encoding='utf-8') as f:
+            header = next(csv.reader(f))
+        # Array columns sit together in index order, whatever order they were first seen in
+        self.assertEqual(header, ['id', 'user.name', 'user.address.city', 'items[0].sku', 'items[0].qty',
+                                  'items[1].sku', 'items[1].qty', 'items[2].sku', 'items[2].qty',
+                                  'tags[0]', 'tags[1]', 'tags[2]'])
+        out_json = self.csv_path.replace('.csv', '_out.json')
+        self.assertEqual(csv_to_json(out_csv, out_json, typed=True, nested=True), len(records))
+        with open(out_json, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), records)
+        # Each worker compiles the same plan
+        with mock.patch.object(converter, 'PARALLEL_MIN_CHUNK_BYTES', 1024), \
+                mock.patch.object(converter, 'MMAP_MIN_BYTES', 0):
+            csv_to_json(out_csv, out_json, nested=True, workers=3)
+        with open(out_json, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)[5], {'id': '5', 'user': {'name': 'u5', 'address': {'city': 'NY'}},
+                                               'tags': ['a'], 'items': [{'sku': 's1', 'qty': '1'},
+                                                                        {'sku': 's2', 'qty': '2'},
+                                                                        {'sku': 's3', 'qty': '3'}]})
+        with self.assertRaises(ValueError):
+            converter.unflatten_plan(['user', 'user.name'])
+
     def test_empty_json_to_csv(self):
         fd, empty_json = tempfile.mkstemp(suffix='.json')
         os.close(fd)
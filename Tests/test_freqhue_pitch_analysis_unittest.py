@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from freqhue import pitch_analysis as pa
+
+try:
+    import soundfile as sf
+except (ImportError, OSError):  # pragma: no cover - optional dependency (or libsndfile) missing
+    sf = None
+
+SR = 44100
+
+
+def tone(freq, seconds, amplitude=0.3):
+    t = np.arange(int(SR * seconds)) / SR
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def reference_yin(frame, sr, tolerance=pa.YIN_TOLERANCE):
+    # Scalar port of aubio's pitchyin loop, one lag at a time
+    W = len(frame) // 2
+    x = frame.astype(np.float64)
+    cmnd = np.ones(W)
+    diff = np.array([np.sum((x[:W] - x[tau:tau + W]) ** 2) for tau in range(W)])
+    running = 0.0
+    period = None
+    for tau in range(1, W):
+        running += diff[tau]
+        cmnd[tau] = diff[tau] * tau / running if running else 1.0
+        if tau > 4 and cmnd[tau - 3] < tolerance and cmnd[tau - 3] < cmnd[tau - 2]:
+            period = tau - 3
+            break
+    if period is None:
+        period = int(np.argmin(cmnd))
+    if 0 < period < W - 1:
+        left, mid, right = cmnd[period - 1], cmnd[period], cmnd[period + 1]
+        period += 0.5 * (left - right) / (left - 2 * mid + right)
+    return sr / period if period else 0.0
+
+
+class TestPitchAnalysis(unittest.TestCase):
+    def test_sine_tones_are_tracked_at_their_frequency(self):
+        for freq in (220.0, 330.0, 440.0):
+            with self.subTest(freq=freq):
+                samples = tone(freq, 1.0)
+                pitches = pa.batch_pitches(pa.frame_signal(samples)[4:], SR)
+                self.assertTrue(np.all(np.abs(pitches - freq) < 0.5), pitches)
+                notes = pa.segment_notes(pa.pitch_track(pa.frame_signal(samples), SR), SR, len(samples) / SR)
+                self.assertEqual(len(notes), 1)
+                # The label is the onset frame's pitch, which the steady tone stays within NOTE_TOLERANCE_HZ of
+                self.assertAlmostEqual(float(notes[0][0].replace('Hz', '')), freq, delta=pa.NOTE_TOLERANCE_HZ)
+                self.assertGreater(notes[0][1], 0.9)
+
+    def test_yin_batch_matches_scalar_yin(self):
+        rng = np.random.default_rng(7)
+        samples = tone(330.0, 0.5) + tone(660.0, 0.5, 0.1) + 0.01 * rng.standard_normal(SR // 2).astype(np.float32)
+        frames = pa.frame_signal(samples)[4::5]
+        expected = [reference_yin(frame, SR) for frame in frames]
+        # Both the scipy FFTs (when installed) and the numpy fallback
+        for fft_module in {pa.fft_module, np.fft}:
+            with self.subTest(fft=fft_module.__name__), mock.patch.object(pa, 'fft_module', fft_module):
+                np.testing.assert_allclose(pa.yin_batch(frames, SR), expected, rtol=1e-3)
+
+    def test_frames_without_a_short_lag_dip_get_the_full_search(self):
+        # 60 Hz has its period past YIN_SHORT_LAGS, noise has no dip at all
+        rng = np.random.default_rng(3)
+        samples = np.concatenate([tone(60.0, 0.3), tone(440.0, 0.3), 0.3 * rng.standard_normal(SR // 4).astype(np.float32)])
+        frames = pa.frame_signal(samples)[::4]
+        self.assertGreater(SR / 60.0, pa.YIN_SHORT_LAGS)
+        expected = [reference_yin(frame, SR) for frame in frames]
+        np.testing.assert_allclose(pa.yin_batch(frames, SR), expected, rtol=1e-3)
+        np.testing.assert_allclose(pa.yin_batch(frames, SR, short_lags=8), expected, rtol=1e-3)
+
+    def test_silence_has_no_pitch_or_notes(self):
+        for samples in (np.zeros(SR, dtype=np.float32), tone(440.0, 1.0, amplitude=0.001)):
+            with self.subTest(peak=float(np.max(samples))):
+                pitches = pa.pitch_track(pa.frame_signal(samples), SR)
+                self.assertFalse(pitches.any())
+                self.assertEqual(pa.segment_notes(pitches, SR, 1.0), [])
+
+    def test_notes_split_on_pitch_changes_and_survive_chunking(self):
+        samples = np.concatenate((tone(220.0, 0.5), np.zeros(SR // 4, dtype=np.float32), tone(330.0, 0.5), tone(440.0, 0.05)))
+        pitches = pa.pitch_track(pa.frame_signal(samples), SR, batch_frames=7, workers=3)
+        duration = len(samples) / SR
+        notes = pa.segment_notes(pitches, SR, duration)
+        np.testing.assert_allclose([float(label.replace('Hz', '')) for label, _ in notes], [220, 330], atol=pa.NOTE_TOLERANCE_HZ)
+        segmenter = {}
+        chunked = []
+        for start in range(0, len(pitches), 10):
+            chunked += pa.split_notes(pitches[start:start + 10], SR, segmenter, first_frame=start)
+        chunked += pa.finish_notes(segmenter, duration)
+        self.assertEqual(chunked, notes)
+
+    @unittest.skipIf(sf is None, "soundfile is not installed")
+    def test_streamed_file_matches_whole_file_analysis(self):
+        # A scale with gaps, so note starts and silences land on both sides of many block boundaries
+        samples = np.concatenate([
+            np.concatenate((tone(220.0 * 2 ** (step / 12), 0.3), np.zeros(SR // 20, dtype=np.float32)))
+            for step in range(12)
+        ])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'scale.wav')
+            sf.write(path, np.stack((samples, np.zeros_like(samples)), axis=1), SR, subtype='FLOAT')
+            whole, _ = sf.read(path, dtype='float32')
+            expected_pitches = pa.pitch_track(pa.frame_signal(whole[:, 0]), SR)
+            expected = pa.segment_notes(expected_pitches, SR, len(samples) / SR)
+            self.assertEqual(len(expected), 12)
+            for block_frames in (1, 7, 100, 4096):
+                with self.subTest(block_frames=block_frames), sf.SoundFile(path) as sound_file:
+                    streamed = []
+                    pitch_blocks = []
+                    fractions = []
+                    for notes, pitches, fraction in pa.stream_audio_notes(sound_file, block_frames=block_frames):
+                        streamed += notes
+                        pitch_blocks.append(pitches)
+                        fractions.append(fraction)
+                    np.testing.assert_array_equal(np.concatenate(pitch_blocks), expected_pitches)
+                    self.assertEqual(streamed, expected)
+                    self.assertEqual(fractions, sorted(fractions))
+                    self.assertEqual(fractions[-1], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+PORTFOLIO_IMPORT_ERROR = None
+
+try:
+    from portfolio_generator import portfolio_generator_tool as pg
+except ModuleNotFoundError as exc:  # pragma: no cover - dependency missing
+    PORTFOLIO_IMPORT_ERROR = exc
+
+
+GITHUB_HTML = """
+<html><body>
+  <a itemprop="name codeRepository" href="/{user}/{repo}">{repo}</a>
+  <p class="pinned-item-desc">{repo} description</p>
+</body></html>
+"""
+
+GITHUB_REPOS_PAGE_HTML = """
+<html><body>
+  {repos}
+  <div class="pagination"><em class="current" data-total-pages="{total}">{page}</em></div>
+</body></html>
+"""
+
+
+def github_repos_page(user, page, total, per_page=2):
+    repos = "".join(
+        f'<a itemprop="name codeRepository" href="/{user}/repo{page}_{i}">repo{page}_{i}</a>'
+        for i in range(per_page)
+    )
+    return GITHUB_REPOS_PAGE_HTML.format(repos=repos, total=total, page=page)
+
+
+@unittest.skipIf(
+    PORTFOLIO_IMPORT_ERROR is not None,
+    reason=f"portfolio_generator_tool dependencies missing: {PORTFOLIO_IMPORT_ERROR}",
+)
+class TestPortfolioGenerator(unittest.TestCase):
+    def setUp(self):
+        fd, self.output_path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.cache_dir = pg.Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        os.remove(self.output_path)
+        shutil.rmtree(self.cache_dir)
+
+    def test_concurrent_fetch_keeps_input_order(self):
+        urls = [f"https://github.com/user{i}" for i in range(6)]
+
+        def fake_fetch(url, session=None, validators=None):
+            # Earlier URLs finish last, so completion order is reversed
+            index = int(re.search(r'user(\d+)', url).group(1))
+            time.sleep(0.05 * (len(urls) - index))
+            return 200, GITHUB_HTML.format(user=f"user{index}", repo=f"repo{index}"), {}
+
+        with mock.patch.object(pg, 'fetch_page', side_effect=fake_fetch):
+            start = time.perf_counter()
+            pg.generate_portfolio(urls, self.output_path, 'json', workers=len(urls), cache_dir=None)
+            elapsed = time.perf_counter() - start
+
+        with open(self.output_path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual([e['title'] for e in data], [f"repo{i}" for i in range(6)])
+        # Roughly the slowest single fetch, not the sum of all of them
+        self.assertLess(elapsed, 0.05 * sum(range(1, 7)))
+
+    def test_failed_fetches_are_skipped(self):
+        urls = ["https://github.com/ok", "https://github.com/broken"]
+
+        def fake_fetch(url, session=None, validators=None):
+            if 'broken' in url:
+                return None, None, None
+            return 200, GITHUB_HTML.format(user="ok", repo="kept"), {}
+
+        with mock.patch.object(pg, 'fetch_page', side_effect=fake_fetch):
+            pg.generate_portfolio(urls, self.output_path, 'json', cache_dir=None)
+
+        with open(self.output_path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual([e['title'] for e in data], ["kept"])
+
+    def test_github_pages_are_walked_and_revalidated_from_cache(self):
+        requested = []
+
+        def fake_fetch(url, session=None, validators=None):
+            page = int(re.search(r'page=(\d+)', url).group(1))
+            etag = f'"etag-{page}"'
+            requested.append((page, validators))
+            if validators and validators.get('etag') == etag:
+                return 304, None, validators
+            return 200, github_repos_page('octo', page, total=3), {'etag': etag, 'last_modified': None}
+
+        with mock.patch.object(pg, 'fetch_page', side_effect=fake_fetch), \
+                mock.patch('sys.stdout', new_callable=io.StringIO) as out:
+            first = pg.harvest_github_repos('octo', cache_dir=self.cache_dir)
+            requested.clear()
+            with mock.patch.object(pg, 'parse_github', side_effect=AssertionError("re-parsed")):
+                second = pg.harvest_github_repos('octo', cache_dir=self.cache_dir)
+        self.assertIn("(3 fetched, 0 unchanged)", out.getvalue())
+        self.assertIn("(0 fetched, 3 unchanged)", out.getvalue())
+
+        expected = [f"repo{p}_{i}" for p in range(1, 4) for i in range(2)]
+        self.assertEqual([e['title'] for e in first], expected)
+        self.assertEqual(second, first)
+        # Every page was revalidated with the ETag stored on the first run
+        self.assertEqual(sorted(p for p, _ in requested), [1, 2, 3])
+        self.assertTrue(all(v['etag'] == f'"etag-{p}"' for p, v in requested))
+
+    def test_session_pool_grows_for_nested_fetches(self):
+        with mock.patch.object(pg, '_session', None), mock.patch.object(pg, '_session_pool_size', 0):
+            session = pg.get_session(4)
+            self.assertIs(pg.get_session(16), session)
+            self.assertEqual(session.get_adapter('https://github.com')._pool_maxsize, 16)
+            pg.get_session(2)  # A smaller request keeps the larger pool
+            self.assertEqual(session.get_adapter('https://github.com')._pool_maxsize, 16)
+
+    def test_parsers_pair_details_with_their_own_item(self):
+        html = """
+        <a itemprop="name codeRepository" href="/octo/first">first</a>
+        <a itemprop="name codeRepository" href="/octo/second">second</a>
+        <p itemprop="description">second description</p>
+        """
+        repos = pg.parse_github(html)
+        self.assertEqual([r['description'] for r in repos],
+                         ["No description provided", "second description"])
+
+        trending = pg.parse_trending('github', """
+        <h2><a data-hydro-click="REPOSITORY" href="/octo/one">octo / one</a></h2><p>one</p>
+        <h2><a data-hydro-click="REPOSITORY" href="/octo/two">octo / two</a></h2>
+        """)
+        self.assertEqual([(e['title'], e['description']) for e in trending],
+                         [("octo ", "one"), ("octo ", "No description provided")])
+
+    def test_trending_snapshots_diff_and_rank_history(self):
+        conn = pg.open_snapshot_store(':memory:')
+        now = pg.datetime.now(pg.timezone.utc)
+
+        def entry(repo):
+            return {"title": "octo", "url": f"https://github.com/octo/{repo}", "description": repo}
+
+        pg.record_trending_snapshot(conn, 'github', [entry('a'), entry('b')], now - pg.timedelta(days=3))
+        pg.record_trending_snapshot(conn, 'github', [entry('c'), entry('a')], now - pg.timedelta(days=2))
+        pg.record_trending_snapshot(conn, 'behance', [entry('z')], now)
+
+        diff = pg.trending_diff(conn, 'github')
+        self.assertEqual([(e['rank'], e['url']) for e in diff['new']], [(1, "https://github.com/octo/c")])
+        self.assertEqual([e['url'] for e in diff['dropped']], ["https://github.com/octo/b"])
+
+        self.assertEqual([rank for _, rank in pg.trending_rank_history(conn, 'github', 'octo/a')], [1, 2])
+        self.assertEqual([rank for _, rank in pg.trending_rank_history(conn, 'github', 'octo/b')], [2, None])
+        self.assertEqual(len(pg.trending_rank_history(conn, 'github', 'octo/a', days=1)), 0)
+        # Every entry is titled 'octo': one rank per snapshot, the best one
+        self.assertEqual([rank for _, rank in pg.trending_rank_history(conn, 'github', 'octo')], [1, 1])
+        # A URL match wins over an earlier entry whose title equals the key
+        pg.record_trending_snapshot(conn, 'github', [{"title": "octo/a", "url": "https://github.com/x/y"}, entry('a')],
+                                    now - pg.timedelta(days=1))
+        self.assertEqual([rank for _, rank in pg.trending_rank_history(conn, 'github', 'octo/a')], [1, 2, 2])
+        conn.close()
+
+    def test_all_formats_written_in_one_pass(self):
+        outputs = [os.path.join(self.cache_dir, f"portfolio.{ext}") for ext in ('md', 'json', 'jsonl', 'html')]
+        entries = [
+            {"title": "one", "url": "https://dribbble.com/shots/1"},
+            {"title": "<two>", "url": "https://dribbble.com/shots/2", "description": "second"},
+        ]
+        pg.render_entries(iter(entries), outputs, "Dribbble Portfolio", "octo")
+
+        with open(outputs[0], encoding='utf-8') as f:
+            md = f.read()
+        self.assertTrue(md.startswith("# Dribbble Portfolio\n\n__by octo__\n\n| Name | Description |"))
+        self.assertIn("| [one](https://dribbble.com/shots/1) | No description provided |", md)
+        with open(outputs[1], encoding='utf-8') as f:
+            self.assertEqual(json.load(f), entries)
+        with open(outputs[2], encoding='utf-8') as f:
+            self.assertEqual([json.loads(line) for line in f], entries)
+        with open(outputs[3], encoding='utf-8') as f:
+            page = f.read()
+        self.assertIn("&lt;two&gt;", page)
+        self.assertTrue(page.rstrip().endswith("</html>"))
+
+
+if __name__ == '__main__':
+    unittest.main()
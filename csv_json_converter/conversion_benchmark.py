@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+conversion_benchmark.py
+
+Benchmark and regression suite for csv_to_json_converter_tool.py.
+
+Synthetic datasets are generated at 10K, 1M and 10M rows in four variants:
+    narrow   5 short columns
+    wide     40 columns of mixed text and numbers
+    quoted   fields with commas, doubled quotes and embedded newlines
+    unicode  mostly non-ASCII text (accents, CJK, emoji)
+Each dataset is written as CSV, JSON and JSON Lines and cached under cache/csv_json_converter/benchmark/.
+
+Every mode of csv_to_json and json_to_csv runs in a fresh Python process, so its peak RSS
+(ru_maxrss, including worker processes) is measured on its own. Each mode is repeated until
+it has run at least 3 times and for at least a second (small datasets take many rounds).
+
+Results are compared with a stored baseline (benchmark_baseline.json next to this file).
+The script exits with status 1 when any mode's rows/s drops, or its peak RSS grows, by
+more than --threshold (default 25%). Each child also times a fixed CSV/JSON calibration
+workload between rounds, and throughput is compared relative to it (the median over the
+rounds), so a busier or slower machine does not read as a regression. Re-record the
+baseline with --save-baseline when the hardware changes.
+csv-json/workers always uses 2 workers, and each result records os.cpu_count(): the workers
+mode is only compared with a baseline recorded on the same number of cores.
+
+Usage:
+    python conversion_benchmark.py                              # 10k and 1m, all variants and modes
+    python conversion_benchmark.py --sizes 10k --variants narrow quoted
+    python conversion_benchmark.py --sizes 10m --modes csv-json/json csv-json/workers
+    python conversion_benchmark.py --sizes 10k 1m --save-baseline
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import csv_to_json_converter_tool as converter
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+VARIANTS = ('narrow', 'wide', 'quoted', 'unicode')
+DATA_DIR = Path(__file__).resolve().parent.parent / 'cache' / 'csv_json_converter' / 'benchmark'
+BASELINE_PATH = Path(__file__).with_name('benchmark_baseline.json')
+MIN_MEASURE_SECONDS = 1.0  # Repeat short runs until this much time is spent, to smooth out timer noise
+MIN_ROUNDS = 3  # Enough rounds for the median speed to ignore one disturbed round
+MAX_ROUNDS = 50
+BENCHMARK_WORKERS = 2  # Fixed, so csv-json/workers measures the same work on every machine
+CALIBRATION_ROWS = [[str(i), f'name {i}', 'a "quoted", value', str(i * 0.5)] for i in range(10_000)]
+
+UNICODE_WORDS = ['Zürich', 'São Paulo', 'Kraków', '東京都', 'Москва', 'naïve café', 'αβγ', '🙂 ok', 'Ærø', '서울']
+
+# Mode name -> (input kind, converter call). Modes needing a missing optional package are skipped.
+MODES = {
+    'csv-json/json': ('csv', lambda src, out: converter.csv_to_json(src, out + '.json')),
+    'csv-json/jsonl': ('csv', lambda src, out: converter.csv_to_json(src, out + '.jsonl')),
+    'csv-json/typed': ('csv', lambda src, out: converter.csv_to_json(src, out + '.json', typed=True)),
+    'csv-json/compact': ('csv', lambda src, out: converter.csv_to_json(src, out + '.json', compact=True)),
+    'csv-json/columns': ('csv', lambda src, out: converter.csv_to_json(src, out + '.json', columns=['c0', 'c1'])),
+    'csv-json/workers': ('csv', lambda src, out: converter.csv_to_json(src, out + '.json', workers=BENCHMARK_WORKERS)),
+    'csv-json/orjson': ('csv', lambda src, out: converter.csv_to_json(src, out + '.json', encoder='orjson')),
+    'csv-json/msgspec': ('csv', lambda src, out: converter.csv_to_json(src, out + '.json', encoder='msgspec')),
+    'json-csv/two-pass': ('json', lambda src, out: converter.json_to_csv(src, out + '.csv')),
+    'json-csv/sample': ('json', lambda src, out: converter.json_to_csv(src, out + '.csv', sample=1000)),
+    'json-csv/jsonl': ('jsonl', lambda src, out: converter.json_to_csv(src, out + '.csv')),
+}
+OPTIONAL_MODES = {'csv-json/orjson': converter.orjson, 'csv-json/msgspec': converter.msgspec}
+# Modes whose speed depends on the number of cores: only compared with a baseline from the same core count
+PARALLEL_MODES = {'csv-json/workers'}
+
+
+def dataset_row(variant, i, rng):
+    if variant == 'narrow':
+        return [i, f'user{i}', rng.randint(18, 90), rng.choice(('NY', 'LA', 'SF')), rng.random()]
+    if variant == 'wide':
+        return [i, f'user{i}'] + [rng.randint(0, 10**6) if k % 2 else f'v{rng.random():.6f}' for k in range(38)]
+    if variant == 'quoted':
+        return [i, f'Last, First {i}', 'he said "hi"', 'line one\nline two' if i % 7 == 0 else 'single', rng.random()]
+    return [i] + [' '.join(rng.sample(UNICODE_WORDS, 3)) for _ in range(4)]
+
+
+def build_dataset(size_name, variant, data_dir):
+    """Writes (once) the CSV, JSON and JSON Lines files for one dataset; returns their paths."""
+    base = data_dir / f'{variant}_{size_name}'
+    paths = {'csv': base.with_suffix('.csv'), 'json': base.with_suffix('.json'), 'jsonl': base.with_suffix('.jsonl')}
+    if all(path.exists() for path in paths.values()):
+        return paths
+    data_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(f'{variant}-{size_name}')
+    rows = SIZES[size_name]
+    width = len(dataset_row(variant, 0, rng))
+    with open(paths['csv'], 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([f'c{k}' for k in range(width)])
+        writer.writerows(dataset_row(variant, i, rng) for i in range(rows))
+    encoder = 'orjson' if converter.orjson else 'stdlib'
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        converter.csv_to_json(paths['csv'], paths['json'], encoder=encoder, compact=True)
+        converter.csv_to_json(paths['csv'], paths['jsonl'], encoder=encoder)
+    return paths
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process and its --workers children, in MB.
+    On Linux, ru_maxrss survives fork/exec (a child starts at its parent's peak), so this
+    process's own high-water mark is read from /proc (VmHWM) instead.
+    Returns None where the resource module is missing (Windows).
+    """
+    if resource is None:
+        return None
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is in bytes on macOS, KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with contextlib.suppress(OSError):
+        with open('/proc/self/status', encoding='ascii') as status:
+            peak = next(int(line.split()[1]) for line in status if line.startswith('VmHWM:'))
+    return max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale / 2**20
+
+
+def calibration_text():
+    """CALIBRATION_ROWS as CSV text, built once per child so calibrate() only times the parsing."""
+    text = io.StringIO()
+    csv.writer(text).writerows(CALIBRATION_ROWS)
+    return text.getvalue()
+
+
+def calibrate(text):
+    """Rows/s of a fixed csv + json workload: the speed of this machine right now."""
+    start = time.perf_counter()
+    for row in csv.reader(io.StringIO(text)):
+        json.dumps(dict(zip('abcd', row)))
+    return len(CALIBRATION_ROWS) / (time.perf_counter() - start)
+
+
+def measure(mode, input_path):
+    """
+    Runs one mode in this process and returns its timing; called in a fresh child process.
+    The machine's speed drifts by a third or more within seconds (CPU frequency, neighbours on
+    a VM), so the calibration workload runs between rounds. Each round's rows/s is divided by
+    the mean of the calibrations on either side of it, and the median of those ratios
+    ('speed_index') is what gets compared with the baseline.
+    """
+    _, convert = MODES[mode]
+    out = str(DATA_DIR / 'out' / f'{Path(input_path).stem}_{mode.replace("/", "_")}')
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    text = calibration_text()
+    calibrations = [calibrate(text)]
+    ratios = []
+    best, total, rounds = float('inf'), 0.0, 0
+    while rounds < MAX_ROUNDS and (rounds < MIN_ROUNDS or total < MIN_MEASURE_SECONDS):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            rows = convert(input_path, out)
+        seconds = time.perf_counter() - start
+        calibrations.append(calibrate(text))
+        ratios.append(rows / seconds / ((calibrations[-2] + calibrations[-1]) / 2))
+        best, total, rounds = min(best, seconds), total + seconds, rounds + 1
+    for suffix in ('.json', '.jsonl', '.csv'):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(out + suffix)
+    peak_rss = peak_rss_mb()
+    return {'rows': rows, 'seconds': round(best, 4), 'rounds': rounds, 'rows_per_sec': round(rows / best),
+            'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+            'calibration': round(statistics.median(calibrations)), 'speed_index': round(statistics.median(ratios), 4),
+            'cpu_count': os.cpu_count()}
+
+
+def relative_speed(result, before):
+    """Throughput change vs the baseline, corrected for how fast the machine was each time."""
+    return result['speed_index'] / before['speed_index']
+
+
+def run_in_child(mode, input_path):
+    result = subprocess.run([sys.executable, __file__, '--measure', mode, str(input_path)],
+                            capture_output=True, text=True, cwd=Path(__file__).parent)
+    if result.returncode != 0:
+        raise RuntimeError(f"{mode} on {input_path} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def comparable(key, result, before):
+    """A baseline entry is comparable unless it is a parallel mode recorded on a different core count."""
+    if not before:
+        return False
+    return key.split(':')[1] not in PARALLEL_MODES or before.get('cpu_count') == result['cpu_count']
+
+
+def compare(results, baseline, threshold):
+    """Returns one message per regression: rows/s down or peak RSS up by more than `threshold`."""
+    regressions = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if not comparable(key, result, before):
+            continue
+        if relative_speed(result, before) < 1 - threshold:
+            regressions.append(f"{key}: {result['rows_per_sec']:,} rows/s vs {before['rows_per_sec']:,} baseline "
+                               f"({relative_speed(result, before) - 1:+.0%} after calibration)")
+        if None in (result['peak_rss_mb'], before['peak_rss_mb']):
+            continue
+        if result['peak_rss_mb'] > before['peak_rss_mb'] * (1 + threshold):
+            regressions.append(f"{key}: {result['peak_rss_mb']} MB peak RSS vs {before['peak_rss_mb']} MB baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark csv_to_json/json_to_csv and check for regressions.")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['10k', '1m'],
+                        help='Dataset sizes (default: 10k 1m; 10m takes several GB of disk)')
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=list(VARIANTS), help='Dataset variants')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), help='Modes to run (default: all installed)')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown / memory growth vs the baseline (default: 0.25 = 25%%)')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help='Baseline file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR, help='Where generated datasets are cached')
+    parser.add_argument('--measure', nargs=2, help=argparse.SUPPRESS)  # Internal: MODE INPUT, in a child process
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return
+
+    modes = [mode for mode in args.modes or MODES if OPTIONAL_MODES.get(mode, True) is not None]
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8')) if args.baseline.exists() else {}
+    results = {}
+    print(f"{'dataset':<14} {'mode':<18} {'rows/s':>11} {'peak MB':>8} {'vs base':>8}")
+    for size_name in args.sizes:
+        for variant in args.variants:
+            paths = build_dataset(size_name, variant, args.data_dir)
+            for mode in modes:
+                key = f'{variant}_{size_name}:{mode}'
+                results[key] = result = run_in_child(mode, paths[MODES[mode][0]])
+                before = baseline.get(key)
+                if comparable(key, result, before):
+                    change = f"{relative_speed(result, before) - 1:+.0%}"
+                else:
+                    change = 'cores' if before else '-'  # 'cores': baseline is from another core count
+                peak = f"{result['peak_rss_mb']:.1f}" if result['peak_rss_mb'] else '-'
+                print(f"{variant + '_' + size_name:<14} {mode:<18} {result['rows_per_sec']:>11,} "
+                      f"{peak:>8} {change:>8}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({**baseline, **results}, indent=2, sort_keys=True) + '\n',
+                                 encoding='utf-8')
+        print(f"\nBaseline saved to {args.baseline} ({len(results)} results)")
+        return
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}" if baseline else "\nNo baseline yet: run with --save-baseline")
+
+
+if __name__ == '__main__':
+    main()
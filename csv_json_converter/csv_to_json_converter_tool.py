@@ -6,6 +6,21 @@ A two-way data converter for CSV and JSON files. It contains functions to conver
 
 Key Features:
 - Converts CSV to JSON and JSON to CSV.
+- Streams CSV to JSON (or JSON Lines) row by row, so memory stays flat for any file size.
+- Reads JSON arrays item by item (ijson when installed, pure-Python fallback) and JSON Lines input.
+- Typed mode (--typed): infers integer/number/boolean/date/null per column and emits real JSON numbers.
+- Columnar formats (--convert ... --to parquet|arrow|feather, and back) via optional pyarrow, streamed in record batches.
+- Memory-mapped fast path for large CSVs, with column projection (--columns a,b,c).
+- Pluggable JSON encoders (--encoder stdlib|orjson|msgspec) and a --compact output mode.
+- Converts large CSVs in parallel (--workers N): record-aligned byte ranges, one process per chunk.
+- Reads and writes .gz/.bz2/.xz/.zst files transparently (detected by magic bytes / extension), streaming.
+- Row filters and projections (--where EXPR, --select LIST), compiled once and applied while streaming.
+- External sort and dedupe (--sort-by COL, --dedupe-on COL) with spill files and a --memory-budget.
+- Batch mode (--dir IN --out OUT --glob PATTERN): converts many files on a process pool, skips up-to-date outputs, writes a summary.
+- Infers the CSV header as the union of all keys (nested objects flattened to dotted names), with per-column type stats.
+- Nested records both ways: --flatten-arrays spreads arrays over indexed columns (items[0].sku), --nested rebuilds them with a compiled plan.
+- Saves/reuses inferred schemas (--schema FILE) and supports a bounded sampling pre-pass (--sample N).
+- Instant previews (--preview FILE): columns, types, first records and a row-count estimate from head reads and byte-offset sampling.
 - Interactive: prompts for input/output files if not provided as arguments.
 - Lists local .csv and .json files for easy selection in interactive mode.
 - Infers output file names from input if not provided (auto-naming).
@@ -18,45 +33,1987 @@ Key Features:
 Intended as a learning resource: code is heavily commented to explain each step and concept.
 """
 
+import argparse
+import ast
+import bz2
+import contextlib
+import copy
 import csv
+import gzip
+import hashlib
+import heapq
+import io
 import json
+import lzma
+import math
+import mmap
+import os
+import pickle
+import re
+import shutil
 import sys
+import tempfile
+import time
+import tokenize
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, groupby, islice, repeat
+from operator import itemgetter, methodcaller
 from pathlib import Path
 
+# Optional: ijson is a fast event-based JSON parser. Without it a pure-Python
+# incremental parser (built on json.JSONDecoder.raw_decode) is used instead.
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional: faster JSON encoders for the output (--encoder orjson|msgspec)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Optional: zstandard adds .zst support (with multithreaded compression)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Optional: pyarrow powers the columnar formats (Parquet, Arrow IPC, Feather)
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Streaming knobs: rows are encoded in batches and written through large buffers,
+# so a multi-GB file never has more than one batch of rows in memory at a time.
+READ_BUFFER_SIZE = 1 << 20   # 1 MiB input buffer
+WRITE_BUFFER_SIZE = 1 << 20  # 1 MiB output buffer
+BATCH_ROWS = 1000            # Rows encoded per write() call
+JSON_CHUNK_SIZE = 1 << 16    # Characters read per step by the incremental JSON parser
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+SCHEMA_VERSION = 1
+PARALLEL_MIN_CHUNK_BYTES = 8 << 20  # Below ~8 MiB per worker, process start-up costs more than it saves
+QUOTE_SCAN_BLOCK = 16 << 20         # Bytes scanned at a time when tracking quote parity
+TYPE_SAMPLE_ROWS = 1000             # Rows sampled to infer column types in typed mode
+MMAP_MIN_BYTES = 64 << 20           # CSVs at least this large are read through mmap, not the text layer
+MMAP_BLOCK_SIZE = 1 << 20           # Bytes of whole records decoded (and split) at a time on the mmap path
+ARROW_BLOCK_SIZE = 16 << 20         # Bytes of CSV parsed into each Arrow record batch
+ARROW_BATCH_ROWS = 64 * 1024        # Rows per record batch for Parquet/Arrow/JSON sources
+
+# File formats by extension, and the columnar ones that need pyarrow
+FILE_FORMATS = {'.csv': 'csv', '.json': 'json', '.jsonl': 'jsonl', '.ndjson': 'jsonl',
+                '.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'feather'}
+COLUMNAR_FORMATS = ('parquet', 'arrow', 'feather')
+# Default codecs: Parquet readers expect snappy; Feather files are lz4-compressed by convention
+DEFAULT_COMPRESSION = {'parquet': 'snappy', 'arrow': None, 'feather': 'lz4'}
+# Compression codecs: extensions (used when writing) and magic bytes (used when reading)
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+COMPRESSION_MAGIC = (('gzip', b'\x1f\x8b'), ('xz', b'\xfd7zXZ\x00'), ('zstd', b'\x28\xb5\x2f\xfd'))
+BZ2_MAGIC = re.compile(rb'BZh[1-9](1AY&SY|\x17rE8P\x90)')  # 'BZh' alone could be the start of a CSV header
+GZIP_LEVEL = 6  # The gzip command-line default: level 9 is much slower for a slightly smaller file
+SORT_MEMORY_BUDGET = 256 << 20       # Bytes of records sorted in memory before a run is spilled to disk
+SORT_SIZE_SAMPLE = 64               # Measure every Nth record's size to track a run's memory use
+MERGE_FAN_IN = 64                   # Spill runs merged at once (more runs are merged in several rounds)
+PREVIEW_ROWS = 10                   # Records shown by --preview
+PREVIEW_HEAD_BYTES = 1 << 20        # Bytes read from the start of a file for a preview
+PREVIEW_PROBES = 16                 # Evenly spaced blocks sampled to estimate the row count
+PREVIEW_PROBE_BYTES = 64 << 10      # Bytes read per probe
+SUMMARY_FIELDS = ['input', 'output', 'status', 'rows', 'bytes_in', 'bytes_out', 'seconds', 'message']
+
+# --- Compressed I/O ---
+
+# Helper function to strip a compression extension: data.csv.gz -> data.csv
+def strip_compression_suffix(path):
+    path = Path(path)
+    return path.with_suffix('') if path.suffix.lower() in COMPRESSION_EXTENSIONS else path
+
+# Helper function to find out how a file is compressed (None for plain files)
+def detect_compression(path, reading=True):
+    """
+    When reading an existing file its magic bytes decide, so a mislabeled file still opens.
+    When writing, the extension decides.
+    """
+    if reading and Path(path).is_file():
+        with open(path, 'rb') as f:
+            head = f.read(10)
+        for codec, magic in COMPRESSION_MAGIC:
+            if head.startswith(magic):
+                return codec
+        return 'bz2' if BZ2_MAGIC.match(head) else None
+    return COMPRESSION_EXTENSIONS.get(Path(path).suffix.lower())
+
+# Helper function to open a file like open(), (de)compressing on the fly
+def open_compressed(path, mode='r', codec=None, **kwargs):
+    """
+    Data is streamed through the codec, so no decompressed copy is written to disk or
+    held in memory. Text modes take encoding/newline like open(); `buffering` only
+    applies to plain files. zstd compresses on all cores (threads=-1); gzip, bz2 and xz
+    have no multithreaded mode in the standard library.
+    """
+    if codec is None:
+        return open(path, mode, **kwargs)
+    kwargs.pop('buffering', None)
+    mode = mode if 'b' in mode else mode + 't'  # The codec modules default to binary
+    if codec == 'gzip':
+        if 'w' in mode:
+            kwargs['compresslevel'] = GZIP_LEVEL
+        return gzip.open(path, mode, **kwargs)
+    if codec == 'bz2':
+        return bz2.open(path, mode, **kwargs)
+    if codec == 'xz':
+        return lzma.open(path, mode, **kwargs)
+    if zstandard is None:
+        raise ImportError("zstandard is required for .zst files (pip install zstandard)")
+    cctx = zstandard.ZstdCompressor(threads=-1) if 'w' in mode else None
+    return zstandard.open(path, mode, cctx=cctx, **kwargs)
+
+# Helper functions to open an input (codec from its magic bytes) or an output (codec from its extension)
+def open_input(path, mode='r', **kwargs):
+    return open_compressed(path, mode, detect_compression(path), **kwargs)
+
+def open_output(path, mode='w', **kwargs):
+    return open_compressed(path, mode, detect_compression(path, reading=False), **kwargs)
+
+# Helper function to split any iterable into lists of at most `size` items
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+# Helper function to pick the JSON flavour from the output file name
+def json_output_format(json_path, fmt=None):
+    """
+    Returns 'jsonl' for JSON Lines output (one object per line) or 'json' for a JSON array.
+    An explicit `fmt` wins; otherwise a .jsonl extension selects JSON Lines.
+    """
+    if fmt:
+        return fmt
+    return 'jsonl' if strip_compression_suffix(json_path).suffix.lower() == '.jsonl' else 'json'
+
+# C-accelerated JSON string escaper from the standard library
+_encode_str = json.encoder.encode_basestring_ascii
+
+# Encoders for the scalar values a (typed) CSV row can hold, keyed by exact type
+SCALAR_ENCODERS = {
+    str: _encode_str,
+    int: int.__repr__,
+    float: json.dumps,  # Handles NaN/Infinity the same way json.dump does
+    bool: lambda value: 'true' if value else 'false',
+    type(None): lambda value: 'null',
+}
+
+# Helper function to encode one record exactly as json.dump(indent=2) lays out an array item
+def encode_pretty_record(record):
+    """
+    CSV rows are flat dicts of scalars, so each value is encoded with a fast scalar encoder
+    (the C string escaper for text) instead of the (pure-Python) indenting encoder.
+    Anything else (nested data, non-string keys) falls back to json.dumps.
+    """
+    try:
+        items = ',\n'.join(f'    {_encode_str(k)}: {SCALAR_ENCODERS[type(v)](v)}' for k, v in record.items())
+    except (TypeError, KeyError):  # Non-string key or nested value
+        # json.dumps escapes newlines inside strings, so every literal newline is structural
+        return '  ' + json.dumps(record, indent=2).replace('\n', '\n  ')
+    return '  {\n' + items + '\n  }' if items else '  {}'
+
+# Compact stdlib encoder: no spaces after ',' and ':'
+_encode_compact = json.JSONEncoder(separators=(',', ':')).encode
+
+# Array opening, item separator and closing bytes, keyed by compact mode
+ARRAY_LAYOUT = {False: (b'[\n', b',\n', b'\n]'), True: (b'[', b',', b']')}
+
+# Helper function to check that the requested JSON encoder is installed
+def json_encoder_available(encoder):
+    module = {'stdlib': json, 'orjson': orjson, 'msgspec': msgspec}.get(encoder)
+    if module is None:
+        print(f"❌ The {encoder} encoder is not installed (pip install {encoder})")
+    return module is not None
+
+# Helper function to build a batch encoder: list of records -> bytes of items joined by the layout separator
+def json_batch_encoder(encoder='stdlib', fmt='json', compact=False):
+    """
+    Encodes a whole batch per call. orjson and msgspec encode the batch as one list
+    and slice off the brackets, so the pretty layout is produced by their C code and
+    matches json.dump(indent=2) item for item. They write non-ASCII text as UTF-8
+    where the stdlib writes \\u escapes. A batch they cannot encode (e.g. integers
+    wider than 64 bits) is encoded by the stdlib instead.
+    """
+    if fmt == 'jsonl':
+        encode_record = _encode_compact if compact else json.dumps
+        separator = '\n'
+    else:
+        encode_record = _encode_compact if compact else encode_pretty_record
+        separator = ARRAY_LAYOUT[compact][1].decode()
+
+    def encode_stdlib(batch):
+        return separator.join(map(encode_record, batch)).encode('utf-8')
+
+    if encoder == 'orjson':
+        option = orjson.OPT_NON_STR_KEYS
+        if fmt == 'jsonl':
+            fast = lambda batch: b'\n'.join([orjson.dumps(record, option=option) for record in batch])
+        elif compact:
+            fast = lambda batch: orjson.dumps(batch, option=option)[1:-1]
+        else:
+            fast = lambda batch: orjson.dumps(batch, option=option | orjson.OPT_INDENT_2)[2:-2]
+    elif encoder == 'msgspec':
+        encode = msgspec.json.Encoder().encode
+        if fmt == 'jsonl':
+            encode_lines = msgspec.json.Encoder().encode_lines
+            fast = lambda batch: encode_lines(batch)[:-1]
+        elif compact:
+            fast = lambda batch: encode(batch)[1:-1]
+        else:
+            fast = lambda batch: msgspec.json.format(encode(batch), indent=2)[2:-2]
+    else:
+        return encode_stdlib
+
+    def encode_batch(batch):
+        try:
+            return fast(batch)
+        except (TypeError, ValueError):
+            return encode_stdlib(batch)
+    return encode_batch
+
+# Helper function to write the body of a JSON array (or JSON Lines) without the brackets
+def write_json_body(records, jsonfile, fmt='json', encoder='stdlib', compact=False):
+    """
+    Writes records to a binary file as separated array items (no surrounding brackets),
+    or as JSON Lines. Bodies written separately can be joined with the separator later,
+    which is how parallel chunks are stitched together. Returns the number of records.
+    """
+    encode = json_batch_encoder(encoder, fmt, compact)
+    separator = ARRAY_LAYOUT[compact][1]
+    count = 0
+    for batch in batched(records, BATCH_ROWS):
+        if fmt == 'jsonl':
+            jsonfile.write(encode(batch))
+            jsonfile.write(b'\n')
+        else:
+            if count:
+                jsonfile.write(separator)
+            jsonfile.write(encode(batch))
+        count += len(batch)
+    return count
+
+# Helper function to stream records into a JSON array or JSON Lines file
+def write_json_records(records, json_path, fmt='json', encoder='stdlib', compact=False):
+    """
+    Writes an iterable of dicts to `json_path` without collecting them first.
+    The JSON array layout matches json.dump(..., indent=2), or has no whitespace at all
+    with compact=True; JSON Lines writes one object per line.
+    Returns the number of records written.
+    """
+    with open_output(json_path, 'wb', buffering=WRITE_BUFFER_SIZE) as jsonfile:
+        if fmt == 'jsonl':
+            return write_json_body(records, jsonfile, fmt, encoder, compact)
+        opening, _, closing = ARRAY_LAYOUT[compact]
+        records = iter(records)
+        first = next(records, None)
+        if first is None:
+            jsonfile.write(b'[]')
+            return 0
+        jsonfile.write(opening)
+        count = write_json_body(chain([first], records), jsonfile, fmt, encoder, compact)
+        jsonfile.write(closing)
+    return count
+
+# --- Typed Conversion ---
+
+# Patterns a sampled column must match (for every non-empty value) to get a type
+INT_PATTERN = re.compile(r'[+-]?(0|[1-9][0-9]*)\Z')  # Leading zeros (zip codes, IDs) stay strings
+FLOAT_PATTERN = re.compile(r'[+-]?((0|[1-9][0-9]*)(\.[0-9]*)?|\.[0-9]+)([eE][+-]?[0-9]+)?\Z')
+DATE_PATTERN = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}([T ][0-9]{2}:[0-9]{2}(:[0-9]{2}(\.[0-9]+)?)?(Z|[+-][0-9]{2}:?[0-9]{2})?)?\Z')
+BOOL_VALUES = {'true': True, 'false': False, 'True': True, 'False': False, 'TRUE': True, 'FALSE': False}
+TYPE_TESTS = (
+    ('integer', INT_PATTERN.match),
+    ('number', FLOAT_PATTERN.match),
+    ('boolean', BOOL_VALUES.__contains__),
+    ('date', DATE_PATTERN.match),  # Dates stay ISO strings in JSON; the type is for columnar outputs
+)
+TYPE_CASTERS = {'integer': int, 'number': float, 'boolean': BOOL_VALUES.__getitem__}
+TYPE_CHECKS = dict(TYPE_TESTS)
+# The same patterns for Arrow's RE2 regex kernels, which anchor the end with $ instead of \\Z
+ARROW_TYPE_PATTERNS = {kind: '^' + pattern.pattern.replace('\\Z', '$')
+                       for kind, pattern in (('integer', INT_PATTERN), ('number', FLOAT_PATTERN), ('date', DATE_PATTERN))}
+
+# Helper function to pick the narrowest type that fits every sampled value of a column
+def infer_column_type(values):
+    if not all(isinstance(value, str) or value is None for value in values):
+        return 'string'  # Values computed by --select are already typed: keep them as they are
+    present = [value for value in values if value]
+    if not present:
+        return 'null'
+    for kind, test in TYPE_TESTS:
+        if all(map(test, present)):
+            return kind
+    return 'string'
+
+# Helper function to infer a type for every column from sample rows (lists of strings)
+def infer_column_types(fieldnames, sample_rows):
+    columns = zip(*(pad_row(row, len(fieldnames)) for row in sample_rows)) if sample_rows else repeat(())
+    return {name: infer_column_type(values) for name, values in zip(fieldnames, columns)}
+
+# Helper function to give a csv.reader row exactly `width` fields (like DictReader's restval)
+def pad_row(row, width):
+    return row if len(row) == width else (row + [None] * width)[:width]
+
+# Helper function to cast one column of a batch in a single step
+def cast_column(values, kind):
+    """
+    Casts a whole column at once: map() drives the C-level pattern checks and int/float/dict
+    lookups over the column, so there is no Python code per cell in the common case. Empty
+    cells become null. The type comes from a sample, so every value is first checked against
+    the pattern that picked it: values after the sample that do not fit ('nan', '1_0', '02134')
+    are kept as strings instead of going through the looser int()/float(), and so are numbers
+    that overflow to infinity (JSON has no NaN or Infinity).
+    """
+    if kind == 'string':
+        return values
+    if kind in ('date', 'null'):
+        return [value or None for value in values]
+    caster, check = TYPE_CASTERS[kind], TYPE_CHECKS[kind]
+    try:
+        if all(values) and all(map(check, values)):
+            column = list(map(caster, values))
+        elif all(map(check, filter(None, values))):
+            column = [caster(value) if value else None for value in values]
+        else:
+            column = None
+        # filter(None, ...) also drops 0.0, which is finite anyway
+        if column is not None and (kind != 'number' or all(map(math.isfinite, filter(None, column)))):
+            return column
+    except (ValueError, KeyError, OverflowError):
+        pass
+    return [cast_or_keep(caster, check, value) for value in values]
+
+# Helper function for the slow path: cast a single cell, keeping the original string if it
+# does not fit the column type
+def cast_or_keep(caster, check, value):
+    if not value:
+        return None
+    if not check(value):
+        return value
+    try:
+        cast = caster(value)
+    except (ValueError, KeyError, OverflowError):
+        return value
+    return value if isinstance(cast, float) and not math.isfinite(cast) else cast
+
+# Helper function to turn csv.reader rows into typed dicts, one batch of columns at a time
+def typed_records(rows, fieldnames, column_types):
+    width = len(fieldnames)
+    kinds = [column_types.get(name, 'string') for name in fieldnames]
+    for batch in batched(rows, BATCH_ROWS):
+        batch = [pad_row(row, width) for row in batch if row]  # Skip blank lines like DictReader
+        if not batch:
+            continue
+        columns = [cast_column(list(values), kind) for values, kind in zip(zip(*batch), kinds)]
+        yield from map(dict, map(zip, repeat(fieldnames), zip(*columns)))
+
+# --- External Sort and Dedupe ---
+
+# Order of value types when sorting: nulls first, then booleans, numbers, strings, and arrays/objects
+SORT_TYPE_RANKS = {type(None): 0, bool: 1, int: 2, float: 2, str: 3}
+
+# Helper function to parse a size such as 512M, 2G or 1048576 into bytes
+def parse_size(text):
+    text = str(text).strip().upper().rstrip('B')
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+# Helper function to build a sort key for records (dicts) from a list of column names
+def record_sort_key(columns):
+    """
+    Values of different types cannot be compared in Python 3 (None < 'a' raises TypeError),
+    so each value is paired with a rank for its type. Untyped CSV values are all strings and
+    sort as text; use typed mode to sort numeric columns by value.
+    """
+    def sortable(value):
+        rank = SORT_TYPE_RANKS.get(type(value), 4)
+        return (rank, value) if rank < 4 else (rank, json.dumps(value, sort_keys=True))
+    if len(columns) == 1:
+        name = columns[0]
+        return lambda record: sortable(record.get(name))
+    return lambda record: tuple(sortable(record.get(name)) for name in columns)
+
+# Helper function to estimate the memory held by one record (a dict or a list of values)
+def record_size(record):
+    values = record.values() if isinstance(record, dict) else record
+    return sys.getsizeof(record) + sum(map(sys.getsizeof, values))
+
+# Helper function to drop records whose key equals the previous record's key
+def unique_sorted(records, key):
+    return (next(group) for _, group in groupby(records, key))
+
+# Helper function to pickle records that are already in order to a new spill file
+def write_run(records, spill_dir):
+    fd, spill_path = tempfile.mkstemp(suffix='.run', dir=spill_dir)
+    with os.fdopen(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as spill_file:
+        for batch in batched(records, BATCH_ROWS):
+            pickle.dump(batch, spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+    return spill_path
+
+# Helper function to sort one run of records in memory and spill it
+def spill_run(run, key, unique, spill_dir):
+    run.sort(key=key)  # Stable: equal keys keep their input order
+    return write_run(unique_sorted(run, key) if unique else run, spill_dir)
+
+# Helper function to merge several sorted spill files into one
+def merge_runs(group, key, unique, spill_dir):
+    merged = heapq.merge(*map(read_spill, group), key=key)
+    spill_path = write_run(unique_sorted(merged, key) if unique else merged, spill_dir)
+    for run_path in group:
+        os.remove(run_path)
+    return spill_path
+
+# Helper function to sort records of any size with bounded memory
+def external_sort(records, key, memory_budget=SORT_MEMORY_BUDGET, unique=False):
+    """
+    An external merge sort. Records are collected until their estimated size reaches
+    `memory_budget` bytes; that run is then sorted and pickled to a temporary spill file.
+    At the end the sorted runs are merged with heapq.merge, which holds one batch per run
+    in memory. When there are more than MERGE_FAN_IN runs, groups of runs are first merged
+    into longer runs, so only a bounded number of files is open at a time.
+    Input that fits in the budget is sorted in memory without touching the disk.
+    The sort is stable. With unique=True, only the first record of each key is kept.
+    """
+    records = iter(records)
+    with tempfile.TemporaryDirectory(prefix='csv_json_sort_') as spill_dir:
+        runs = []
+        while True:
+            run, size = [], 0
+            for record in records:
+                run.append(record)
+                if len(run) % SORT_SIZE_SAMPLE == 1:
+                    size += record_size(record) * SORT_SIZE_SAMPLE  # Sampled: sizing every record is slow
+                    if size >= memory_budget:
+                        break
+            else:
+                break  # Input exhausted: `run` holds the last, partial run
+            runs.append(spill_run(run, key, unique, spill_dir))
+        if not runs:
+            run.sort(key=key)
+            yield from unique_sorted(run, key) if unique else run
+            return
+        if run:
+            runs.append(spill_run(run, key, unique, spill_dir))
+        del run
+        print(f"🔃 Merging {len(runs)} sorted runs spilled to disk")
+        while len(runs) > MERGE_FAN_IN:
+            # Neighbouring runs are merged so earlier input stays first on equal keys (stability)
+            runs = [merge_runs(runs[i:i + MERGE_FAN_IN], key, unique, spill_dir)
+                    for i in range(0, len(runs), MERGE_FAN_IN)]
+        merged = heapq.merge(*map(read_spill, runs), key=key)
+        yield from unique_sorted(merged, key) if unique else merged
+
+# Helper function to apply --dedupe-on and --sort-by to a stream of records
+def sort_and_dedupe(records, sort_by=None, dedupe_on=None, memory_budget=SORT_MEMORY_BUDGET):
+    """
+    dedupe_on keeps the first record (in input order) for each distinct value of those
+    columns, like `sort -u`: without sort_by, the output is ordered by the dedupe columns.
+    sort_by orders the records by those columns (stable). When both name the same columns
+    one external sort does both. Otherwise it takes two: the whole input is sorted on the
+    dedupe columns (the first record of each key must be found in input order), then only the
+    deduplicated records are sorted on sort_by, so the second sort shrinks with the duplicates.
+    """
+    if dedupe_on:
+        records = external_sort(records, record_sort_key(dedupe_on), memory_budget, unique=True)
+    if sort_by and sort_by != dedupe_on:
+        records = external_sort(records, record_sort_key(sort_by), memory_budget)
+    return records
+
+# Helper function to check that --sort-by/--dedupe-on name existing columns
+def check_sort_columns(fieldnames, sort_by=None, dedupe_on=None):
+    missing = [name for name in (sort_by or []) + (dedupe_on or []) if name not in fieldnames]
+    if missing:
+        print(f"❌ Cannot sort or dedupe on unknown column(s): {', '.join(missing)}")
+        return False
+    return True
+
+# --- Parallel CSV Conversion ---
+
+# Helper class: a read-only stream over one byte range of a file
+class ByteRangeReader(io.RawIOBase):
+    """
+    Exposes bytes [start, end) of a file as a stream, so a worker can wrap its chunk in
+    io.TextIOWrapper and csv.DictReader and read it lazily instead of loading it.
+    """
+
+    def __init__(self, path, start, end):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._remaining <= 0:
+            return 0
+        n = self._file.readinto(memoryview(buffer)[:min(len(buffer), self._remaining)])
+        self._remaining -= n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+# Helper function to drop already-processed pages of a read-only memory map from our RSS.
+# Without it, every page touched stays resident, so RSS grows to the size of the file.
+def release_pages(mm, start, end):
+    if hasattr(mmap, 'MADV_DONTNEED'):
+        start -= start % mmap.PAGESIZE
+        end -= end % mmap.PAGESIZE
+        if end > start:
+            mm.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+# Helper function to count double quotes in a large span of a memory map, block by block
+def count_quotes(mm, start, end):
+    total = 0
+    for block_start in range(start, end, QUOTE_SCAN_BLOCK):
+        block_end = min(block_start + QUOTE_SCAN_BLOCK, end)
+        total += mm[block_start:block_end].count(b'"')
+        release_pages(mm, block_start, block_end)
+    return total
+
+# Helper function to split a CSV file into byte ranges that start on record boundaries
+def find_record_boundaries(csv_path, parts):
+    """
+    Returns sorted byte offsets [data_start, ..., file_size]; consecutive offsets delimit
+    chunks of whole records. data_start is just past the header record.
+
+    A newline only ends a record if it is outside quotes. Escaped quotes ("") come in
+    pairs, so "outside quotes" means an even number of '"' since the start of the file.
+    The quote count is tracked in one forward pass, so quoted fields containing
+    newlines never get split. (In UTF-8, quote and newline bytes never occur inside
+    multi-byte characters, so scanning raw bytes is safe.)
+    """
+    size = os.path.getsize(csv_path)
+    with open(csv_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        def next_record_start(pos, parity):
+            # First position after an unquoted newline at or after `pos`
+            while True:
+                newline = mm.find(b'\n', pos)
+                if newline == -1:
+                    return size
+                parity ^= mm[pos:newline].count(b'"') & 1
+                if not parity:
+                    return newline + 1
+                pos = newline + 1
+
+        data_start = next_record_start(0, 0)
+        boundaries = [data_start]
+        step = (size - data_start) / parts
+        for k in range(1, parts):
+            previous = boundaries[-1]  # Quote parity is even at every boundary
+            target = max(int(data_start + k * step), previous)
+            boundary = next_record_start(target, count_quotes(mm, previous, target) & 1)
+            if boundary > previous:
+                boundaries.append(boundary)
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return boundaries
+
+# Helper function run in a worker process: convert one byte range to a JSON body part file
+def convert_csv_range(csv_path, start, end, fieldnames, part_path, fmt, column_types=None, query=None,
+                      encoder='stdlib', compact=False, nested=False):
+    with io.TextIOWrapper(io.BufferedReader(ByteRangeReader(csv_path, start, end), READ_BUFFER_SIZE),
+                          encoding='utf-8', newline='') as chunk, \
+            open(part_path, 'wb', buffering=WRITE_BUFFER_SIZE) as part:
+        rows = csv.reader(chunk)
+        if query is not None:
+            # (columns, where, select): compiled again here, since compiled code cannot be pickled
+            indices, names, transform = row_plan(fieldnames, *query)
+            keep_extra = not any(query)
+            rows = iter_mmap_rows(csv_path, start, end, indices, len(fieldnames), keep_extra)
+            if transform is not None:
+                rows = transform(rows)
+            fieldnames = names
+        if column_types:
+            records = typed_records(rows, fieldnames, column_types)
+        elif query is not None:
+            records = map(dict, map(zip, repeat(record_keys(fieldnames, keep_extra)), rows))
+        else:
+            records = csv.DictReader(chunk, fieldnames=fieldnames)
+        if nested:
+            records = map(unflatten_plan(fieldnames), records)
+        return write_json_body(records, part, fmt, encoder, compact)
+
+# Helper function to convert a CSV file with a pool of worker processes
+def csv_to_json_parallel(csv_path, json_path, fmt, workers, column_types=None, query=None,
+                         encoder='stdlib', compact=False, nested=False):
+    """
+    Splits the CSV into `workers` record-aligned byte ranges, converts each range in its
+    own process, then concatenates the parts in order. Returns the number of rows.
+    `query` is (columns, where, select) for the memory-mapped path (see row_plan).
+    """
+    boundaries = find_record_boundaries(csv_path, workers)
+    with open(csv_path, 'rb') as f:
+        header = f.read(boundaries[0]).decode('utf-8')
+    fieldnames = next(csv.reader(io.StringIO(header, newline='')), [])
+    ranges = list(zip(boundaries, boundaries[1:]))
+    part_dir = tempfile.mkdtemp(prefix='csv_to_json_', dir=Path(json_path).resolve().parent)
+    try:
+        part_paths = [os.path.join(part_dir, f"part{i:05d}") for i in range(len(ranges))]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(convert_csv_range, csv_path, start, end, fieldnames, part_path, fmt,
+                                   column_types, query, encoder, compact, nested)
+                       for (start, end), part_path in zip(ranges, part_paths)]
+            counts = [future.result() for future in futures]
+        # Stitch the parts together in order (byte copies, no re-encoding)
+        opening, separator, closing = ARRAY_LAYOUT[compact]
+        with open_output(json_path, 'wb') as out:
+            wrote_any = False
+            for part_path, count in zip(part_paths, counts):
+                if not count:
+                    continue
+                if fmt != 'jsonl':
+                    out.write(separator if wrote_any else opening)
+                with open(part_path, 'rb') as part:
+                    shutil.copyfileobj(part, out, WRITE_BUFFER_SIZE)
+                wrote_any = True
+            if fmt != 'jsonl':
+                out.write(closing if wrote_any else b'[]')
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+    return sum(counts)
+
+# --- Memory-Mapped Fast Path ---
+
+# Helper function to cut mm[start:end] into decoded text blocks of whole records
+def iter_mmap_blocks(mm, start, end):
+    """
+    Each block ends on a newline with an even number of quotes before it (see
+    find_record_boundaries), so no record is split between blocks. Decoding a whole
+    block at once is one C call instead of one per line through the text layer.
+    """
+    pos = start
+    while pos < end:
+        stop = min(pos + MMAP_BLOCK_SIZE, end)
+        if stop < end:
+            stop = mm.find(b'\n', stop, end) + 1 or end
+        parity = mm[pos:stop].count(b'"') & 1
+        while parity and stop < end:
+            next_stop = mm.find(b'\n', stop, end) + 1 or end
+            parity ^= mm[stop:next_stop].count(b'"') & 1
+            stop = next_stop
+        yield mm[pos:stop].decode('utf-8')
+        release_pages(mm, pos, stop)
+        pos = stop
+
+# Helper function to read CSV rows from a memory map, keeping only the columns at `indices`
+def iter_mmap_rows(csv_path, start, end, indices, width, keep_extra=False):
+    """
+    Yields one tuple of strings per record in bytes [start, end) of the file.
+
+    Blocks without quotes, blank lines or stray carriage returns are split with
+    str.split(',', maxsplit): fields after the last wanted column stay one unsplit
+    remainder, so they are never materialized as separate strings. Other blocks (and
+    blocks with short rows) go through csv.reader, padded like DictReader.
+    With keep_extra, fields past the header are kept as a trailing list, like DictReader's
+    restkey (see project_rows), so blocks with any ragged row go through csv.reader.
+    """
+    pick = column_picker(indices)
+    split_fields = methodcaller('split', ',', max(indices) + 1)
+    with open(csv_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for block in iter_mmap_blocks(mm, start, end):
+            # Line endings are only normalized for the quote-free split: csv.reader gets the raw
+            # block, so a CRLF inside a quoted field is kept exactly as on the text path
+            text = block.replace('\r\n', '\n') if '\r' in block else block
+            if '"' not in text and '\r' not in text and '\n\n' not in text and not text.startswith('\n'):
+                lines = text.split('\n')
+                if not lines[-1]:
+                    lines.pop()
+                if keep_extra and text.count(',') != (width - 1) * len(lines):
+                    yield from project_rows(csv.reader(io.StringIO(block, newline='')), indices, width, keep_extra)
+                    continue
+                try:
+                    yield from list(map(pick, map(split_fields, lines)))
+                    continue
+                except IndexError:
+                    pass  # A short row: let csv.reader pad it
+            yield from project_rows(csv.reader(io.StringIO(block, newline='')), indices, width, keep_extra)
+
+# Helper function to build a function that picks the columns at `indices` out of a row, as a tuple
+def column_picker(indices):
+    return itemgetter(*indices) if len(indices) > 1 else (lambda row, i=indices[0]: (row[i],))
+
+# Helper function to project csv.reader rows, padded like DictReader; blank lines are skipped
+def project_rows(rows, indices, width, keep_extra=False):
+    pick = column_picker(indices)
+    if keep_extra:
+        # Fields past the header become one trailing list, which record_keys() files under null
+        return (pick(pad_row(row, width)) + ((row[width:],) if len(row) > width else ()) for row in rows if row)
+    return (pick(pad_row(row, width)) for row in rows if row)
+
+# Helper function to list the keys to zip projected rows with: a trailing None collects
+# the extra fields of ragged rows (keep_extra), exactly like csv.DictReader's restkey
+def record_keys(fieldnames, keep_extra):
+    return fieldnames + [None] if keep_extra else fieldnames
+
+# --- Row Filters and Projections (--where / --select) ---
+
+# Syntax allowed in --where/--select expressions: comparisons, boolean logic, arithmetic,
+# literals and a few calls. Anything else (imports, lambdas, attribute access...) is rejected.
+EXPRESSION_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+    ast.IfExp, ast.Call, ast.Name, ast.Attribute, ast.Constant, ast.Load, ast.Tuple, ast.List, ast.Set,
+)
+STRING_METHODS = {'lower', 'upper', 'strip', 'title', 'startswith', 'endswith', 'replace'}
+EXPRESSION_ERRORS = (TypeError, ValueError, AttributeError, IndexError, ZeroDivisionError, OverflowError)
+
+# Helper function to read a CSV field (or any value) as a number for comparisons: None if it is not one
+def to_number(value):
+    if not isinstance(value, str):
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+# Functions that expressions may call; col("name with spaces") reads a column by name
+EXPRESSION_FUNCTIONS = {'int': int, 'float': float, 'str': str, 'len': len, 'abs': abs, 'round': round,
+                        'min': min, 'max': max, 'number': to_number}
+
+# Helper class: checks an expression tree and rewrites column names to row lookups
+class ExpressionCompiler(ast.NodeTransformer):
+    """
+    Column names become r['name'] lookups (dotted names such as user.name refer to
+    flattened JSON columns). Columns compared or combined with a number literal are
+    wrapped in number(), so untyped CSV text works numerically: age > 30 matches "42".
+    `known` is the list of valid column names (None accepts any name).
+    """
+
+    def __init__(self, known=None):
+        self.known = known
+        self.columns = []  # Referenced columns, in first-seen order
+
+    def column(self, name, node):
+        if self.known is not None and name not in self.known:
+            raise ValueError(f"unknown column '{name}'")
+        if name not in self.columns:
+            self.columns.append(name)
+        return ast.copy_location(ast.Subscript(ast.Name('r', ast.Load()), ast.Constant(name), ast.Load()), node)
+
+    def generic_visit(self, node):
+        if not isinstance(node, EXPRESSION_NODES):
+            raise ValueError(f"{type(node).__name__} is not allowed in expressions")
+        return super().generic_visit(node)
+
+    def visit_Name(self, node):
+        if node.id in EXPRESSION_FUNCTIONS:
+            raise ValueError(f"{node.id}() must be called")
+        return self.column(node.id, node)
+
+    def visit_Attribute(self, node):
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            raise ValueError("attribute access is not allowed in expressions")
+        return self.column('.'.join([node.id] + parts[::-1]), node)
+
+    def visit_Call(self, node):
+        if node.keywords:
+            raise ValueError("keyword arguments are not allowed in expressions")
+        func = node.func
+        if isinstance(func, ast.Name) and func.id == 'col':
+            if len(node.args) != 1 or not isinstance(node.args[0], ast.Constant):
+                raise ValueError('col() takes one quoted column name')
+            return self.column(str(node.args[0].value), node)
+        node.args = [self.visit(arg) for arg in node.args]
+        if isinstance(func, ast.Name) and func.id in EXPRESSION_FUNCTIONS:
+            return node
+        if isinstance(func, ast.Attribute) and func.attr in STRING_METHODS:
+            func.value = self.visit(func.value)
+            return node
+        raise ValueError(f"unsupported function {ast.unparse(func)}()")
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        operands = numeric_operands([node.left] + node.comparators)
+        node.left, node.comparators = operands[0], operands[1:]
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        node.left, node.right = numeric_operands([node.left, node.right])
+        return node
+
+# Helper function to read column operands as numbers when they meet a number literal (age > 30, id % 2)
+def numeric_operands(operands):
+    if not any(map(is_number_literal, operands)):
+        return operands
+    return [ast.Call(ast.Name('number', ast.Load()), [operand], []) if isinstance(operand, ast.Subscript) else operand
+            for operand in operands]
+
+# Helper function to spot number literals, including negative ones (-5 is a UnaryOp)
+def is_number_literal(node):
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        node = node.operand
+    return isinstance(node, ast.Constant) and type(node.value) in (int, float)
+
+# Helper function to parse and check one expression; returns (tree, referenced column names)
+def parse_expression(text, known=None):
+    try:
+        tree = ast.parse(text.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"invalid expression {text!r}: {e.msg}") from None
+    compiler = ExpressionCompiler(known)
+    return compiler.visit(tree).body, compiler.columns
+
+# Helper function to split a --select list into (expression, output name) pairs
+def split_select(text):
+    """
+    Splits on top-level commas (commas inside brackets or strings do not count).
+    `expr as name` names an output column; a bare column keeps its own name.
+        "name, city as town, int(age) + 1 as next_age"
+    """
+    items, current, depth = [], [], 0
+    tokens = tokenize.generate_tokens(io.StringIO(text.replace('\n', ' ')).readline)
+    for token in tokens:
+        if token.type == tokenize.OP and token.string in '([{':
+            depth += 1
+        elif token.type == tokenize.OP and token.string in ')]}':
+            depth -= 1
+        if (token.type == tokenize.OP and token.string == ',' and depth == 0) or token.type == tokenize.ENDMARKER:
+            if current:
+                items.append(current)
+            current = []
+        elif token.type not in (tokenize.NEWLINE, tokenize.NL):
+            current.append(token)
+    pairs = []
+    for item in items:
+        alias = None
+        if len(item) > 2 and item[-2].string == 'as' and item[-1].type == tokenize.NAME:
+            alias, item = item[-1].string, item[:-2]
+        expression = text[item[0].start[1]:item[-1].end[1]].strip()
+        pairs.append((expression, alias or expression))
+    return pairs
+
+# Helper function to turn checked expression trees into one compiled function of a row `r`
+def compile_lambda(body, lookup):
+    """
+    `lookup(name)` gives the key for each r['name'] in the compiled code: a tuple
+    position for CSV rows, or the name itself for dict records (read with r.get).
+    """
+    class Lookups(ast.NodeTransformer):
+        def visit_Subscript(self, node):
+            self.generic_visit(node)
+            key = lookup(node.slice.value)
+            if isinstance(key, str):
+                return ast.Call(ast.Attribute(node.value, 'get', ast.Load()), [ast.Constant(key)], [])
+            node.slice = ast.Constant(key)
+            return node
+    args = ast.arguments(posonlyargs=[], args=[ast.arg('r')], kwonlyargs=[], kw_defaults=[], defaults=[])
+    body = Lookups().visit(copy.deepcopy(body))  # The same tree may be compiled more than once
+    tree = ast.fix_missing_locations(ast.Expression(ast.Lambda(args, body)))
+    return eval(compile(tree, '<expression>', 'eval'), {'__builtins__': {}, **EXPRESSION_FUNCTIONS})
+
+# Helper function to keep only rows that pass `test`, a batch at a time
+def filter_rows(rows, test):
+    """
+    filter() runs the compiled test over a whole batch without extra Python code per row.
+    A row whose test raises (for example comparing an empty field with a number) counts as
+    not matching, like NULL in SQL; only batches with such a row take the slow path.
+    """
+    for batch in batched(rows, BATCH_ROWS):
+        try:
+            yield from list(filter(test, batch))
+        except EXPRESSION_ERRORS:
+            yield from [row for row in batch if safe_call(test, row, False)]
+
+# Helper function to compute the --select columns of every row, a batch at a time
+def project_expressions(rows, project, items):
+    for batch in batched(rows, BATCH_ROWS):
+        try:
+            yield from list(map(project, batch))
+        except EXPRESSION_ERRORS:
+            # Slow path: a value that cannot be computed becomes null instead of failing the row
+            yield from [tuple(safe_call(item, row, None) for item in items) for row in batch]
+
+def safe_call(func, row, default):
+    try:
+        return func(row)
+    except EXPRESSION_ERRORS:
+        return default
+
+# Helper function to build the transform that applies a compiled filter and projection
+def query_transform(test=None, project=None, item_funcs=None):
+    def transform(rows):
+        if test is not None:
+            rows = filter_rows(rows, test)
+        if item_funcs:
+            rows = project_expressions(rows, project, item_funcs)
+        elif project is not None:
+            rows = map(project, rows)
+        return rows
+    return transform
+
+# Helper function to plan which CSV columns to read and how to filter/project them
+def row_plan(fieldnames, columns=None, where=None, select=None):
+    """
+    Compiles --columns, --where and --select against a CSV header, once.
+    Returns (indices, names, transform):
+    - indices: the header positions to read (output columns, then columns only --where uses),
+    - names: the output column names,
+    - transform: a function from rows (tuples in `indices` order) to output rows, or None.
+    The filter runs on the raw rows before any dict is built, so rejected rows are never
+    typed or encoded. Prints an error and returns None for bad expressions or columns.
+    """
+    try:
+        if select:
+            items = [(parse_expression(expression, fieldnames), name) for expression, name in split_select(select)]
+        else:
+            missing = [name for name in columns or [] if name not in fieldnames]
+            if missing:
+                raise ValueError(f"Unknown column(s): {', '.join(missing)}")
+            items = [(parse_expression(f"col({name!r})", fieldnames), name) for name in columns or fieldnames]
+        test, test_columns = parse_expression(where, fieldnames) if where else (None, [])
+    except ValueError as e:
+        print(f"❌ {e} (available: {', '.join(fieldnames)})")
+        return None
+    read = []
+    for (_, used), _ in items:
+        read.extend(name for name in used if name not in read)
+    read.extend(name for name in test_columns if name not in read)
+    lookup = {name: i for i, name in enumerate(read)}.__getitem__
+    bodies = [body for (body, _), _ in items]
+    names = [name for _, name in items]
+    test = compile_lambda(test, lookup) if test is not None else None
+    project = item_funcs = None
+    if all(isinstance(body, ast.Subscript) for body in bodies):
+        positions = [lookup(body.slice.value) for body in bodies]
+        if positions != list(range(len(read))):
+            project = column_picker(positions)  # Drops columns only --where needed, repeats, reorders
+    else:
+        project = compile_lambda(ast.Tuple(bodies, ast.Load()), lookup)
+        item_funcs = [compile_lambda(body, lookup) for body in bodies]
+    indices = [fieldnames.index(name) for name in read]
+    if test is None and project is None:
+        return indices, names, None
+    return indices, names, query_transform(test, project, item_funcs)
+
+# Helper function to compile --where/--select for dict records (flattened JSON)
+def record_plan(where=None, select=None):
+    """
+    Like row_plan, for records that are dicts: any column name is accepted and missing
+    keys read as null. Returns a function from records to records, or None on error.
+    """
+    by_name = lambda name: name  # Compile r['name'] as r.get('name')
+    try:
+        test = compile_lambda(parse_expression(where)[0], by_name) if where else None
+        items = [(parse_expression(expression)[0], name) for expression, name in split_select(select or '')]
+    except ValueError as e:
+        print(f"❌ {e}")
+        return None
+    if not items:
+        return query_transform(test)
+    names = [name for _, name in items]
+    project = compile_lambda(ast.Tuple([body for body, _ in items], ast.Load()), by_name)
+    item_funcs = [compile_lambda(body, by_name) for body, _ in items]
+    transform = query_transform(test, project, item_funcs)
+    return lambda records: map(dict, map(zip, repeat(names), transform(records)))
+
 # Helper function to convert CSV to JSON
-def csv_to_json(csv_path, json_path):
+def csv_to_json(csv_path, json_path, fmt=None, workers=1, typed=False, columns=None, encoder='stdlib',
+                compact=False, sort_by=None, dedupe_on=None, memory_budget=SORT_MEMORY_BUDGET, where=None,
+                select=None, nested=False):
     """
     Reads a CSV file and writes its contents as JSON.
+    Rows are streamed from csv.DictReader straight into the output, so memory use does not
+    grow with the file size. Use a .jsonl output (or fmt='jsonl') for JSON Lines.
+    With workers > 1, large files are converted in parallel chunks (same output).
+    With typed=True, column types are inferred from the first rows and values are written
+    as JSON numbers/booleans/null instead of strings.
+    `columns` keeps only the named columns, in that order. Large files (and projections)
+    are read through a memory map instead of the text layer (see iter_mmap_rows).
+    Compressed inputs (.gz/.bz2/.xz/.zst) are decompressed as they are read, and a
+    compressed output extension compresses the JSON as it is written. Compressed inputs
+    cannot be split into byte ranges, so they are converted by a single process.
+    `encoder` picks the JSON encoder ('stdlib', 'orjson' or 'msgspec'), and compact=True
+    drops all optional whitespace.
+    `where` keeps only rows matching an expression (city == "NY" and age > 30) and
+    `select` picks or computes the output columns ("name, int(age) + 1 as next_age");
+    both are compiled once and applied to the raw rows (see row_plan).
+    `sort_by` and `dedupe_on` (lists of column names) order and deduplicate the records
+    with an external merge sort that spills to disk past `memory_budget` bytes (see
+    sort_and_dedupe). Sorting needs the whole input, so it runs in a single process.
+    With nested=True, dotted and indexed column names (user.name, tags[0]) are turned
+    back into nested objects and arrays (see unflatten_plan).
+    Returns the number of rows written, or None if the input is missing.
     """
     if not Path(csv_path).exists():
         print(f"❌ CSV file not found: {csv_path}")
+        return None
+    if not json_encoder_available(encoder):
+        return None
+    fmt = json_output_format(json_path, fmt)
+    size = os.path.getsize(csv_path)
+    compressed = detect_compression(csv_path) is not None
+    # Only go parallel when every worker gets a meaningful amount of data
+    workers = 1 if compressed or sort_by or dedupe_on else min(workers or 1, size // PARALLEL_MIN_CHUNK_BYTES)
+    with open_input(csv_path, newline='', encoding='utf-8', buffering=READ_BUFFER_SIZE) as csvfile:
+        reader = csv.reader(csvfile)
+        fieldnames = next(reader, [])
+        query = None
+        # Without --columns/--where/--select every field is kept, even past the header (like DictReader)
+        keep_extra = not (columns or where or select)
+        if columns or where or select or (fieldnames and size >= MMAP_MIN_BYTES and not compressed):
+            plan = row_plan(fieldnames, columns, where, select)
+            if plan is None:
+                return None
+            query = (columns, where, select)
+            indices, names, transform = plan
+            if compressed:
+                reader = project_rows(reader, indices, len(fieldnames), keep_extra)
+            else:
+                # The text layer is only used for the header; the records come from the memory map
+                data_start = find_record_boundaries(csv_path, 1)[0]
+                reader = iter_mmap_rows(csv_path, data_start, size, indices, len(fieldnames), keep_extra)
+            if transform is not None:
+                reader = transform(reader)
+            fieldnames = names
+        if not check_sort_columns(fieldnames, sort_by, dedupe_on):
+            return None
+        unflatten = None
+        if nested:
+            try:
+                unflatten = unflatten_plan(fieldnames)
+            except ValueError as e:
+                print(f"❌ Cannot nest the columns of {csv_path}: {e}")
+                return None
+        column_types = None
+        if typed:
+            sample = list(islice(reader, TYPE_SAMPLE_ROWS))
+            column_types = infer_column_types(fieldnames, sample)
+            print("🔢 Column types: " + ", ".join(f"{name}={kind}" for name, kind in column_types.items()))
+            records = typed_records(chain(sample, reader), fieldnames, column_types)
+        elif query is not None:
+            records = map(dict, map(zip, repeat(record_keys(fieldnames, keep_extra)), reader))
+        else:
+            records = csv.DictReader(csvfile, fieldnames=fieldnames)
+        if sort_by or dedupe_on:
+            records = sort_and_dedupe(records, sort_by, dedupe_on, memory_budget)
+        if unflatten is not None:
+            records = map(unflatten, records)
+        if workers > 1:
+            count = csv_to_json_parallel(csv_path, json_path, fmt, workers, column_types, query, encoder, compact,
+                                         nested)
+        else:
+            count = write_json_records(records, json_path, fmt, encoder, compact)
+    print(f"✅ Converted {csv_path} to {json_path} ({count} rows)")
+    return count
+
+# --- Columnar Formats (Parquet / Arrow / Feather) ---
+
+# Helper function to map a file name to one of the supported formats
+def file_format(path):
+    return FILE_FORMATS.get(strip_compression_suffix(path).suffix.lower())
+
+# Helper function to build Arrow column types from the typed-mode inference
+def arrow_column_types(csv_path):
+    """
+    Samples the CSV with the same rules as --typed, so Parquet/Arrow columns get the
+    same types as typed JSON (and zip codes with leading zeros stay strings).
+    The sample only proposes a type: a first pass reads the whole file with those columns
+    as strings and checks every value like cast_column does, so a later '02134', 'nan' or
+    '1e999' turns the column into strings instead of being altered or aborting the write.
+    Returns (column_types for Arrow's reader, {column: kind} to cast with arrow_cast_column).
+    Integers, numbers and booleans are read as strings and cast by us, because Arrow's own
+    CSV parsing drops leading zeros and rejects '+5'. Date columns are left to Arrow, which
+    parses them into date/timestamp types.
+    """
+    with open_input(csv_path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        fieldnames = next(reader, [])
+        column_types = infer_column_types(fieldnames, list(islice(reader, TYPE_SAMPLE_ROWS)))
+    candidates = {name: kind for name, kind in column_types.items() if kind in ('integer', 'number', 'boolean', 'date')}
+    if candidates:
+        as_strings = {name: pa.string() for name, kind in column_types.items() if kind != 'date' or name in candidates}
+        for batch in read_arrow_csv(csv_path, as_strings):
+            for name, kind in list(candidates.items()):
+                if arrow_cast_column(batch.column(name), kind) is None:
+                    del candidates[name]
+            if not candidates:
+                break
+    casts = {name: kind for name, kind in candidates.items() if kind != 'date'}
+    return {name: pa.string() for name in column_types if name not in candidates or name in casts}, casts
+
+# Helper function to cast a column read as strings to the Arrow type of a --typed kind
+def arrow_cast_column(column, kind):
+    """
+    Non-empty values must match the kind's pattern (as in cast_column); empty cells become null.
+    Returns None when a value does not fit, overflows int64 or is not a finite number.
+    Date columns are only checked and returned unchanged.
+    """
+    empty = pc.equal(column, '')
+    present = pc.filter(column, pc.invert(empty))
+    if kind == 'boolean':
+        fits = pc.is_in(present, value_set=pa.array(list(BOOL_VALUES)))
+    else:
+        fits = pc.match_substring_regex(present, ARROW_TYPE_PATTERNS[kind])
+    if pc.all(fits).as_py() is False:
+        return None
+    if kind == 'date':
+        return column
+    arrow_type = {'integer': pa.int64(), 'number': pa.float64(), 'boolean': pa.bool_()}[kind]
+    try:
+        cast = pc.cast(pc.utf8_ltrim(pc.if_else(empty, None, column), '+'), arrow_type)
+    except pa.ArrowInvalid:
+        return None
+    if kind == 'number' and pc.all(pc.is_finite(cast)).as_py() is False:
+        return None
+    return cast
+
+# Helper function to read a CSV as Arrow record batches with the given column types
+def read_arrow_csv(csv_path, column_types):
+    # Plain files are read by Arrow itself; compressed ones through our decompressing stream
+    compressed = detect_compression(csv_path) is not None
+    with open_input(csv_path, 'rb') if compressed else contextlib.nullcontext(csv_path) as source:
+        yield from pa_csv.open_csv(
+            source,
+            read_options=pa_csv.ReadOptions(block_size=ARROW_BLOCK_SIZE),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types),
+        )
+
+# Helper function to read any supported file as a stream of Arrow record batches
+def iter_record_batches(input_path, fmt):
+    if fmt == 'csv':
+        column_types, casts = arrow_column_types(input_path)
+        for batch in read_arrow_csv(input_path, column_types):
+            if casts:
+                names = batch.schema.names
+                batch = pa.RecordBatch.from_arrays(
+                    [arrow_cast_column(column, casts[name]) if name in casts else column
+                     for name, column in zip(names, batch.columns)], names=names)
+            yield batch
+    elif fmt == 'parquet':
+        yield from pq.ParquetFile(input_path).iter_batches(batch_size=ARROW_BATCH_ROWS)
+    elif fmt in ('arrow', 'feather'):
+        # Feather V2 is the Arrow IPC file format; memory-mapping avoids copying the batches
+        with pa.memory_map(str(input_path)) as source:
+            reader = pa_ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+    else:
+        # JSON/JSON Lines: pass 1 merges every batch's Arrow schema while spilling the flattened
+        # records, so keys first seen late and columns that start out null get their real type.
+        # A batch's schema comes from a struct array over all of its records (from_pylist alone
+        # would only use the first record's keys). Pass 2 builds the batches from the spill
+        # against the merged schema. A type clash raises here, before the caller opens its writer.
+        fd, spill_path = tempfile.mkstemp(suffix='.spill', prefix='arrow_batches_')
+        try:
+            with os.fdopen(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as spill_file:
+                records = spill_records(map(flatten_record, iter_json_records(input_path)), spill_file)
+                schemas = [pa.schema(list(pa.array(batch).type)) for batch in batched(records, ARROW_BATCH_ROWS)]
+            if not schemas:
+                return
+            schema = pa.unify_schemas(schemas, promote_options='permissive')
+            for batch in batched(read_spill(spill_path), ARROW_BATCH_ROWS):
+                yield from pa.Table.from_pylist(batch, schema=schema).to_batches()
+        finally:
+            os.remove(spill_path)
+
+# Helper function to turn record batches back into JSON-ready dicts
+def iter_batch_records(batches):
+    for batch in batches:
+        # Dates, timestamps and decimals have no JSON type: write them as strings
+        columns = [column.cast(pa.string()) if pa.types.is_temporal(column.type) or pa.types.is_decimal(column.type)
+                   else column for column in batch.columns]
+        yield from pa.RecordBatch.from_arrays(columns, names=batch.schema.names).to_pylist()
+
+# Helper function to open a streaming writer for a columnar (or CSV) output
+def open_batch_writer(sink, fmt, schema, compression=None, compression_level=None):
+    if compression == 'none':
+        compression = None
+    if fmt == 'parquet':
+        return pq.ParquetWriter(sink, schema, compression=compression or 'none',
+                                compression_level=compression_level)
+    if fmt in ('arrow', 'feather'):
+        codec = pa.Codec(compression, compression_level) if compression else None
+        return pa_ipc.new_file(sink, schema, options=pa_ipc.IpcWriteOptions(compression=codec))
+    return pa_csv.CSVWriter(sink, schema)
+
+# Helper function to convert between any two supported formats
+def convert_file(input_path, output_path, to=None, compression='default', compression_level=None,
+                 encoder='stdlib', compact=False):
+    """
+    Converts between CSV, JSON, JSON Lines, Parquet, Arrow and Feather.
+    The input format comes from its extension, the output format from `to` or the
+    output extension. CSV/JSON pairs use the streaming converters above. Anything
+    involving a columnar format goes through pyarrow record batches, so one batch is
+    held in memory at a time. `compression` picks the Parquet/IPC codec (e.g. 'zstd',
+    'snappy', 'lz4', 'gzip', 'none'); 'default' uses the format's usual codec.
+    `encoder` and `compact` apply to JSON output, as in csv_to_json.
+    Returns the number of rows written, or None on error.
+    """
+    source_fmt = file_format(input_path)
+    target_fmt = to or file_format(output_path)
+    if not Path(input_path).exists():
+        print(f"❌ Input file not found: {input_path}")
+        return None
+    if source_fmt is None or target_fmt is None or source_fmt == target_fmt:
+        print(f"❌ Cannot convert {input_path} to {target_fmt or output_path}")
+        return None
+    if not json_encoder_available(encoder):
+        return None
+    if source_fmt not in COLUMNAR_FORMATS and target_fmt not in COLUMNAR_FORMATS:
+        if source_fmt == 'csv':
+            return csv_to_json(input_path, output_path, target_fmt, encoder=encoder, compact=compact)
+        if target_fmt == 'csv':
+            return json_to_csv(input_path, output_path)
+        return write_json_records(iter_json_records(input_path), output_path, target_fmt, encoder, compact)
+    if pa is None:
+        print("❌ pyarrow is required for Parquet/Arrow/Feather files (pip install pyarrow)")
+        return None
+    if compression == 'default':
+        compression = DEFAULT_COMPRESSION.get(target_fmt)
+
+    batches = iter_record_batches(input_path, source_fmt)
+    started = False
+    try:
+        first = next(batches, None)
+        if first is None:
+            print("No data to write.")
+            return None
+        started = True
+        if target_fmt in ('json', 'jsonl'):
+            count = write_json_records(iter_batch_records(chain([first], batches)), output_path, target_fmt,
+                                       encoder, compact)
+        else:
+            count = 0
+            with open_output(output_path, 'wb', buffering=WRITE_BUFFER_SIZE) as sink, \
+                    open_batch_writer(sink, target_fmt, first.schema, compression, compression_level) as writer:
+                for batch in chain([first], batches):
+                    writer.write_batch(batch)
+                    count += batch.num_rows
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        if started:
+            Path(output_path).unlink(missing_ok=True)  # Don't leave a half-written file behind
+        print(f"❌ Could not convert {input_path}: {e}")
+        return None
+    print(f"✅ Converted {input_path} to {output_path} ({count} rows)")
+    return count
+
+# Helper function to parse a stream of JSON values incrementally (pure-Python fallback)
+def iter_json_values(jsonfile, chunk_size=JSON_CHUNK_SIZE):
+    """
+    Yields the items of a top-level JSON array one at a time, reading the file in chunks.
+    Input that is not an array is treated as a sequence of JSON values (e.g. JSON Lines
+    or a single object) and each value is yielded in turn.
+    Only the current chunk and the item being decoded are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = jsonfile.read(chunk_size)
+    pos = 0
+    eof = not buffer
+
+    def fill():
+        # Drop consumed text and append the next chunk; returns False at end of file
+        nonlocal buffer, pos, eof, chunk_size
+        if len(buffer) - pos >= chunk_size:
+            chunk_size *= 2  # The pending item is bigger than a chunk: read more per step
+        chunk = jsonfile.read(chunk_size)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        if not chunk:
+            eof = True
+        return bool(chunk)
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return
+
+    skip(' \t\r\n\ufeff')
+    in_array = pos < len(buffer) and buffer[pos] == '['
+    if in_array:
+        pos += 1
+    separators = ' \t\r\n,' if in_array else ' \t\r\n'
+    while True:
+        skip(separators)
+        if pos >= len(buffer):
+            if in_array:
+                raise ValueError("Unexpected end of JSON input: missing ']'")
+            return
+        if in_array and buffer[pos] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof or not fill():
+                raise
+            continue
+        # A value that runs to the end of the buffer may be cut short (e.g. the number 12 of 123)
+        if end == len(buffer) and not eof and fill():
+            continue
+        pos = end
+        yield value
+
+# Helper function to stream the records of a JSON, JSON array or JSON Lines file
+def iter_json_records(json_path, parser='auto'):
+    """
+    Yields records from a JSON file without loading it all.
+    - .jsonl/.ndjson files are read line by line.
+    - Top-level arrays are parsed item by item with ijson (if installed) or the pure-Python parser.
+    - Compressed files (e.g. data.jsonl.gz) are decompressed as they are read.
+    `parser` can force 'ijson' or 'python'.
+    """
+    if strip_compression_suffix(json_path).suffix.lower() in JSONL_EXTENSIONS:
+        with open_input(json_path, encoding='utf-8', buffering=READ_BUFFER_SIZE) as jsonfile:
+            for line in jsonfile:
+                if line.strip():
+                    yield json.loads(line)
         return
-    with open(csv_path, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        rows = list(reader)
-    with open(json_path, 'w', encoding='utf-8') as jsonfile:
-        json.dump(rows, jsonfile, indent=2)
-    print(f"✅ Converted {csv_path} to {json_path}")
+    if parser == 'ijson' or (parser == 'auto' and ijson is not None):
+        if ijson is None:
+            raise ImportError("ijson is not installed (pip install ijson)")
+        with open_input(json_path, 'rb') as jsonfile:
+            first = jsonfile.read(1024).lstrip(b' \t\r\n\xef\xbb\xbf')[:1]
+        # Reopen rather than seek(0): not every decompressing stream can seek backwards
+        with open_input(json_path, 'rb') as jsonfile:
+            if first == b'[':
+                yield from ijson.items(jsonfile, 'item', use_float=True)
+            else:
+                yield from ijson.items(jsonfile, '', multiple_values=True, use_float=True)
+        return
+    with open_input(json_path, encoding='utf-8', buffering=READ_BUFFER_SIZE) as jsonfile:
+        yield from iter_json_values(jsonfile)
+
+# --- Schema Inference ---
+
+# JSON type names used in the per-column type statistics
+JSON_TYPE_NAMES = {str: 'string', int: 'integer', float: 'number', bool: 'boolean',
+                   type(None): 'null', list: 'array', dict: 'object'}
+
+# Helper function to flatten nested objects into dotted column names
+def flatten_record(record, arrays=False):
+    """
+    Turns {"user": {"name": "Ann"}} into {"user.name": "Ann"}.
+    Arrays are kept as values (written to CSV as JSON text), or with arrays=True spread
+    over indexed columns: {"tags": ["a", "b"]} becomes {"tags[0]": "a", "tags[1]": "b"},
+    and arrays of objects give names like items[0].sku. Non-object records become {"value": ...}.
+    unflatten_plan() reverses both forms.
+    """
+    if not isinstance(record, dict):
+        return {'value': record}
+    # Fast path: flat records (the common case) are returned as they are
+    kinds = set(map(type, record.values()))
+    if dict not in kinds and not (arrays and list in kinds):
+        return record
+    flat = {}
+    for key, value in record.items():
+        flatten_value(flat, value, key, arrays)
+    return flat
+
+# Helper function to write one value, and everything nested inside it, into `flat`
+def flatten_value(flat, value, name, arrays):
+    if isinstance(value, dict) and value:
+        for key, item in value.items():
+            flatten_value(flat, item, f"{name}.{key}", arrays)
+    elif arrays and isinstance(value, list):
+        for index, item in enumerate(value):  # An empty array adds no columns; unflattening gives []
+            flatten_value(flat, item, f"{name}[{index}]", arrays)
+    else:
+        flat[name] = value  # Scalars, plus empty objects and unspread arrays (kept as JSON text)
+
+# Column name parts: a key between dots, or an array index in brackets
+COLUMN_PATH_PATTERN = re.compile(r'\[([0-9]+)\]|([^.\[]+)')
+
+# Helper function to split a column name into its path: 'items[0].sku' -> ('items', 0, 'sku')
+def column_path(name):
+    path = tuple(int(index) if index else key for index, key in COLUMN_PATH_PATTERN.findall(name))
+    return path if path and isinstance(path[0], str) else (name,)
+
+# Cells that count as missing when the length of a rebuilt array is worked out
+EMPTY_CELLS = ('', None)
+
+# Helper function to arrange column names as a tree of their paths
+def column_tree(fieldnames):
+    tree = {}  # key or index -> subtree, or the column name at a leaf
+    for name in fieldnames:
+        node, path = tree, column_path(name)
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+            if not isinstance(node, dict):
+                raise ValueError(f"column '{name}' conflicts with column '{node}'")
+        if path[-1] in node:
+            raise ValueError(f"column '{name}' conflicts with another column")
+        node[path[-1]] = name
+    return tree
+
+# Helper function to list the column names under a subtree, objects in order and arrays by index
+def tree_columns(node):
+    if isinstance(node, str):
+        return [node]
+    keys = sorted(node) if all(isinstance(key, int) for key in node) else node
+    return [name for key in keys for name in tree_columns(node[key])]
+
+# Helper function to order columns so each object's and array's columns sit together (tags[0], tags[1], ...)
+def grouped_columns(fieldnames):
+    return tree_columns(column_tree(fieldnames))
+
+# Helper function to write the expression that builds one subtree of an unflatten plan
+def plan_source(node):
+    if isinstance(node, str):
+        return f"r[{node!r}]"
+    indexed = [isinstance(key, int) for key in node]
+    if all(indexed):
+        # The array ends after its last item with a non-blank cell: a chain of comparisons
+        # in the compiled code, so shorter arrays cost no extra function calls
+        items, lengths = [], []
+        for i in range(max(node) + 1):
+            items.append(plan_source(node[i]) if i in node else 'None')
+            if i in node:
+                filled = ' or '.join(f"r[{name!r}] not in EMPTY_CELLS" for name in tree_columns(node[i]))
+                lengths.insert(0, f"{i + 1} if {filled} else ")
+        return f"[{', '.join(items)}][:{''.join(lengths)}0]"
+    if any(indexed):
+        raise ValueError(f"columns {', '.join(map(str, node))} mix array indexes and object keys")
+    return '{' + ', '.join(f"{key!r}: {plan_source(child)}" for key, child in node.items()) + '}'
+
+# Helper function to compile a flat header into a function that builds nested records
+def unflatten_plan(fieldnames):
+    """
+    The header is parsed once into a tree of paths, and the tree is turned into the source
+    of one function that builds the whole nested record in a single expression:
+        ['id', 'user.name', 'tags[0]', 'tags[1]']
+        -> lambda r: {'id': r['id'], 'user': {'name': r['user.name']},
+                      'tags': [r['tags[0]'], r['tags[1]']][:2 if r['tags[1]'] not in EMPTY_CELLS else
+                                                            1 if r['tags[0]'] not in EMPTY_CELLS else 0]}
+    Each record then costs one call, with no splitting or walking of key strings.
+    Arrays end at their last item with a non-blank cell (shorter arrays leave blank
+    cells in the CSV); missing positions before that are null.
+    Raises ValueError when names conflict, e.g. 'user' next to 'user.name'.
+    """
+    return eval(f"lambda r: {plan_source(column_tree(fieldnames))}", {'EMPTY_CELLS': EMPTY_CELLS})
+
+# Helper function to compute the union of keys and per-column type counts
+def infer_schema(flat_records, sample=None):
+    """
+    Scans flattened records and returns a schema dict:
+        {"version": 1, "records": N, "sampled": bool,
+         "columns": [{"name": "user.name", "types": {"string": 10, "null": 2}}, ...]}
+    Columns keep the order in which they were first seen. With `sample`, only the first
+    `sample` records are read (a bounded pre-pass).
+    """
+    # Counting (key, type) pairs with Counter.update runs in C, so inference keeps up with parsing.
+    # Counter keeps first-seen order, which gives the column order.
+    pair_counts = Counter()
+    count = 0
+    for record in islice(flat_records, sample) if sample else flat_records:
+        count += 1
+        pair_counts.update(zip(record, map(type, record.values())))
+    columns = {}  # name -> {type name: count}
+    for (name, value_type), n in pair_counts.items():
+        types = columns.setdefault(name, {})
+        type_name = JSON_TYPE_NAMES.get(value_type, 'string')
+        types[type_name] = types.get(type_name, 0) + n
+    return {
+        'version': SCHEMA_VERSION,
+        'records': count,
+        'sampled': bool(sample),
+        'columns': [{'name': name, 'types': types} for name, types in columns.items()],
+    }
+
+# Helper functions to save and load a schema so repeat jobs can skip inference
+def save_schema(schema, schema_path):
+    with open(schema_path, 'w', encoding='utf-8') as f:
+        json.dump(schema, f, indent=2)
+
+def load_schema(schema_path):
+    with open(schema_path, encoding='utf-8') as f:
+        schema = json.load(f)
+    if not isinstance(schema, dict) or 'columns' not in schema:
+        raise ValueError(f"{schema_path} is not a converter schema file")
+    return schema
+
+# Helper function to copy records to a spill file while passing them through.
+# The spill is private to this process, so batches are pickled (much faster than JSON both ways).
+def spill_records(records, spill_file):
+    for batch in batched(records, BATCH_ROWS):
+        pickle.dump(batch, spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+        yield from batch
+
+# Helper function to read records back from a spill file
+def read_spill(spill_path):
+    with open(spill_path, 'rb', buffering=READ_BUFFER_SIZE) as spill_file:
+        while True:
+            try:
+                yield from pickle.load(spill_file)
+            except EOFError:
+                return
 
 # Helper function to convert JSON to CSV
-def json_to_csv(json_path, csv_path):
+def json_to_csv(json_path, csv_path, schema=None, sample=None, sort_by=None, dedupe_on=None,
+                memory_budget=SORT_MEMORY_BUDGET, where=None, select=None, flatten_arrays=False):
     """
     Reads a JSON file and writes its contents as CSV.
+    Records are parsed incrementally and written as they arrive, so huge arrays and
+    JSON Lines exports convert without being loaded into memory.
+
+    The CSV header is the union of every record's keys, with nested objects flattened
+    to dotted names (user.address.city). How the header is found:
+    - schema: a schema dict, or the path of a schema file. An existing file is loaded
+      and inference is skipped; a missing one is written after inference for next time.
+    - sample: infer from the first N records only, then stream the file again.
+      Keys first seen after the sample are dropped (with a warning).
+    - default: two passes. Pass 1 infers the exact schema while spilling flattened
+      records to a temporary file; pass 2 writes the CSV from the spill.
+    `sort_by` and `dedupe_on` order and deduplicate the records by (flattened) column
+    names before they are written, as in csv_to_json.
+    `where` and `select` filter and project the flattened records before the header is
+    inferred, so the CSV only has the selected columns (see record_plan).
+    Arrays are written as JSON text, or with flatten_arrays=True spread over indexed
+    columns (tags[0], items[0].sku) that csv_to_json(nested=True) turns back into arrays.
+    Returns the number of rows written, or None if there was nothing to convert.
     """
-    try:
-        with open(json_path, encoding='utf-8') as jsonfile:
-            data = json.load(jsonfile)
-    except FileNotFoundError:
+    if not Path(json_path).exists():
         print(f"❌ JSON file not found: {json_path}")
-        return
-    if not data:
-        print("No data to write.")
-        return
-    with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=data[0].keys())
+        return None
+    schema_path = None
+    if isinstance(schema, (str, Path)):
+        schema_path = Path(schema)
+        if schema_path.exists():
+            schema = load_schema(schema_path)
+            print(f"📐 Using schema {schema_path} ({len(schema['columns'])} columns)")
+            schema_path = None  # Nothing to save
+        else:
+            schema = None
+    transform = None
+    if where or select:
+        transform = record_plan(where, select)
+        if transform is None:
+            return None
+
+    # Helper function to read the flattened (and filtered/projected) records
+    def flat_records():
+        records = map(flatten_record, iter_json_records(json_path), repeat(flatten_arrays))
+        return transform(records) if transform else records
+
+    spill_path = None
+    try:
+        if schema is not None:
+            rows = flat_records()
+        elif sample:
+            schema = infer_schema(flat_records(), sample)
+            rows = flat_records()
+        else:
+            fd, spill_path = tempfile.mkstemp(suffix='.spill', prefix='json_to_csv_')
+            with os.fdopen(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as spill_file:
+                schema = infer_schema(spill_records(flat_records(), spill_file))
+            rows = read_spill(spill_path)
+        if schema_path is not None:
+            save_schema(schema, schema_path)
+            print(f"📐 Saved inferred schema to {schema_path}")
+
+        fieldnames = [column['name'] for column in schema['columns']]
+        if flatten_arrays:
+            with contextlib.suppress(ValueError):  # Conflicting names (a value that is sometimes an array) keep their order
+                fieldnames = grouped_columns(fieldnames)
+        if not check_sort_columns(fieldnames, sort_by, dedupe_on):
+            return None
+        if sort_by or dedupe_on:
+            rows = sort_and_dedupe(rows, sort_by, dedupe_on, memory_budget)
+        first = next(rows, None)
+        if first is None or not fieldnames:
+            print("No data to write.")
+            return None
+        known = set(fieldnames)
+        # Arrays (and empty objects) have no CSV equivalent: those columns are stored as JSON text
+        json_columns = [column['name'] for column in schema['columns']
+                        if 'array' in column['types'] or 'object' in column['types']]
+        count = dropped = 0
+        with open_output(csv_path, 'w', newline='', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+            writer.writeheader()
+            for batch in batched(chain([first], rows), BATCH_ROWS):
+                for row in batch:
+                    if not known.issuperset(row):
+                        dropped += 1
+                    for key in json_columns:
+                        if isinstance(row.get(key), (list, dict)):
+                            row[key] = json.dumps(row[key])
+                writer.writerows(batch)
+                count += len(batch)
+    finally:
+        if spill_path:
+            os.remove(spill_path)
+    if dropped:
+        print(f"⚠️  {dropped} records had keys outside the schema; those values were dropped.")
+    print(f"✅ Converted {json_path} to {csv_path} ({count} rows, {len(fieldnames)} columns)")
+    return count
+
+# --- Batch Directory Conversion ---
+
+# Helper function to read the outputs listed in a previous run's summary, so they are not taken as inputs
+def previous_outputs(summary_path):
+    if not summary_path.is_file():
+        return set()
+    with open(summary_path, newline='', encoding='utf-8') as f:
+        return {Path(row['output']).resolve() for row in csv.DictReader(f) if row.get('output')}
+
+# Helper function to hash a file's contents for the manifest
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Helper function to pick the output format for one input file in batch mode
+def batch_target_format(input_path, to=None, jsonl=False):
+    if to:
+        return to
+    if file_format(input_path) == 'csv':
+        return 'jsonl' if jsonl else 'json'
+    return 'csv'
+
+# Helper function run in a worker process: convert one file of a batch
+def convert_batch_file(input_path, output_path, options, known_digest=None):
+    """
+    Converts one file and returns a summary row (see SUMMARY_FIELDS) plus the input's
+    content hash. Files are skipped when `known_digest` (from the manifest) matches the
+    input, or, without a manifest, when the output is newer than the input. Messages
+    from the converters are captured so thousands of files do not flood the console.
+    """
+    start = time.perf_counter()
+    summary = {'input': input_path, 'output': output_path, 'status': 'converted', 'rows': 0,
+               'bytes_in': os.path.getsize(input_path), 'bytes_out': 0, 'seconds': 0.0, 'message': ''}
+    digest = file_digest(input_path) if options['manifest'] else None
+    output = Path(output_path)
+    if not options['force'] and output.exists():
+        if digest is not None:
+            up_to_date = digest == known_digest
+        else:
+            up_to_date = output.stat().st_mtime >= os.path.getmtime(input_path)
+        if up_to_date:
+            summary.update(status='skipped', bytes_out=output.stat().st_size)
+            return summary, digest
+    output.parent.mkdir(parents=True, exist_ok=True)
+    target_fmt = batch_target_format(input_path, options['to'], options['jsonl'])
+    sort_options = {name: options[name] for name in ('sort_by', 'dedupe_on', 'memory_budget', 'where', 'select')}
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        try:
+            if file_format(input_path) == 'csv' and target_fmt in ('json', 'jsonl'):
+                rows = csv_to_json(input_path, output_path, target_fmt, typed=options['typed'],
+                                   columns=options['columns'], encoder=options['encoder'],
+                                   compact=options['compact'], nested=options['nested'], **sort_options)
+            elif target_fmt == 'csv' and file_format(input_path) in ('json', 'jsonl'):
+                rows = json_to_csv(input_path, output_path, sample=options['sample'],
+                                   flatten_arrays=options['flatten_arrays'], **sort_options)
+            else:
+                rows = convert_file(input_path, output_path, target_fmt, options['compression'],
+                                    options['compression_level'], options['encoder'], options['compact'])
+        except Exception as e:
+            rows = None
+            output.unlink(missing_ok=True)  # A partial output would look up to date next time
+            print(f"{type(e).__name__}: {e}")
+    messages = log.getvalue().strip().splitlines()
+    if rows is None:
+        summary.update(status='failed', message=messages[-1].lstrip('❌ ') if messages else 'conversion failed')
+        digest = None  # Retry on the next run
+    else:
+        summary.update(rows=rows, bytes_out=output.stat().st_size)
+    summary['seconds'] = round(time.perf_counter() - start, 4)
+    return summary, digest
+
+# Helper function to convert every matching file in a directory tree
+def convert_directory(input_dir, output_dir, pattern='*.csv', workers=None, manifest_path=None,
+                      summary_path=None, **options):
+    """
+    Converts every file under `input_dir` matching the glob `pattern` (use '**/*.csv' to
+    recurse) into `output_dir`, keeping the relative layout. Files are spread over a
+    process pool in chunks, so start-up and task overhead are paid once per worker,
+    not once per file.
+
+    With `manifest_path`, a JSON manifest of input content hashes decides what is up to
+    date (robust to copies and touched files); otherwise output mtimes are compared.
+    A per-file summary (rows, bytes, seconds) is written to `summary_path`
+    (default: OUT/conversion_summary.csv). Returns the list of summary rows.
+
+    The output directory may be the input directory. Files listed as outputs in the
+    previous summary are not taken as inputs, so a broad pattern ('*') does not convert
+    the last run's results back. A run where an output would overwrite one of its inputs
+    is refused (returns None): use a separate output directory or a narrower pattern.
+    """
+    input_dir, output_dir = Path(input_dir), Path(output_dir)
+    if not input_dir.is_dir():
+        print(f"❌ Input directory not found: {input_dir}")
+        return None
+    if not json_encoder_available(options.get('encoder', 'stdlib')):
+        return None
+    options = {'to': None, 'jsonl': False, 'typed': False, 'columns': None, 'sample': None,
+               'compression': 'default', 'compression_level': None, 'encoder': 'stdlib', 'compact': False,
+               'sort_by': None, 'dedupe_on': None, 'memory_budget': SORT_MEMORY_BUDGET, 'where': None, 'select': None,
+               'nested': False, 'flatten_arrays': False, 'force': False, **options,
+               'manifest': bool(manifest_path)}
+    summary_path = Path(summary_path or output_dir / 'conversion_summary.csv')
+    own_files = {summary_path.resolve(), Path(manifest_path).resolve() if manifest_path else None}
+    own_files.update(previous_outputs(summary_path))
+    inputs = sorted(path for path in input_dir.glob(pattern)
+                    if path.is_file() and file_format(path) and path.resolve() not in own_files)
+    if not inputs:
+        print(f"No files matching {pattern} in {input_dir}")
+        return []
+    manifest = {}
+    if manifest_path and Path(manifest_path).exists():
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    jobs = []
+    for path in inputs:
+        relative = path.relative_to(input_dir).as_posix()
+        suffix = next(ext for ext, fmt in FILE_FORMATS.items()
+                      if fmt == batch_target_format(path, options['to'], options['jsonl']))
+        output_path = strip_compression_suffix(output_dir / relative).with_suffix(suffix)
+        jobs.append((relative, str(path), str(output_path)))
+    sources = {path.resolve(): path for path in inputs}
+    clashes = [(output_path, sources[Path(output_path).resolve()]) for _, _, output_path in jobs
+               if Path(output_path).resolve() in sources]
+    if clashes:
+        for output_path, source in clashes:
+            print(f"❌ {output_path} would overwrite the input {source}")
+        print("❌ Use an output directory outside the inputs (--out) or a pattern limited to one format (--glob)")
+        return None
+
+    start = time.perf_counter()
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    args = ([input_path for _, input_path, _ in jobs], [output_path for _, _, output_path in jobs],
+            repeat(options), [manifest.get(relative) for relative, _, _ in jobs])
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(convert_batch_file, *args, chunksize=max(1, min(64, len(jobs) // (workers * 4)))))
+    else:
+        results = list(map(convert_batch_file, *args))
+    elapsed = time.perf_counter() - start
+
+    summaries = [summary for summary, _ in results]
+    if manifest_path:
+        for (relative, _, _), (summary, digest) in zip(jobs, results):
+            if digest is not None:
+                manifest[relative] = digest
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)  # Atomic: an interrupted run never leaves half a manifest
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(summary_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
         writer.writeheader()
-        writer.writerows(data)
-    print(f"✅ Converted {json_path} to {csv_path}")
+        writer.writerows(summaries)
+
+    status = Counter(summary['status'] for summary in summaries)
+    for summary in summaries:
+        if summary['status'] == 'failed':
+            print(f"❌ {summary['input']}: {summary['message']}")
+    converted = [summary for summary in summaries if summary['status'] == 'converted']
+    rows = sum(summary['rows'] for summary in converted)
+    megabytes = sum(summary['bytes_in'] for summary in converted) / 1e6
+    print(f"✅ {status['converted']} converted, {status['skipped']} up to date, {status['failed']} failed "
+          f"({rows} rows, {megabytes:.1f} MB in {elapsed:.1f}s, {workers} process(es)); summary: {summary_path}")
+    return summaries
+
+# --- Preview ---
+
+# Helper function to read the first `limit` (decompressed) bytes of a file
+def read_head(path, codec, limit=PREVIEW_HEAD_BYTES):
+    """
+    Returns (head, complete, total): `complete` is True when the whole file fit in the
+    head, and `total` is the (estimated) decompressed size of the whole file. For a
+    compressed file, decompression goes on until `limit` bytes of the file itself have
+    been read, and the compression ratio seen so far is applied to the rest. (Reading
+    less would skew the ratio, because codecs read ahead in large chunks.)
+    """
+    with open(path, 'rb') as raw, \
+            (open_compressed(raw, 'rb', codec) if codec else contextlib.nullcontext(raw)) as stream:
+        head = stream.read(limit + 1)
+        expanded = len(head)
+        while codec and raw.tell() < limit:
+            block = stream.read(READ_BUFFER_SIZE)
+            if not block:
+                return head[:limit], len(head) <= limit, expanded  # Fully decompressed: the exact size
+            expanded += len(block)
+        total = expanded * os.path.getsize(path) / max(raw.tell(), 1) if codec else os.path.getsize(path)
+    return head[:limit], len(head) <= limit, total
+
+# Helper function to measure newlines per byte from blocks spread evenly over [start, end)
+def line_density(path, start, end):
+    span = end - start
+    if span <= 0:
+        return 0.0
+    probes = 1 if span <= PREVIEW_PROBES * PREVIEW_PROBE_BYTES else PREVIEW_PROBES
+    size = min(span, PREVIEW_PROBE_BYTES if probes > 1 else span)
+    newlines = 0
+    with open(path, 'rb') as f:
+        for i in range(probes):
+            f.seek(start + (span - size) * i // max(probes - 1, 1))
+            newlines += f.read(size).count(b'\n')
+    return newlines / (size * probes)
+
+# Helper function to estimate how many records follow the head of a file
+def estimate_rows(path, size, head, cut, head_records, total, codec, line_based):
+    """
+    Plain line-based files (CSV, JSON Lines) are sampled at PREVIEW_PROBES offsets: the
+    newline density of the probes, corrected by the records per newline seen in the head
+    (quoted CSV fields can hold newlines), gives the rest. Other files are estimated from
+    the average bytes per record in the head, applied to the `total` decompressed size.
+    """
+    if not head_records or not cut:
+        return None
+    if codec is None and line_based:
+        records_per_line = head_records / max(head.count(b'\n', 0, cut), 1)
+        return head_records + round(line_density(path, cut, size) * (size - cut) * records_per_line)
+    return max(head_records, round(total * head_records / cut))
+
+# Helper function to parse the complete JSON values at the start of a (possibly cut) text
+def parse_json_head(text, complete):
+    """
+    Returns (values, end): the items of a top-level array (or a sequence of values), and
+    the character offset after the last one. When the text was cut, the last value is
+    dropped, since it may be a truncated number or object.
+    """
+    decoder = json.JSONDecoder()
+    values, ends = [], []
+    skip = re.compile(r'[\s,]*')
+    text = text.lstrip('\ufeff')
+    pos = skip.match(text).end()
+    if text.startswith('[', pos):
+        pos += 1
+    while True:
+        pos = skip.match(text, pos).end()
+        if pos >= len(text) or text[pos] == ']':
+            break
+        try:
+            value, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break
+        values.append(value)
+        ends.append(pos)
+    if not complete and values:
+        values.pop()
+        ends.pop()
+    return values, ends[-1] if ends else 0
+
+# Helper function to describe the per-column types counted by infer_schema as one string
+def schema_types(schema):
+    return {column['name']: '|'.join(sorted(column['types'], key=column['types'].get, reverse=True))
+            for column in schema['columns']}
+
+# Helper function to preview a large file without converting (or even reading) all of it
+def preview_file(path, rows=PREVIEW_ROWS):
+    """
+    Returns a dict describing the file in milliseconds, whatever its size:
+        {"path", "format", "compression", "bytes", "columns": [...], "types": {column: type},
+         "records": [first `rows` records], "rows": row count or estimate, "exact": bool}
+    Only the first PREVIEW_HEAD_BYTES are parsed: types come from the records found there
+    (the same inference as --typed and --schema). The row count is exact for small files
+    and Parquet/Arrow/Feather (from their metadata); otherwise it is estimated by sampling
+    byte offsets (see estimate_rows). Prints an error and returns None if the file cannot
+    be read.
+    """
+    path = str(path)
+    fmt = file_format(path)
+    if not Path(path).is_file():
+        print(f"❌ File not found: {path}")
+        return None
+    if fmt is None:
+        print(f"❌ Cannot preview {path}: unknown format")
+        return None
+    start = time.perf_counter()
+    size = os.path.getsize(path)
+    codec = detect_compression(path)
+    preview = {'path': path, 'format': fmt, 'compression': codec, 'bytes': size}
+    if fmt in COLUMNAR_FORMATS:
+        if pa is None or codec:
+            print("❌ Previewing Parquet/Arrow/Feather needs pyarrow and an uncompressed file")
+            return None
+        if fmt == 'parquet':
+            parquet = pq.ParquetFile(path)
+            schema, count = parquet.schema_arrow, parquet.metadata.num_rows
+            first = next(parquet.iter_batches(batch_size=max(rows, 1)), None)
+            records = first.slice(0, rows).to_pylist() if first is not None else []
+        else:
+            with pa.memory_map(path) as source:
+                reader = pa_ipc.open_file(source)  # Only batch headers are read for the counts
+                schema = reader.schema
+                count = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+                # Copy the preview rows out before the map is closed
+                records = reader.get_batch(0).slice(0, rows).to_pylist() if reader.num_record_batches else []
+        preview.update(columns=schema.names, types={field.name: str(field.type) for field in schema},
+                       records=records, rows=count, exact=True)
+    else:
+        head, complete, total = read_head(path, codec, PREVIEW_HEAD_BYTES)
+        cut = len(head) if complete else head.rfind(b'\n') + 1
+        if fmt == 'csv':
+            parsed = [row for row in csv.reader(io.StringIO(head[:cut].decode('utf-8', 'replace'), newline='')) if row]
+            if not complete and len(parsed) > 1:
+                parsed.pop()  # May end inside a quoted field that continues past the head
+            fieldnames, sample = (parsed[0], parsed[1:]) if parsed else ([], [])
+            types = infer_column_types(fieldnames, sample[:TYPE_SAMPLE_ROWS])
+            records = [dict(zip(fieldnames, pad_row(row, len(fieldnames)))) for row in sample[:rows]]
+            line_based, head_records = True, len(sample)
+        else:
+            if fmt == 'jsonl':
+                lines = [line for line in head[:cut].split(b'\n') if line.strip()]
+                values = list(map(json.loads, lines[:max(rows, TYPE_SAMPLE_ROWS)]))
+                line_based, head_records = True, len(lines)
+            else:
+                text = head.decode('utf-8', 'ignore')
+                values, end = parse_json_head(text, complete)
+                cut = len(text[:end].encode('utf-8'))
+                line_based, head_records = False, len(values)
+                if not values:  # Records larger than the head: read just the first few
+                    values = list(islice(iter_json_records(path), rows))
+            schema = infer_schema(map(flatten_record, values[:TYPE_SAMPLE_ROWS]))
+            fieldnames, types, records = [column['name'] for column in schema['columns']], schema_types(schema), values[:rows]
+        if complete:
+            count = head_records
+        else:
+            count = estimate_rows(path, size, head, cut, head_records, total, codec, line_based)
+        preview.update(columns=fieldnames, types=types, records=records, rows=count, exact=complete)
+    preview['seconds'] = round(time.perf_counter() - start, 4)
+    return preview
+
+# Helper function to print a preview on the console
+def print_preview(preview):
+    if preview is None:
+        return
+    if preview['rows'] is None:
+        rows = 'unknown number of rows'
+    else:
+        rows = f"{preview['rows']:,} rows" if preview['exact'] else f"~{preview['rows']:,} rows (estimated)"
+    codec = f", {preview['compression']}" if preview['compression'] else ''
+    print(f"🔎 {preview['path']} ({preview['format']}{codec}, {preview['bytes'] / 1e6:.1f} MB): "
+          f"{rows}, {len(preview['columns'])} columns [{preview['seconds'] * 1000:.0f} ms]")
+    print("📐 " + ", ".join(f"{name}={kind}" for name, kind in preview['types'].items()))
+    for record in preview['records']:
+        print("   " + json.dumps(record, ensure_ascii=False, default=str))
 
 # Helper function to list files by extension
 def list_files_by_ext(ext):
@@ -65,73 +2022,177 @@ def list_files_by_ext(ext):
     """
     return sorted([str(p) for p in Path('.').glob(f'*.{ext}')])
 
-# Main function to handle CLI arguments and prompt user if needed
-def main():
+# Interactive mode: prompt for the conversion direction and file paths
+def interactive():
     """
-    Main function to handle CLI arguments and prompt user for conversion direction and file paths.
+    Prompts the user for conversion direction and file paths.
     If only an input file is provided, infer the output file name by changing the extension.
-    Lists local .csv and .json files as options for input.
+    Lists local .csv and .json files as options for input, and previews the chosen file
+    (columns, types, first records, row count) before asking for the output.
     """
-    args = sys.argv[1:]
-    if not args:
-        print("No arguments provided. Choose conversion direction:")
-        print("1. CSV to JSON")
-        print("2. JSON to CSV")
-        choice = input("Enter 1 or 2: ").strip()
-        if choice == '1':
-            csv_files = list_files_by_ext('csv')
-            if csv_files:
-                print("Available CSV files:")
-                for i, f in enumerate(csv_files, 1):
-                    print(f"  {i}. {f}")
-                csv_idx = input("Select CSV file by number or enter path: ").strip()
-                if csv_idx.isdigit() and 1 <= int(csv_idx) <= len(csv_files):
-                    csv_path = csv_files[int(csv_idx)-1]
-                else:
-                    csv_path = csv_idx
-            else:
-                csv_path = input("Enter CSV file path: ").strip()
-            json_path = input("Enter output JSON file path (leave blank to infer): ").strip()
-            if not json_path:
-                json_path = str(Path(csv_path).with_suffix('.json'))
-            csv_to_json(csv_path, json_path)
-        elif choice == '2':
-            json_files = list_files_by_ext('json')
-            if json_files:
-                print("Available JSON files:")
-                for i, f in enumerate(json_files, 1):
-                    print(f"  {i}. {f}")
-                json_idx = input("Select JSON file by number or enter path: ").strip()
-                if json_idx.isdigit() and 1 <= int(json_idx) <= len(json_files):
-                    json_path = json_files[int(json_idx)-1]
-                else:
-                    json_path = json_idx
+    print("No arguments provided. Choose conversion direction:")
+    print("1. CSV to JSON")
+    print("2. JSON to CSV")
+    choice = input("Enter 1 or 2: ").strip()
+    if choice == '1':
+        csv_files = list_files_by_ext('csv')
+        if csv_files:
+            print("Available CSV files:")
+            for i, f in enumerate(csv_files, 1):
+                print(f"  {i}. {f}")
+            csv_idx = input("Select CSV file by number or enter path: ").strip()
+            if csv_idx.isdigit() and 1 <= int(csv_idx) <= len(csv_files):
+                csv_path = csv_files[int(csv_idx)-1]
             else:
-                json_path = input("Enter JSON file path: ").strip()
-            csv_path = input("Enter output CSV file path (leave blank to infer): ").strip()
-            if not csv_path:
-                csv_path = str(Path(json_path).with_suffix('.csv'))
-            json_to_csv(json_path, csv_path)
-        else:
-            print("Invalid choice.")
-    elif args[0] == '--csv-to-json' and 2 <= len(args) <= 3:
-        csv_path = args[1]
-        if len(args) == 3:
-            json_path = args[2]
-        else:
-            json_path = str(Path(csv_path).with_suffix('.json'))
+                csv_path = csv_idx
+        else:
+            csv_path = input("Enter CSV file path: ").strip()
+        print_preview(preview_file(csv_path, 5))
+        json_path = input("Enter output JSON file path (leave blank to infer): ").strip()
+        if not json_path:
+            json_path = str(strip_compression_suffix(csv_path).with_suffix('.json'))
         csv_to_json(csv_path, json_path)
-    elif args[0] == '--json-to-csv' and 2 <= len(args) <= 3:
-        json_path = args[1]
-        if len(args) == 3:
-            csv_path = args[2]
+    elif choice == '2':
+        json_files = list_files_by_ext('json')
+        if json_files:
+            print("Available JSON files:")
+            for i, f in enumerate(json_files, 1):
+                print(f"  {i}. {f}")
+            json_idx = input("Select JSON file by number or enter path: ").strip()
+            if json_idx.isdigit() and 1 <= int(json_idx) <= len(json_files):
+                json_path = json_files[int(json_idx)-1]
+            else:
+                json_path = json_idx
         else:
-            csv_path = str(Path(json_path).with_suffix('.csv'))
+            json_path = input("Enter JSON file path: ").strip()
+        print_preview(preview_file(json_path, 5))
+        csv_path = input("Enter output CSV file path (leave blank to infer): ").strip()
+        if not csv_path:
+            csv_path = str(strip_compression_suffix(json_path).with_suffix('.csv'))
         json_to_csv(json_path, csv_path)
     else:
-        print("Usage:")
-        print("  --csv-to-json <input.csv> [output.json]")
-        print("  --json-to-csv <input.json> [output.csv]")
+        print("Invalid choice.")
+
+# Helper function to split a comma-separated list of column names
+def column_list(value):
+    return [name.strip() for name in value.split(',')]
+
+# Helper function to build the command-line parser
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Convert CSV files to JSON and JSON files to CSV. Run without arguments for interactive mode.")
+    direction = parser.add_mutually_exclusive_group(required=True)
+    direction.add_argument('--csv-to-json', nargs='+', metavar=('INPUT', 'OUTPUT'),
+                           help='Convert INPUT.csv to OUTPUT (default: INPUT with a .json extension)')
+    direction.add_argument('--json-to-csv', nargs='+', metavar=('INPUT', 'OUTPUT'),
+                           help='Convert INPUT.json to OUTPUT (default: INPUT with a .csv extension)')
+    direction.add_argument('--convert', nargs='+', metavar=('INPUT', 'OUTPUT'),
+                           help='Convert between csv/json/jsonl/parquet/arrow/feather (formats from the extensions or --to)')
+    direction.add_argument('--dir', metavar='IN',
+                           help='Batch mode: convert every file in IN matching --glob into --out')
+    direction.add_argument('--preview', metavar='FILE',
+                           help='Show the columns, types, first records and row count of FILE without converting it')
+    parser.add_argument('--preview-rows', type=int, default=PREVIEW_ROWS, metavar='N',
+                        help=f'--preview: records to show (default: {PREVIEW_ROWS})')
+    parser.add_argument('--out', metavar='OUT', help='--dir: output directory (default: IN)')
+    parser.add_argument('--glob', default='*.csv', metavar='PATTERN',
+                        help="--dir: files to convert (default: '*.csv'; use '**/*.json' to recurse)")
+    parser.add_argument('--manifest', metavar='FILE',
+                        help='--dir: skip inputs whose content hash is unchanged since the last run (JSON manifest)')
+    parser.add_argument('--summary', metavar='FILE',
+                        help='--dir: per-file summary CSV (default: OUT/conversion_summary.csv)')
+    parser.add_argument('--force', action='store_true', help='--dir: convert even up-to-date files')
+    parser.add_argument('--to', choices=sorted(set(FILE_FORMATS.values())),
+                        help='--convert: output format (default: from the OUTPUT extension)')
+    parser.add_argument('--compression', default='default',
+                        help='Parquet/Arrow/Feather codec: zstd, snappy, lz4, gzip, brotli or none '
+                             '(default: snappy for Parquet, lz4 for Feather, none for Arrow)')
+    parser.add_argument('--compression-level', type=int, metavar='N', help='Codec compression level')
+    parser.add_argument('--jsonl', action='store_true',
+                        help='Write JSON Lines (one object per line) instead of a JSON array')
+    parser.add_argument('--encoder', choices=('stdlib', 'orjson', 'msgspec'), default='stdlib',
+                        help='JSON output encoder (orjson/msgspec must be installed; default: stdlib)')
+    parser.add_argument('--compact', action='store_true',
+                        help='JSON output without indentation or spaces (much smaller files)')
+    parser.add_argument('--typed', action='store_true',
+                        help='CSV to JSON: infer column types and write numbers, booleans and nulls')
+    parser.add_argument('--nested', action='store_true',
+                        help='CSV to JSON: rebuild nested objects and arrays from dotted/indexed columns (user.name, tags[0])')
+    parser.add_argument('--flatten-arrays', action='store_true',
+                        help='JSON to CSV: spread arrays over indexed columns (tags[0], tags[1]) instead of JSON text')
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help='CSV to JSON: convert large files with N processes; --dir: files converted at once '
+                             '(0 = one per CPU core; default: 1, or one per core with --dir)')
+    parser.add_argument('--columns', type=column_list, metavar='A,B,C',
+                        help='CSV to JSON: keep only these columns, in this order')
+    parser.add_argument('--where', metavar='EXPR',
+                        help='CSV/JSON: keep only records matching EXPR, e.g. \'city == "NY" and age > 30\'')
+    parser.add_argument('--select', metavar='LIST',
+                        help='CSV/JSON: output columns or expressions, e.g. "name, city as town, int(age) + 1 as next_age"')
+    parser.add_argument('--sort-by', type=column_list, metavar='A,B',
+                        help='CSV/JSON: sort the records by these columns (external merge sort, any file size)')
+    parser.add_argument('--dedupe-on', type=column_list, metavar='A,B',
+                        help='CSV/JSON: keep only the first record for each value of these columns. With a different '
+                             '--sort-by this costs two external sorts: all records on these columns, then the kept ones')
+    parser.add_argument('--memory-budget', type=parse_size, default=SORT_MEMORY_BUDGET, metavar='SIZE',
+                        help='--sort-by/--dedupe-on: memory used before sorted runs spill to disk (e.g. 512M, 2G; default: 256M)')
+    parser.add_argument('--schema', metavar='FILE',
+                        help='JSON to CSV: reuse this schema file, or save the inferred schema to it if missing')
+    parser.add_argument('--sample', type=int, metavar='N',
+                        help='JSON to CSV: infer the header from the first N records instead of the whole file')
+    return parser
+
+# Main function to handle CLI arguments and prompt user if needed
+def main(argv=None):
+    """
+    Main function to handle CLI arguments and prompt user for conversion direction and file paths.
+    With no arguments, falls back to interactive mode.
+    """
+    args = sys.argv[1:] if argv is None else argv
+    if not args:
+        interactive()
+        return
+    parser = build_parser()
+    opts = parser.parse_args(args)
+    if opts.preview:
+        print_preview(preview_file(opts.preview, opts.preview_rows))
+        return
+    if opts.dir:
+        convert_directory(opts.dir, opts.out or opts.dir, opts.glob, opts.workers, opts.manifest, opts.summary,
+                          to=opts.to, jsonl=opts.jsonl, typed=opts.typed, columns=opts.columns,
+                          sample=opts.sample, compression=opts.compression,
+                          compression_level=opts.compression_level, encoder=opts.encoder,
+                          compact=opts.compact, sort_by=opts.sort_by, dedupe_on=opts.dedupe_on,
+                          memory_budget=opts.memory_budget, where=opts.where, select=opts.select, nested=opts.nested,
+                          flatten_arrays=opts.flatten_arrays, force=opts.force)
+        return
+    paths = opts.csv_to_json or opts.json_to_csv or opts.convert
+    if len(paths) > 2:
+        parser.error("expected an INPUT and at most one OUTPUT path")
+    if opts.convert:
+        if opts.sort_by or opts.dedupe_on or opts.where or opts.select:
+            parser.error("--sort-by/--dedupe-on/--where/--select work with --csv-to-json, --json-to-csv and --dir")
+        if len(paths) == 1 and not opts.to:
+            parser.error("--convert needs an OUTPUT path or --to FORMAT")
+        suffix = next(ext for ext, fmt in FILE_FORMATS.items() if fmt == opts.to) if opts.to else None
+        output_path = paths[1] if len(paths) == 2 else str(strip_compression_suffix(paths[0]).with_suffix(suffix))
+        convert_file(paths[0], output_path, opts.to, opts.compression, opts.compression_level,
+                     opts.encoder, opts.compact)
+    elif opts.csv_to_json:
+        csv_path = paths[0]
+        fmt = 'jsonl' if opts.jsonl else None
+        json_path = paths[1] if len(paths) == 2 else str(
+            strip_compression_suffix(csv_path).with_suffix('.jsonl' if opts.jsonl else '.json'))
+        workers = os.cpu_count() if opts.workers == 0 else opts.workers or 1
+        csv_to_json(csv_path, json_path, fmt, workers=workers, typed=opts.typed, columns=opts.columns,
+                    encoder=opts.encoder, compact=opts.compact, sort_by=opts.sort_by, dedupe_on=opts.dedupe_on,
+                    memory_budget=opts.memory_budget, where=opts.where, select=opts.select, nested=opts.nested)
+    else:
+        json_path = paths[0]
+        csv_path = paths[1] if len(paths) == 2 else str(strip_compression_suffix(json_path).with_suffix('.csv'))
+        json_to_csv(json_path, csv_path, schema=opts.schema, sample=opts.sample, sort_by=opts.sort_by,
+                    dedupe_on=opts.dedupe_on, memory_budget=opts.memory_budget, where=opts.where, select=opts.select,
+                    flatten_arrays=opts.flatten_arrays)
 
 if __name__ == "__main__":
     main()
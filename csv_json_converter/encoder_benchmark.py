@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+encoder_benchmark.py
+
+Times csv_to_json with each JSON encoder (stdlib, orjson, msgspec) on a synthetic CSV.
+
+A CSV with --rows rows (1M by default) of mixed text and numeric columns is generated in a
+temporary directory, then converted with every installed encoder in each output layout:
+indented JSON, --compact JSON and JSON Lines. Throughput is reported as MB of JSON written
+per second, next to the rows/s and the output size.
+
+Usage:
+    python encoder_benchmark.py
+    python encoder_benchmark.py --rows 200000 --typed
+    python encoder_benchmark.py --encoders stdlib orjson --layouts compact jsonl
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+
+from csv_to_json_converter_tool import csv_to_json, msgspec, orjson
+
+ENCODERS = {'stdlib': True, 'orjson': orjson is not None, 'msgspec': msgspec is not None}
+
+# Layout name -> (fmt, compact)
+LAYOUTS = {'pretty': ('json', False), 'compact': ('json', True), 'jsonl': ('jsonl', False)}
+
+CITIES = ['New York', 'Los Angeles', 'São Paulo', 'Zürich', 'Kraków', '東京']
+
+
+def build_csv(path, rows, seed=1):
+    rng = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'name', 'age', 'city', 'score', 'active', 'note'])
+        for i in range(rows):
+            writer.writerow([i, f'user{i}', rng.randint(18, 90), rng.choice(CITIES),
+                             round(rng.random() * 100, 3), rng.choice(('true', 'false')),
+                             'said "hi", then left' if i % 10 == 0 else 'ok'])
+
+
+def run(csv_path, rows, encoders, layouts, typed):
+    print(f"{'encoder':>8} {'layout':>8} {'seconds':>8} {'rows/s':>10} {'out MB':>8} {'MB/s':>7}")
+    out_dir = os.path.dirname(csv_path)
+    for layout in layouts:
+        fmt, compact = LAYOUTS[layout]
+        for encoder in encoders:
+            json_path = os.path.join(out_dir, f'out_{encoder}_{layout}.{fmt}')
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                csv_to_json(csv_path, json_path, fmt, typed=typed, encoder=encoder, compact=compact)
+            seconds = time.perf_counter() - start
+            megabytes = os.path.getsize(json_path) / 1e6
+            os.remove(json_path)
+            print(f"{encoder:>8} {layout:>8} {seconds:>8.2f} {rows / seconds:>10,.0f} "
+                  f"{megabytes:>8.1f} {megabytes / seconds:>7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON encoders of the CSV to JSON converter.")
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Rows in the synthetic CSV (default: 1M)')
+    parser.add_argument('--encoders', nargs='*', choices=sorted(ENCODERS), help='Encoders to run (default: installed)')
+    parser.add_argument('--layouts', nargs='*', choices=list(LAYOUTS), help='Output layouts (default: all)')
+    parser.add_argument('--typed', action='store_true', help='Convert with --typed (numbers and booleans)')
+    args = parser.parse_args()
+
+    encoders = [name for name in args.encoders or ENCODERS if ENCODERS[name]]
+    skipped = sorted(set(args.encoders or ENCODERS) - set(encoders))
+    if skipped:
+        print(f"Skipping (not installed): {', '.join(skipped)}")
+    with tempfile.TemporaryDirectory(prefix='encoder_benchmark_') as tmp:
+        csv_path = os.path.join(tmp, 'data.csv')
+        build_csv(csv_path, args.rows)
+        print(f"Input: {args.rows:,} rows, {os.path.getsize(csv_path) / 1e6:.1f} MB CSV"
+              f"{' (typed)' if args.typed else ''}\n")
+        run(csv_path, args.rows, encoders, args.layouts or list(LAYOUTS), args.typed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+analysis_benchmark.py
+
+Times pitch_track on a synthetic recording with 1, 2, ... worker threads to check that the
+analysis scales with the number of cores.
+
+pitch_track runs its batches on threads. That only helps if NumPy/scipy release the GIL for
+the FFTs and array math that make up almost all of the work, so the speedup reported here is
+the thing to check on a new machine or NumPy/scipy version. On a single core every worker count
+should take about the same time (the thread pool adds almost nothing).
+
+Usage:
+    python analysis_benchmark.py
+    python analysis_benchmark.py --seconds 600 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from pitch_analysis import fft_module, frame_signal, pitch_track
+
+SAMPLE_RATE = 44100
+
+
+def synthetic_recording(seconds, sr=SAMPLE_RATE):
+    # A repeating chromatic scale (4 notes a second) with light noise: every frame is voiced
+    t = np.arange(int(sr * seconds)) / sr
+    freqs = 220.0 * 2 ** (np.floor(t * 4) % 12 / 12)
+    noise = 0.01 * np.random.default_rng(0).standard_normal(len(t))
+    return (0.3 * np.sin(2 * np.pi * np.cumsum(freqs) / sr) + noise).astype(np.float32)
+
+
+def run(seconds, workers_list, rounds):
+    frames = frame_signal(synthetic_recording(seconds))
+    print(f"{seconds:.0f} s of audio, {len(frames)} frames, FFT: {fft_module.__name__}, cores: {os.cpu_count()}")
+    print(f"{'workers':>8} {'seconds':>9} {'x realtime':>11} {'speedup':>8}")
+    baseline = None
+    for workers in workers_list:
+        best = float('inf')
+        for _ in range(rounds):
+            start = time.perf_counter()
+            pitch_track(frames, SAMPLE_RATE, workers=workers)
+            best = min(best, time.perf_counter() - start)
+        baseline = baseline or best
+        print(f"{workers:>8} {best:>9.3f} {seconds / best:>11.0f} {baseline / best:>7.2f}x")
+
+
+def main():
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, cores} & set(range(1, cores + 1))) if cores > 1 else [1, 2]
+    parser = argparse.ArgumentParser(description="Time pitch_track with different worker counts.")
+    parser.add_argument('--seconds', type=float, default=300, help="Length of the synthetic recording (default: 300)")
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers, help="Worker counts to time (default: 1, 2, 4 and every core)")
+    parser.add_argument('--rounds', type=int, default=3, help="Best of this many runs per worker count (default: 3)")
+    args = parser.parse_args()
+    run(args.seconds, args.workers, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
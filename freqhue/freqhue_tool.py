@@ -9,8 +9,13 @@ Key Features:
 - Visualizes sound as color using frequency-to-hue mapping
 - Interactive on-screen piano keyboard with recording/playback
 - Microphone pitch detection with device selection
+- Live microphone mode: continuous pitch and color from a low-latency callback stream
 - Audio file and YouTube URL input support
 - Progress bars for long-running analysis
+- Streaming file analysis: long recordings are read block by block with bounded memory
+- Vectorized YIN pitch tracking: a whole track is framed with NumPy stride tricks and analyzed in FFT batches
+- Analysis cache: re-opening a file (or any widget interaction) reuses its stored analysis instantly
+- Multi-core analysis: batches of a long track are pitch-tracked in parallel and stitched back in order
 - Robust input/output device management
 - Customizable tuning (A=432 or 440 Hz)
 - Color bar visualization of note sequences
@@ -26,16 +31,24 @@ import sounddevice as sd
 import aubio
 import colorsys
 import time
+import threading
 import warnings
 from scipy.signal import resample
 import io
 import tempfile
+import zipfile
 import os
+import hashlib
+from pathlib import Path
 try:
     import yt_dlp
 except ImportError:
     yt_dlp = None
 import soundfile as sf
+from pitch_analysis import (
+    WIN_SIZE, HOP_SIZE, YIN_TOLERANCE, SILENCE_DB, MIN_NOTE_DURATION, NOTE_TOLERANCE_HZ,
+    frame_levels_db, batch_pitches, split_notes, finish_notes, stream_audio_notes,
+)
 
 # ----- Constants -----
 # Define the white and black keys for a single octave piano
@@ -62,6 +75,14 @@ NOTE_RATIOS = {
 }
 SAMPLE_RATE = 44100  # Standard audio sample rate in Hz
 BUFFER_SIZE = 1024   # Buffer size for audio input/output
+LIVE_HOP_SIZE = 256  # Live mode: one pitch reading every 256 samples (~6 ms at 44.1 kHz)
+LIVE_FPS = 30  # Live mode: screen updates per second
+LIVE_RING_SAMPLES = 1 << 16  # Live mode: ring buffer between the audio callback and the analysis thread (~1.5 s)
+LIVE_MAX_HOPS = 8  # Live mode: when the analysis falls behind, only the newest hops are analyzed
+# Analysis results (note sequences + pitch tracks) by audio content hash, reused across reruns and restarts
+ANALYSIS_CACHE_DIR = Path(__file__).resolve().parent.parent / "cache" / "freqhue"
+ANALYSIS_CACHE_BYTES = 256 << 20  # Least recently used results are evicted beyond this disk size
+ANALYSIS_CACHE_VERSION = 1  # Bump when the analysis changes so stale results are not reused
 
 # ----- Session State -----
 # Store the base tuning (A=432 or 440 Hz) in Streamlit session state
@@ -206,52 +227,251 @@ def detect_pitch(pitch_obj, input_device_idx=None):
     except Exception as e:
         st.error(f"Audio input error: {e}")
         return 0
-  # --- Audio Processing Utility ---
-def process_audio_samples(samples, sr, show_progress=True):
+
+# --- Streaming File Analysis ---
+def analyze_audio_file(source, show_progress=True):
     """
-    Process audio samples to extract a sequence of detected pitches (as frequencies) and durations.
-    Returns a list of (note_label, duration) tuples.
-    If show_progress is True, displays a Streamlit progress bar.
+    Stream an audio file (a path or an uploaded file) through the pitch tracker.
+    Returns (sequence, pitches, sample_rate, duration_seconds), where pitches is the pitch track
+    (Hz per HOP_SIZE frame, 0 when silent).
+    If show_progress is True, a progress bar and a running note count are shown while it runs.
     """
-    win_s = 2048
-    hop_s = 512
-    pitch_o = aubio.pitch("yin", win_s, hop_s, sr)
-    pitch_o.set_unit("Hz")
-    pitch_o.set_silence(-40)
-    n_frames = int((len(samples) - hop_s) / hop_s)
-    notes = []
-    last_pitch = None
-    last_time = 0
-    min_note_duration = 0.1  # seconds
     progress_bar = st.progress(0) if show_progress else None
-    for i in range(n_frames):
-        start = i * hop_s
-        end = start + hop_s
-        if end > len(samples):
-            break
-        frame = samples[start:end]
-        pitch = float(pitch_o(frame)[0])
-        t = start / sr
-        if pitch > 0:
-            note_label = f"{pitch:.2f}Hz"
-            if last_pitch is None:
-                last_pitch = note_label
-                last_time = t
-            elif abs(pitch - float(last_pitch.replace('Hz',''))) > 1.0:
-                dur = t - last_time
-                if dur >= min_note_duration:
-                    notes.append((last_pitch, dur))
-                last_pitch = note_label
-                last_time = t
-        if progress_bar and i % 10 == 0:
-            progress_bar.progress(i / n_frames)
-    # Add last note
-    if last_pitch is not None and (len(samples)/sr - last_time) >= min_note_duration:
-        notes.append((last_pitch, len(samples)/sr - last_time))
+    status = st.empty() if show_progress else None
+    sequence = []
+    pitch_blocks = []
+    with sf.SoundFile(source) as sound_file:
+        sr = sound_file.samplerate
+        duration = sound_file.frames / sr
+        for notes, pitches, fraction in stream_audio_notes(sound_file):
+            sequence.extend(notes)
+            pitch_blocks.append(pitches)
+            if progress_bar:
+                progress_bar.progress(fraction)
+                status.caption(f"{len(sequence)} notes found in the first {fraction * duration:.0f}s")
     if progress_bar:
-        progress_bar.progress(1.0)
         progress_bar.empty()
-    return notes
+        status.empty()
+    return sequence, np.concatenate(pitch_blocks), sr, duration
+
+# --- Analysis Cache ---
+def upload_digest(source):
+    """
+    Content hash (BLAKE2b) of an uploaded file or a file path.
+    Streamlit reruns the whole script on every interaction, so the digest of an upload is
+    remembered in session state by its file_id and large uploads are hashed only once.
+    """
+    file_id = getattr(source, 'file_id', None)
+    digests = st.session_state.setdefault('upload_digests', {})
+    if file_id is not None and file_id in digests:
+        return digests[file_id]
+    digest = hashlib.blake2b(digest_size=20)
+    if hasattr(source, 'getbuffer'):
+        digest.update(source.getbuffer())
+    else:
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    if file_id is not None:
+        digests[file_id] = digest.digest()
+    return digest.digest()
+
+def analysis_cache_key(identity):
+    """
+    Cache key for an audio identity (content hash bytes, or a stable id such as a URL) plus every
+    parameter that changes the result. Tuning only changes colors, so it is not part of the key.
+    """
+    params = f"{ANALYSIS_CACHE_VERSION}:{WIN_SIZE}:{HOP_SIZE}:{YIN_TOLERANCE}:{SILENCE_DB}:{MIN_NOTE_DURATION}:{NOTE_TOLERANCE_HZ}"
+    return hashlib.blake2b(identity + params.encode(), digest_size=16).hexdigest()
+
+def load_cached_analysis(key, cache_dir=ANALYSIS_CACHE_DIR):
+    """
+    Returns the cached (sequence, pitches, sample_rate, duration) for key, or None.
+    A hit refreshes the file's modification time, which is what LRU eviction goes by.
+    """
+    path = Path(cache_dir) / f"{key}.npz"
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            note_pitches, note_durations, pitches, meta = data['note_pitches'], data['note_durations'], data['pitches'], data['meta']
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+        st.sidebar.warning(f"Ignoring unreadable analysis cache {path.name}: {e}")
+        return None
+    sequence = [(f"{pitch:.2f}Hz", dur) for pitch, dur in zip(note_pitches.tolist(), note_durations.tolist())]
+    return sequence, pitches, int(meta[0]), float(meta[1])
+
+def save_cached_analysis(key, analysis, cache_dir=ANALYSIS_CACHE_DIR, max_bytes=ANALYSIS_CACHE_BYTES):
+    """
+    Store an analysis as a compressed .npz: note pitches (float32, the label is rebuilt from them),
+    note durations (float64), the pitch track (float32) and [sample_rate, duration].
+    Then evict least recently used entries until the cache fits in max_bytes.
+    """
+    sequence, pitches, sr, duration = analysis
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # A unique temp file per write, so sessions analyzing the same audio never write into each other's file
+    with tempfile.NamedTemporaryFile(dir=cache_dir, suffix='.tmp', delete=False) as f:
+        tmp_path = Path(f.name)
+        np.savez_compressed(
+            f,
+            note_pitches=np.array([float(note.replace('Hz', '')) for note, _ in sequence], dtype=np.float32),
+            note_durations=np.array([dur for _, dur in sequence], dtype=np.float64),
+            pitches=np.asarray(pitches, dtype=np.float32),
+            meta=np.array([sr, duration], dtype=np.float64),
+        )
+    tmp_path.replace(cache_dir / f"{key}.npz")  # Atomic swap so a reader never sees a half-written file
+    evict_analysis_cache(cache_dir, max_bytes)
+
+def evict_analysis_cache(cache_dir=ANALYSIS_CACHE_DIR, max_bytes=ANALYSIS_CACHE_BYTES):
+    """
+    Delete the least recently used cache files until their total size is at most max_bytes.
+    """
+    entries = []
+    for path in Path(cache_dir).glob('*.npz'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+def pitch_contour_chart(pitches, sr, max_points=2000):
+    """
+    Plot the pitch track (Hz over time) of an analyzed file under its color bar.
+    Long tracks are thinned to at most max_points frames so the chart stays light;
+    silent frames are left as gaps.
+    """
+    if len(pitches) == 0:
+        return
+    step = -(-len(pitches) // max_points)  # Ceiling division
+    shown = np.asarray(pitches[::step], dtype=np.float64)
+    shown[shown <= 0] = np.nan
+    times = np.arange(len(pitches))[::step] * HOP_SIZE / sr
+    st.line_chart({'time (s)': times, 'pitch (Hz)': shown}, x='time (s)', y='pitch (Hz)', height=200)
+
+# --- Live Pitch Tracking ---
+class SampleRing:
+    """
+    Single-producer/single-consumer ring buffer for audio samples, without locks.
+    - The audio callback is the only writer: it copies a block in, then advances `written`.
+    - The analysis thread is the only reader: it copies samples out up to `written`, then advances `consumed`.
+    - Each counter only grows and is assigned by one thread, so neither side ever waits on the other.
+      A reader that falls more than `size` samples behind skips to the newest audio.
+    - A parallel ring stores when each sample arrived, so the reader can tell how old its audio is.
+    """
+    def __init__(self, size=LIVE_RING_SAMPLES):
+        self.buffer = np.zeros(size, dtype=np.float32)
+        self.arrivals = np.zeros(size, dtype=np.float64)
+        self.size = size
+        self.written = 0
+        self.consumed = 0
+
+    def write(self, samples):
+        start = self.written % self.size
+        first = min(len(samples), self.size - start)
+        now = time.perf_counter()
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:len(samples) - first] = samples[first:]
+        self.arrivals[start:start + first] = now
+        self.arrivals[:len(samples) - first] = now
+        self.written += len(samples)
+
+    def read(self, multiple=1):
+        """
+        Returns (samples, arrived_at): every unread sample, rounded down to a multiple of `multiple`
+        (the rest stays unread), and the perf_counter() time at which the newest of them arrived.
+        """
+        written = self.written
+        # Audio that was overwritten before we got to it is skipped (keep a block of slack for the writer)
+        self.consumed = max(self.consumed, written - self.size + LIVE_HOP_SIZE)
+        count = (written - self.consumed) // multiple * multiple
+        start = self.consumed % self.size
+        samples = np.take(self.buffer, np.arange(start, start + count), mode='wrap')
+        arrived_at = self.arrivals[(start + count - 1) % self.size] if count else None
+        self.consumed += count
+        return samples, arrived_at
+
+def live_pitch_worker(ring, sr, live, stop_event, win_s=WIN_SIZE, hop_s=LIVE_HOP_SIZE):
+    """
+    Background thread: turn each new hop of microphone audio into a pitch as soon as it arrives.
+    - Keeps the last win_s - hop_s samples, so every new hop completes one analysis window.
+    - All windows that are ready are analyzed together with batch_pitches (same YIN as file analysis).
+    - If it falls more than LIVE_MAX_HOPS behind, only the newest hops are analyzed so readings never go stale.
+    - Publishes the newest reading in live['pitch'], live['level'] and live['latency'] (seconds from
+      the newest analyzed hop arriving to its pitch being ready), and appends finished notes to live['notes'].
+    - When stopped, the note still sounding is closed and appended too.
+    """
+    history = np.zeros(win_s - hop_s, dtype=np.float32)
+    segmenter = {}
+    hops_done = 0
+    while not stop_event.is_set():
+        fresh, arrived_at = ring.read(hop_s)
+        if len(fresh) == 0:
+            time.sleep(hop_s / sr / 4)
+            continue
+        signal = np.concatenate((history, fresh))
+        history = signal[-(win_s - hop_s):]
+        n_hops = len(fresh) // hop_s
+        frames = np.lib.stride_tricks.sliding_window_view(signal, win_s)[::hop_s][-LIVE_MAX_HOPS:]
+        pitches = batch_pitches(frames, sr)
+        live['notes'].extend(split_notes(pitches, sr, segmenter, first_frame=hops_done + n_hops - len(frames), hop_s=hop_s))
+        hops_done += n_hops
+        live['pitch'] = float(pitches[-1])
+        live['level'] = float(frame_levels_db(frames[-1:], hop_s)[0])
+        live['latency'] = time.perf_counter() - arrived_at
+    live['notes'].extend(finish_notes(segmenter, hops_done * hop_s / sr))
+
+def live_pitch_view(input_device_idx, tuning):
+    """
+    Show the microphone's pitch and color continuously, until live mode is switched off.
+    - A sounddevice.InputStream callback copies each LIVE_HOP_SIZE block into a SampleRing.
+      It does no analysis, so the audio thread never blocks.
+    - live_pitch_worker (a background thread) turns every hop into a pitch.
+    - This loop only redraws the newest reading, LIVE_FPS times a second.
+    Switching the toggle off reruns the script, which interrupts this loop. The stream and the thread are
+    then closed, and the notes heard so far become the note sequence.
+    """
+    sr = int(sd.query_devices(input_device_idx, 'input')['default_samplerate'])
+    ring = SampleRing()
+    live = {'pitch': 0.0, 'level': -np.inf, 'latency': 0.0, 'notes': [], 'overflows': 0}
+    stop_event = threading.Event()
+
+    def callback(indata, frames, time_info, status):
+        if status.input_overflow:
+            live['overflows'] += 1
+        ring.write(indata[:, 0])
+
+    worker = threading.Thread(target=live_pitch_worker, args=(ring, sr, live, stop_event), daemon=True)
+    display = st.empty()
+    try:
+        with sd.InputStream(device=input_device_idx, channels=1, samplerate=sr, blocksize=LIVE_HOP_SIZE,
+                            dtype='float32', latency='low', callback=callback):
+            worker.start()
+            while True:
+                pitch = live['pitch']
+                color = freq_to_color(pitch, tuning)
+                display.markdown(
+                    f"**Live Frequency:** `{pitch:.2f} Hz` · level `{live['level']:.0f} dB` · "
+                    f"analysis delay `{live['latency'] * 1000:.0f} ms` · overflows `{live['overflows']}`"
+                    f"<div style='width:100%;height:100px;background-color:{color};'></div>",
+                    unsafe_allow_html=True,
+                )
+                time.sleep(1 / LIVE_FPS)
+    except Exception as e:
+        st.error(f"Audio input error: {e}")
+    finally:
+        stop_event.set()
+        if worker.is_alive():
+            worker.join()
+        if live['notes']:
+            st.session_state['note_sequence'] = live['notes']
 
 # --- Recording and Sequence Visualization Utilities ---
 def recording_controls():
@@ -346,6 +566,12 @@ if input_mode == "Microphone Pitch Detection":
                 record_note(note_label)
                 st.markdown(f"**Detected Frequency:** `{detected:.2f} Hz`")
                 st.markdown(f"<div style='width:100%;height:100px;background-color:{color};'></div>", unsafe_allow_html=True)
+    # Live mode: continuous pitch from a callback stream instead of one blocking 1-second clip per click
+    if st.toggle("🔴 Live pitch tracking", help="Track pitch continuously; switch off to keep the notes heard as the sequence."):
+        if selected_input_idx is None:
+            st.error("No input device available for pitch detection.")
+        else:
+            live_pitch_view(input_devices[selected_input_idx]['index'], tuning)
     sequence_color_bar()
 
 elif input_mode == "On-Screen Keyboard":
@@ -384,25 +610,26 @@ elif input_mode == "Audio File/YouTube":
     recording_controls()
     audio_file = st.file_uploader("Upload audio file (wav/mp3/flac)", type=["wav", "mp3", "flac"])
     yt_url = st.text_input("Or enter a YouTube URL to analyze audio:")
-    samples = None
+    sequence = None
     sr = SAMPLE_RATE
     if audio_file is not None:
-        # Read audio file
+        # Reuse the cached analysis of this exact content, else stream the file through the pitch tracker
         try:
-            data, sr = sf.read(audio_file)
-            if data.ndim > 1:
-                data = data[:,0]  # Use first channel
-            samples = data.astype(np.float32)
+            analysis_key = analysis_cache_key(upload_digest(audio_file))
+            analysis = load_cached_analysis(analysis_key)
+            if analysis is None:
+                analysis = analyze_audio_file(audio_file, show_progress=True)
+                save_cached_analysis(analysis_key, analysis)
+            sequence, pitches, sr, duration = analysis
         except Exception as e:
             st.error(f"Could not read audio file: {e}")
-        if samples is not None:
-            st.success(f"Loaded audio, sample rate: {sr}, duration: {len(samples)/sr:.2f}s")
-            # Extract sequence with progress
-            sequence = process_audio_samples(samples, sr, show_progress=True)
+        if sequence is not None:
+            st.success(f"Analyzed audio, sample rate: {sr}, duration: {duration:.2f}s")
             st.session_state['note_sequence'] = sequence
             st.session_state['recording'] = False
             st.session_state['last_note_time'] = None
             sequence_color_bar()
+            pitch_contour_chart(pitches, sr)
             if st.button('▶️ Play Sequence', key='play_sequence_audiofile') and sequence:
                 for note, dur in sequence:
                     try:
@@ -413,7 +640,12 @@ elif input_mode == "Audio File/YouTube":
                         play_note(freq)
                     time.sleep(dur)
     elif yt_url:
-        if yt_dlp is None:
+        # A video's audio does not change, so the URL identifies it and a cache hit skips the download
+        analysis_key = analysis_cache_key(f"youtube:{yt_url}".encode())
+        analysis = load_cached_analysis(analysis_key)
+        if analysis is not None:
+            sequence, pitches, sr, duration = analysis
+        elif yt_dlp is None:
             st.error("yt-dlp is not installed. Please install it to use YouTube audio.")
         else:
             ffmpeg_path = '/usr/bin/ffmpeg'  # Linux default
@@ -437,21 +669,20 @@ elif input_mode == "Audio File/YouTube":
                     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                         info = ydl.extract_info(yt_url, download=True)
                         wav_filename = os.path.join(tmpdir, f"{info['id']}.wav")
+                        # Analyze while the temp dir (and the downloaded file) still exists
                         try:
-                            data, sr = sf.read(wav_filename)
-                            if data.ndim > 1:
-                                data = data[:,0]
-                            samples = data.astype(np.float32)
+                            analysis = analyze_audio_file(wav_filename, show_progress=True)
+                            save_cached_analysis(analysis_key, analysis)
+                            sequence, pitches, sr, duration = analysis
                         except Exception as e:
                             st.error(f"Could not read downloaded audio: {e}")
-        if samples is not None:
-            st.success(f"Loaded audio, sample rate: {sr}, duration: {len(samples)/sr:.2f}s")
-            # Extract sequence with progress
-            sequence = process_audio_samples(samples, sr, show_progress=True)
+        if sequence is not None:
+            st.success(f"Analyzed audio, sample rate: {sr}, duration: {duration:.2f}s")
             st.session_state['note_sequence'] = sequence
             st.session_state['recording'] = False
             st.session_state['last_note_time'] = None
             sequence_color_bar()
+            pitch_contour_chart(pitches, sr)
             if st.button('▶️ Play Sequence', key='play_sequence_youtube') and sequence:
                 for note, dur in sequence:
                     try:
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+pitch_analysis.py
+
+Pitch tracking and note segmentation for FreqHue, kept free of Streamlit and audio devices
+so it can be imported (and tested) on its own. freqhue_tool.py builds its UI on top of it.
+
+Key Features:
+- Vectorized YIN pitch tracking: a whole track is framed with NumPy stride tricks and analyzed in FFT batches
+- Multi-core analysis: batches of a long track are pitch-tracked in parallel and stitched back in order
+- Incremental note segmentation that carries the note in progress across chunks
+- Streaming file analysis: long recordings are read block by block with bounded memory
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import numpy as np
+try:
+    # scipy's FFTs are several times faster than numpy's for float32 frames; numpy is the fallback
+    from scipy import fft as fft_module
+except ImportError:
+    fft_module = np.fft
+
+# ----- Constants -----
+WIN_SIZE = 2048      # Analysis window for audio file pitch tracking (samples)
+HOP_SIZE = 512       # Step between analysis windows (samples)
+YIN_TOLERANCE = 0.15     # YIN threshold on the normalized difference (aubio's default)
+YIN_SHORT_LAGS = 512     # Lags searched for a dip before the full curve (pitches above ~86 Hz at 44.1 kHz)
+SILENCE_DB = -40         # Frames quieter than this (dB) count as unvoiced
+MIN_NOTE_DURATION = 0.1  # Shorter notes are dropped from the sequence (seconds)
+NOTE_TOLERANCE_HZ = 1.0  # Pitch drift that starts a new note (Hz)
+PITCH_BATCH_FRAMES = 256  # Frames per FFT batch, the unit of work for one core (~10 MB of scratch)
+ANALYSIS_WORKERS = os.cpu_count() or 1  # Cores used for pitch tracking
+STREAM_BLOCK_FRAMES = 4096  # Pitch frames per block read from an audio file (~48 s at 44.1 kHz)
+
+# --- Batch Pitch Tracking ---
+def frame_signal(samples, win_s=WIN_SIZE, hop_s=HOP_SIZE):
+    """
+    Slice a mono signal into overlapping analysis windows without copying them.
+    - Frame i holds the win_s samples ending at (i+1)*hop_s, just like aubio's sliding input buffer.
+    - The signal is zero-padded on the left so the first frames are full length.
+    - sliding_window_view(...)[::hop_s] is a strided (n_frames, win_s) view over the padded signal.
+    """
+    n_frames = max((len(samples) - hop_s) // hop_s, 0)
+    if n_frames == 0:
+        return np.empty((0, win_s), dtype=np.float32)
+    padded = np.concatenate((np.zeros(win_s - hop_s, dtype=np.float32), np.asarray(samples[:n_frames * hop_s], dtype=np.float32)))
+    return np.lib.stride_tricks.sliding_window_view(padded, win_s)[::hop_s]
+
+def frame_levels_db(frames, hop_s=HOP_SIZE):
+    """
+    Loudness of the newest hop of each frame in dB (aubio's silence detector).
+    Math:
+    - level = mean(x^2) over the hop_s samples that entered the window
+    - dB = 10 * log10(level)
+    """
+    hops = frames[:, -hop_s:].astype(np.float64)
+    with np.errstate(divide='ignore'):
+        return 10 * np.log10(np.einsum('ij,ij->i', hops, hops) / hop_s)
+
+def yin_cmnd(x, lags):
+    """
+    Cumulative mean normalized difference for lags 0..lags-1 of each row of x (see yin_batch).
+    Rows are W + lags samples long: the W-sample window and the lags samples it slides over,
+    so the FFTs only need to be W + lags long and the energies come from a sliding sum.
+    """
+    n = x.shape[1]
+    W = n - lags
+    # Cross-correlation of the first W samples with the whole row; lags < n - W never wrap around
+    spectrum = fft_module.rfft(x, axis=1)
+    spectrum *= np.conj(fft_module.rfft(x[:, :W], n=n, axis=1))
+    corr = fft_module.irfft(spectrum, n=n, axis=1)[:, :lags]
+    # E(0) + E(tau): start at 2 * E(0), then add the sample entering and drop the one leaving
+    square = np.square(x)
+    diff = np.empty((len(x), lags), dtype=np.float32)
+    diff[:, 0] = 2 * square[:, :W].sum(axis=1)
+    np.subtract(square[:, W:n - 1], square[:, :lags - 1], out=diff[:, 1:])
+    np.cumsum(diff, axis=1, out=diff)
+    diff -= 2 * corr
+    diff[:, 0] = 0
+    running = np.cumsum(diff[:, 1:], axis=1)
+    cmnd = np.ones_like(diff)
+    np.divide(diff[:, 1:] * np.arange(1, lags, dtype=np.float32), running, out=cmnd[:, 1:], where=running != 0)
+    return cmnd
+
+def refined_pitch(cmnd, period, sr):
+    """
+    Pitch from the chosen lag of each cmnd row, refined with a parabola through its neighbours.
+    """
+    rows = np.arange(len(cmnd))
+    last = cmnd.shape[1] - 1
+    inner = (period > 0) & (period < last)
+    left = cmnd[rows, np.maximum(period - 1, 0)]
+    mid = cmnd[rows, period]
+    right = cmnd[rows, np.minimum(period + 1, last)]
+    curve = left - 2 * mid + right
+    shift = np.zeros(len(cmnd))
+    np.divide(0.5 * (left - right), curve, out=shift, where=inner & (curve != 0))
+    period = period + shift
+    pitch = np.zeros(len(cmnd))
+    np.divide(sr, period, out=pitch, where=period > 0)
+    return pitch
+
+def yin_batch(frames, sr, tolerance=YIN_TOLERANCE, short_lags=YIN_SHORT_LAGS):
+    """
+    Run the YIN pitch estimator over a (n, win_s) matrix of frames at once.
+    Math (per frame x, tau = lag, W = win_s / 2):
+    - Difference: d(tau) = sum_j (x[j] - x[j+tau])^2 = E(0) + E(tau) - 2 * r(tau), j < W
+      where E are window energies (from a sliding sum) and r is the cross-correlation (from an FFT)
+    - Normalized: d'(tau) = d(tau) * tau / sum(d[1..tau]), d'(0) = 1
+    - Period: first dip below tolerance that is a local minimum, else the global minimum,
+      refined with a parabola through its neighbours
+    - Pitch = sr / period
+    The dip is looked for in the first short_lags lags first (pitches above ~86 Hz at 44.1 kHz).
+    That needs FFTs of W + short_lags samples instead of 2W. Only frames without a dip there get
+    the curve over all W lags, so the pitches are the ones a search over every lag finds.
+    Returns an array of frequencies in Hz, one per frame.
+    """
+    # float32 like aubio's own samples: half the memory traffic of float64 at the same accuracy
+    x = np.asarray(frames, dtype=np.float32)
+    W = x.shape[1] // 2
+    pitch = np.zeros(len(x))
+    # First local minimum under the tolerance (lags 2..W-4, as in aubio), else the global minimum
+    short_lags = min(short_lags, W - 3)
+    cmnd = yin_cmnd(x[:, :W + short_lags], short_lags)
+    dips = (cmnd[:, 2:-1] < tolerance) & (cmnd[:, 2:-1] < cmnd[:, 3:])
+    found = dips.any(axis=1)
+    pitch[found] = refined_pitch(cmnd[found], dips[found].argmax(axis=1) + 2, sr)
+    rest = ~found
+    if rest.any():
+        cmnd = yin_cmnd(x[rest], W)
+        dips = (cmnd[:, 2:W - 3] < tolerance) & (cmnd[:, 2:W - 3] < cmnd[:, 3:W - 2])
+        period = np.where(dips.any(axis=1), dips.argmax(axis=1) + 2, cmnd.argmin(axis=1))
+        pitch[rest] = refined_pitch(cmnd, period, sr)
+    return pitch
+
+def batch_pitches(batch, sr, silence_db=SILENCE_DB):
+    """
+    Pitch of each frame in one batch, with 0 for frames quieter than silence_db.
+    """
+    pitches = np.zeros(len(batch), dtype=np.float32)
+    voiced = frame_levels_db(batch) >= silence_db
+    if voiced.any():
+        pitches[voiced] = yin_batch(batch[voiced], sr)
+    return pitches
+
+def pitch_track(frames, sr, silence_db=SILENCE_DB, batch_frames=PITCH_BATCH_FRAMES, workers=ANALYSIS_WORKERS, progress=None):
+    """
+    Estimate the pitch of every frame, with 0 for silent frames.
+    - frames is cut into segments of batch_frames. Their windows overlap the neighbouring segments
+      by win_s - hop_s samples, because they are views on the same signal.
+    - Segments are analyzed on a pool of `workers` threads. NumPy's FFTs and array math release
+      the GIL, so the threads really run on separate cores. Threads, unlike processes, share the
+      frames view without pickling it, and never re-run this Streamlit script.
+    - Results come back in order and are stitched into one pitch track, so the note segmentation
+      (split_notes) sees no seams and notes that span a segment boundary stay whole.
+    progress, if given, is called with the completed fraction after each segment.
+    """
+    pitches = np.zeros(len(frames), dtype=np.float32)
+    starts = range(0, len(frames), batch_frames)
+    segments = [frames[start:start + batch_frames] for start in starts]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(segments)))) as pool:
+        for start, segment_pitches in zip(starts, pool.map(partial(batch_pitches, sr=sr, silence_db=silence_db), segments)):
+            pitches[start:start + len(segment_pitches)] = segment_pitches
+            if progress:
+                progress((start + len(segment_pitches)) / len(frames))
+    return pitches
+
+def split_notes(pitches, sr, segmenter, first_frame=0, hop_s=HOP_SIZE, tolerance_hz=NOTE_TOLERANCE_HZ, min_note_duration=MIN_NOTE_DURATION):
+    """
+    Extend a running note segmentation with the next chunk of a pitch track.
+    - segmenter is a dict holding the note in progress ('pitch', 'start'); it carries over between chunks.
+    - first_frame is the index of pitches[0] in the whole track, so times stay absolute.
+    - Unvoiced frames (pitch 0) are skipped; they neither start nor end a note.
+    - A note ends when a voiced frame drifts more than tolerance_hz from the note's first pitch.
+    - Notes shorter than min_note_duration are dropped.
+    Returns the (note_label, duration) tuples that ended inside this chunk.
+    """
+    voiced = np.flatnonzero(pitches > 0)
+    times = ((voiced + first_frame) * hop_s / sr).tolist()
+    notes = []
+    # The boundary scan depends on the current note, so it walks plain floats, not strings
+    for t, pitch in zip(times, pitches[voiced].tolist()):
+        current = segmenter.get('pitch')
+        if current is None:
+            segmenter.update(pitch=pitch, start=t)
+        elif abs(pitch - current) > tolerance_hz:
+            if t - segmenter['start'] >= min_note_duration:
+                notes.append((f"{current:.2f}Hz", t - segmenter['start']))
+            segmenter.update(pitch=pitch, start=t)
+    return notes
+
+def finish_notes(segmenter, duration, min_note_duration=MIN_NOTE_DURATION):
+    """
+    Close the note in progress at the end of the audio (duration in seconds).
+    """
+    if segmenter.get('pitch') is None or duration - segmenter['start'] < min_note_duration:
+        return []
+    return [(f"{segmenter['pitch']:.2f}Hz", duration - segmenter['start'])]
+
+def segment_notes(pitches, sr, duration):
+    """
+    Turn a whole pitch track into a list of (note_label, duration) tuples.
+    Each note lasts until the next one starts (the last one until the end of the audio).
+    """
+    segmenter = {}
+    return split_notes(pitches, sr, segmenter) + finish_notes(segmenter, duration)
+
+# --- Streaming File Analysis ---
+def stream_audio_notes(sound_file, block_frames=STREAM_BLOCK_FRAMES, win_s=WIN_SIZE, hop_s=HOP_SIZE):
+    """
+    Analyze an open soundfile.SoundFile block by block, so memory stays bounded for any length.
+    - sound_file.blocks() reads block_frames hops of new audio at a time. Each block repeats the
+      last win_s - hop_s samples of the previous one (overlap), so windows that straddle a block
+      boundary are still complete and no pitch frame is lost or duplicated.
+    - The first block is zero-padded on the left, exactly like frame_signal, so the frames (and notes)
+      match segment_notes(pitch_track(frame_signal(samples))) on the same audio.
+    - Only the first channel is analyzed.
+    Yields (notes, pitches, fraction_done) after each block, where notes are the (note_label, duration)
+    tuples that ended in that block and pitches is the block's pitch track. The last note is yielded
+    once the file is done.
+    """
+    sr = sound_file.samplerate
+    overlap = win_s - hop_s
+    n_frames = max((sound_file.frames - hop_s) // hop_s, 0)
+    segmenter = {}
+    done = 0
+    blocks = sound_file.blocks(blocksize=overlap + block_frames * hop_s, overlap=overlap, dtype='float32', always_2d=True)
+    for index, block in enumerate(blocks):
+        samples = block[:, 0]
+        if index == 0:
+            samples = np.concatenate((np.zeros(overlap, dtype=np.float32), samples))
+        if len(samples) < win_s or done >= n_frames:
+            continue
+        frames = np.lib.stride_tricks.sliding_window_view(samples, win_s)[::hop_s][:n_frames - done]
+        pitches = pitch_track(frames, sr)
+        notes = split_notes(pitches, sr, segmenter, first_frame=done)
+        done += len(frames)
+        yield notes, pitches, done / n_frames
+    yield finish_notes(segmenter, sound_file.frames / sr), np.zeros(0, dtype=np.float32), 1.0
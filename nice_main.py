@@ -12,6 +12,7 @@ launching tools, and rendering tool-specific UI elements based on the tool's typ
 """
 import os
 import subprocess
+import tempfile
 from pathlib import Path
 
 # Try/catch for robustness
@@ -92,6 +93,38 @@ def read_readme(path: Path):
     return (heading, purpose)
 
 
+def load_tool_module(path: Path):
+    """
+    Imports a tool script as a module, so the dashboard can call its functions directly.
+    """
+    spec = spec_from_file_location(path.stem, path)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def show_file_preview(container, title, preview, converter):
+    """
+    Renders a converter preview (first records, column types, row count) as a table.
+    Nested JSON records are flattened to dotted columns for display.
+    """
+    container.clear()
+    with container:
+        if preview is None:
+            ui.label(f"{title}: could not read the file").classes("text-sm text-red-400")
+            return
+        rows = f"{preview['rows']:,}" if preview['rows'] is not None else "?"
+        estimate = "" if preview['exact'] else " (estimated)"
+        ui.label(f"{title}: {Path(preview['path']).name}, {rows} rows{estimate}, "
+                 f"{len(preview['columns'])} columns").classes("text-sm")
+        records = [converter.flatten_record(record) for record in preview['records']]
+        names = list(dict.fromkeys(name for record in records for name in record)) or preview['columns']
+        columns = [{'name': name, 'label': f"{name} ({preview['types'].get(name, '?')})", 'field': name,
+                    'align': 'left'} for name in names]
+        ui.table(columns=columns, rows=[{name: str(record.get(name, '')) for name in names} for record in records]
+                 ).classes("w-full text-xs")
+
+
 def launch_tool(path: Path):
     try:
         subprocess.Popen(['python', str(path)], cwd=path.parent)
@@ -112,11 +145,47 @@ def render_tool(tool_path: Path):
 
         stem = tool_path.stem
         if 'csv_json_converter' in stem:
-            ui.upload(label='Upload File').on_upload(lambda e: print("Uploaded", e.name))
-            ui.select(['CSV to JSON', 'JSON to CSV'], value='CSV to JSON')
-            ui.button('Convert')
-            ui.label('🧾 Input Preview (TBD)').classes("text-sm")
-            ui.label('📄 Output Preview (TBD)').classes("text-sm")
+            converter = load_tool_module(tool_path)
+            # Holds the latest upload and its TemporaryDirectory. A new upload replaces the directory,
+            # and the last one is removed when this panel is re-rendered (the closures holding it are
+            # dropped) or at exit, so reruns never leave copies of uploads behind.
+            uploaded = {}
+
+            # Previews read only the head of the file, so large uploads show up instantly
+            def handle_upload(e):
+                if 'dir' in uploaded:
+                    uploaded['dir'].cleanup()
+                uploaded['dir'] = tempfile.TemporaryDirectory(prefix='csv_json_dashboard_')
+                path = Path(uploaded['dir'].name) / Path(e.name).name
+                path.write_bytes(e.content.read())
+                uploaded['path'] = path
+                direction.value = 'JSON to CSV' if converter.file_format(path) in ('json', 'jsonl') else 'CSV to JSON'
+                show_file_preview(input_preview, '🧾 Input Preview', converter.preview_file(path), converter)
+
+            def convert():
+                source = uploaded.get('path')
+                if source is None:
+                    ui.notify('Upload a file first')
+                    return
+                base = converter.strip_compression_suffix(source)
+                if direction.value == 'CSV to JSON':
+                    target = base.with_suffix('.json')
+                    converter.csv_to_json(str(source), str(target))
+                else:
+                    target = base.with_suffix('.csv')
+                    converter.json_to_csv(str(source), str(target))
+                show_file_preview(output_preview, '📄 Output Preview',
+                                  converter.preview_file(target) if target.exists() else None, converter)
+
+            ui.upload(label='Upload File', auto_upload=True).on_upload(handle_upload)
+            direction = ui.select(['CSV to JSON', 'JSON to CSV'], value='CSV to JSON')
+            ui.button('Convert', on_click=convert)
+            input_preview = ui.column().classes("w-full")
+            with input_preview:
+                ui.label('🧾 Input Preview: upload a file to see its columns and first rows').classes("text-sm")
+            output_preview = ui.column().classes("w-full")
+            with output_preview:
+                ui.label('📄 Output Preview: convert to see the result').classes("text-sm")
 
         elif 'simple_scraper' in stem:
             url_input = ui.input("Enter URL to scrape")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+parser_benchmark.py
+
+Times the portfolio parsers on large profile/trending pages to check that they scale linearly.
+
+Each page is built by repeating a block of items (a synthetic card by default, or the <body> of a
+saved page passed with --page) so the item count grows while the markup per item stays the same.
+With linear parsers the time per item stays flat as the page grows; a quadratic parser would make
+it grow in step with the page size.
+
+Usage:
+    python parser_benchmark.py
+    python parser_benchmark.py --sizes 500 1000 2000 4000
+    python parser_benchmark.py --page saved_trending.html --parser trending-github
+"""
+
+import argparse
+import re
+import time
+
+from portfolio_generator_tool import parse_behance, parse_github, parse_trending
+
+SYNTHETIC_ITEMS = {
+    'github': (
+        '<li><div><a itemprop="name codeRepository" href="/octo/repo{i}">repo{i}</a>'
+        '<p itemprop="description">Repository number {i}</p><span>Python</span></div></li>'
+    ),
+    'behance': (
+        '<div class="ProjectCoverNeue-details-LLY"><div class="ProjectCoverNeue-info-paj">'
+        '<span><a href="/gallery/{i}/project">Project {i}</a></span></div>'
+        '<div class="Stats-stats-Q1s"><span>{i}</span><span>{i}</span></div></div>'
+    ),
+    'trending-github': (
+        '<article><h2><a data-hydro-click="REPOSITORY_CLICK" href="/octo/repo{i}">octo / repo{i}</a></h2>'
+        '<p>Trending repository number {i}</p></article>'
+    ),
+}
+
+PARSERS = {
+    'github': parse_github,
+    'behance': parse_behance,
+    'trending-github': lambda html: parse_trending('github', html),
+}
+
+
+def build_page(block, repeats):
+    body = ''.join(block.replace('{i}', str(i)) for i in range(repeats))
+    return f'<html><body>{body}</body></html>'
+
+
+def saved_page_block(path):
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+    match = re.search(r'<body[^>]*>(.*)</body>', html, re.S | re.I)
+    return match.group(1) if match else html
+
+
+def run(parser_name, block, sizes, rounds):
+    parse = PARSERS[parser_name]
+    print(f"Parser: {parser_name}")
+    print(f"{'repeats':>8} {'items':>8} {'seconds':>9} {'µs/item':>9}")
+    per_item = []
+    for repeats in sizes:
+        html = build_page(block, repeats)
+        best = float('inf')
+        for _ in range(rounds):
+            start = time.perf_counter()
+            items = parse(html)
+            best = min(best, time.perf_counter() - start)
+        cost = best / max(len(items), 1) * 1e6
+        per_item.append(cost)
+        print(f"{repeats:>8} {len(items):>8} {best:>9.3f} {cost:>9.1f}")
+    growth = per_item[-1] / per_item[0] if per_item[0] else float('nan')
+    size_growth = sizes[-1] / sizes[0]
+    print(f"Per-item cost grew {growth:.2f}x while the page grew {size_growth:.0f}x "
+          f"({'linear' if growth < size_growth ** 0.5 else 'super-linear'})\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark portfolio parser scaling.")
+    parser.add_argument('--parser', choices=sorted(PARSERS), nargs='*', help='Parsers to run (default: all)')
+    parser.add_argument('--page', help='Saved HTML page whose <body> is repeated instead of the synthetic card')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[250, 500, 1000, 2000], help='Repeat counts to time')
+    parser.add_argument('--rounds', type=int, default=3, help='Timing rounds per size (best is reported)')
+    args = parser.parse_args()
+
+    names = args.parser or sorted(PARSERS)
+    for name in names:
+        block = saved_page_block(args.page) if args.page else SYNTHETIC_ITEMS[name]
+        run(name, block, sorted(args.sizes), args.rounds)
+
+
+if __name__ == '__main__':
+    main()
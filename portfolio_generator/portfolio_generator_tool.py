@@ -6,28 +6,108 @@ A CLI tool to generate a personal project portfolio page or JSON data by scrapin
 Features:
 - Accepts multiple profile URLs
 - Supports GitHub, Behance, and Dribbble
-- Outputs Markdown or JSON format
+- Outputs Markdown, JSON, JSONL or HTML (several at once), streamed as profiles are parsed
+- Fetches all profiles concurrently over a shared, pooled HTTP session
+- Walks every page of a GitHub user's repositories and caches them locally with ETag revalidation
+- Records every trending fetch in an append-only SQLite snapshot store for diffs and rank history
 - Ideal for freelancers showcasing their work
 """
 # TODO: ouput to output directory and add platform, and timestamp to filename
 
 import argparse
+import html
 import json
+import os
 import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from bs4 import BeautifulSoup
 import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_WORKERS = 8  # Concurrent profile fetches
+# Per-profile page cache (ETag/Last-Modified + parsed entries), reused across runs
+CACHE_DIR = Path(__file__).resolve().parent.parent / "cache" / "portfolio_generator"
+# Append-only history of every trending list fetched
+SNAPSHOT_DB = CACHE_DIR / "trending.sqlite3"
 
 # --- Helpers ---
 
-def fetch_html(url):
+# One pooled session shared by every fetch so connections (and TLS handshakes)
+# to the same host are reused instead of being reopened for each URL.
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+def get_session(pool_size=DEFAULT_WORKERS):
+    """
+    Returns the shared session, with room for at least `pool_size` open connections per host.
+    A caller that needs more connections than earlier ones gets a larger pool mounted.
+    """
+    global _session, _session_pool_size
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        if pool_size > _session_pool_size:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _session_pool_size = pool_size
+        return _session
+
+def fetch_page(url, session=None, validators=None):
+    """
+    Conditional GET for a single page.
+    `validators` is a dict with the 'etag'/'last_modified' values from a previous fetch.
+    Returns (status, html, validators); status is 304 when the cached copy is still fresh
+    and None when the request failed.
+    """
+    session = session or get_session()
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
     try:
-        response = requests.get(url, timeout=10)
+        response = session.get(url, headers=headers, timeout=10)
+        if response.status_code == 304:
+            return 304, None, validators
         response.raise_for_status()
-        return response.text
+        return response.status_code, response.text, {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
     except Exception as e:
         print(f"[!] Error fetching {url}: {e}")
-        return None
+        return None, None, None
+
+def fetch_html(url, session=None):
+    return fetch_page(url, session)[1]
+
+def pair_in_document_order(soup, title_selector, detail_selector):
+    """
+    Pairs each title element with the first detail element that follows it,
+    before the next title (None if the item has no detail).
+    Both selectors are matched in a single ordered traversal of the document,
+    so the cost is linear in the page size instead of one forward scan
+    (`find_next`) per item.
+    """
+    titles = {id(el) for el in soup.select(title_selector)}
+    pending = None
+    for el in soup.select(f"{title_selector}, {detail_selector}"):  # Results come back in document order
+        if id(el) in titles:
+            if pending is not None:
+                yield pending, None
+            pending = el
+        elif pending is not None:
+            yield pending, el
+            pending = None
+    if pending is not None:
+        yield pending, None
 
 def parse_github(html):
     soup = BeautifulSoup(html, 'html.parser')
@@ -36,28 +116,38 @@ def parse_github(html):
     # scrape selectors as of 06/10/2025
     primary_title_selector = "a:has(span.repo), a[itemprop$='codeRepository']"
     secondary_title_selector = "span.repo"
+    description_selector = "p.pinned-item-desc, p[itemprop$='description']"
     
-    
-    for repo in soup.select(primary_title_selector):
+    for repo, description in pair_in_document_order(soup, primary_title_selector, description_selector):
         name = repo.select_one(secondary_title_selector)
         if not name:
             name = repo.text.strip()
         else:
             name = name.text.strip()
         href = repo['href']
-        # Check for description using both selectors
-        description = repo.find_next('p', class_='pinned-item-desc') or repo.find_next('p[itemprop$="description"]')
         description_text = description.text.strip() if description else "No description provided"
         repos.append({"title": name, "url": f"https://github.com{href}", "description": description_text})
     return  repos
 
+def parse_github_total_pages(html):
+    """
+    Reads the number of repository pages from GitHub's pagination widget.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    current = soup.select_one('[data-total-pages]')
+    if current:
+        return int(current['data-total-pages'])
+    pages = [int(m.group(1)) for a in soup.select('div.pagination a[href]')
+             for m in [re.search(r'[?&]page=(\d+)', a['href'])] if m]
+    return max(pages, default=1)
+
 def parse_behance(html):
     soup = BeautifulSoup(html, 'html.parser')
     projects = []
-    for a in soup.select('div.ProjectCoverNeue-details-LLY > div.ProjectCoverNeue-info-paj > span > a'):
+    title_selector = 'div.ProjectCoverNeue-details-LLY > div.ProjectCoverNeue-info-paj > span > a'
+    for a, stats in pair_in_document_order(soup, title_selector, 'div.Stats-stats-Q1s'):
         title = a.text.strip()
         href = a['href']
-        stats = a.find_next('div', class_='Stats-stats-Q1s')
         if stats:
             spans = stats.find_all('span')
             likes = spans[0].text.strip() if len(spans) > 0 else "0"
@@ -87,188 +177,528 @@ def detect_platform(url):
         return 'dribbble'
     return None
 
-def fetch_trending_entries(platform):
-    config = {
-        'github': {
-            'url': "https://github.com/trending",
-            # scrape selectors as of 06/10/2025
-            'title_selector': "h2 a[data-hydro-click*='REPOSITORY']",
-            'description_selector': 'p',
-            'base_url': "https://github.com"
-        },
-        'behance': {
-            'url': "https://www.behance.net/",  # Example URL for trending Behance projects
-            'title_selector': 'div.ProjectCoverNeue-details-LLY > div.ProjectCoverNeue-info-paj > span > a',
-            'description_selector': 'div.Stats-stats-Q1s',
-            'base_url': "https://behance.net"
-        },
-        'dribbble': {
-            'url': "https://dribbble.com/shots/popular",  # Example URL for trending Dribbble shots
-            'title_selector': 'a[data-testid="shot-thumbnail-link"]',
-            'description_selector': None,  # Dribbble might not have a description selector
-            'base_url': "https://dribbble.com"
-        }
+TRENDING_CONFIG = {
+    'github': {
+        'url': "https://github.com/trending",
+        # scrape selectors as of 06/10/2025
+        'title_selector': "h2 a[data-hydro-click*='REPOSITORY']",
+        'description_selector': 'p',
+        'base_url': "https://github.com"
+    },
+    'behance': {
+        'url': "https://www.behance.net/",  # Example URL for trending Behance projects
+        'title_selector': 'div.ProjectCoverNeue-details-LLY > div.ProjectCoverNeue-info-paj > span > a',
+        'description_selector': 'div.Stats-stats-Q1s',
+        'base_url': "https://behance.net"
+    },
+    'dribbble': {
+        'url': "https://dribbble.com/shots/popular",  # Example URL for trending Dribbble shots
+        'title_selector': 'a[data-testid="shot-thumbnail-link"]',
+        'description_selector': None,  # Dribbble might not have a description selector
+        'base_url': "https://dribbble.com"
     }
+}
 
-    if platform not in config:
-        print(f"[!] Unsupported platform: {platform}")
-        return []
-
-    platform_config = config[platform]
-    html = fetch_html(platform_config['url'])
-    if not html:
-        print(f"[!] Failed to fetch trending entries for {platform}.")
-        return []
-
+def parse_trending(platform, html):
+    platform_config = TRENDING_CONFIG[platform]
     soup = BeautifulSoup(html, 'html.parser')
     entries = []
-    for item in soup.select(platform_config['title_selector']):
+    if platform_config['description_selector']:
+        items = pair_in_document_order(soup, platform_config['title_selector'], platform_config['description_selector'])
+    else:
+        items = ((item, None) for item in soup.select(platform_config['title_selector']))
+    for item, description_element in items:
         if platform == 'github':
             name = item.text.strip() 
-            title = name.split("/")[0] if '/' in name else title  # Get the first part before '/' eg. user/project
+            title = name.split("/")[0] if '/' in name else name  # Get the first part before '/' eg. user/project
         else:
             title = item.text.strip()
         href = item['href']
-        description = "No description provided"
-        if platform_config['description_selector']:
-            description_element = item.find_next(platform_config['description_selector'])
-            description = description_element.text.strip() if description_element else description
+        description = description_element.text.strip() if description_element else "No description provided"
         entries.append({"title": title, "url": f"{platform_config['base_url']}{href}", "description": description})
     return entries
 
-# --- Main Logic ---
+def fetch_trending_entries(platform):
+    if platform not in TRENDING_CONFIG:
+        print(f"[!] Unsupported platform: {platform}")
+        return []
 
-def generate_portfolio(urls, output_path, fmt):
-    collected = []
-    for url in urls:
-        html = fetch_html(url)
-        if not html:
-            continue
+    html = fetch_html(TRENDING_CONFIG[platform]['url'])
+    if not html:
+        print(f"[!] Failed to fetch trending entries for {platform}.")
+        return []
 
-        platform = detect_platform(url)  # Infer platform from the URL
-        if platform == 'github':
-            # Extract the GitHub username from the URL
-            username = url.split('github.com/')[-1].split('/')[0]
-            print(f"[+] GitHub Username: {username}")
-            entries = parse_github(html)
-        elif platform == 'behance':
-            # Extract the Behance username from the URL
-            username = url.split('behance.net/')[-1].split('/')[0]
-            print(f"[+] Behance Username: {username}")
-            entries = parse_behance(html)
-        elif platform == 'dribbble':
-            # Extract the Dribbble username from the URL
-            username = url.split('dribbble.com/')[-1].split('/')[0]
-            print(f"[+] Dribbble Username: {username}")
-            entries = parse_dribbble(html)
+    return parse_trending(platform, html)
+
+# --- Trending Snapshot Store ---
+
+SNAPSHOT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    platform TEXT NOT NULL,
+    taken_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    rank INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    description TEXT,
+    PRIMARY KEY (snapshot_id, rank)
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_platform_time ON snapshots(platform, taken_at);
+CREATE INDEX IF NOT EXISTS idx_entries_url ON entries(url, snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_entries_title ON entries(title, snapshot_id);
+"""
+
+def open_snapshot_store(db_path=SNAPSHOT_DB):
+    """
+    Opens (and creates if needed) the trending snapshot database.
+    Pass ':memory:' for a throwaway store.
+    """
+    if str(db_path) != ':memory:':
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SNAPSHOT_SCHEMA)
+    return conn
+
+def record_trending_snapshot(conn, platform, entries, taken_at=None):
+    """
+    Appends one timestamped trending list. Ranks start at 1 in the order scraped.
+    Returns the new snapshot id.
+    """
+    taken_at = taken_at or datetime.now(timezone.utc)
+    with conn:
+        cursor = conn.execute("INSERT INTO snapshots (platform, taken_at) VALUES (?, ?)",
+                              (platform, taken_at.isoformat(timespec='seconds')))
+        snapshot_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO entries (snapshot_id, rank, title, url, description) VALUES (?, ?, ?, ?, ?)",
+            [(snapshot_id, rank, e['title'], e['url'], e.get('description')) for rank, e in enumerate(entries, 1)],
+        )
+    return snapshot_id
+
+def latest_snapshot_ids(conn, platform, count=2):
+    rows = conn.execute(
+        "SELECT id FROM snapshots WHERE platform = ? ORDER BY taken_at DESC, id DESC LIMIT ?",
+        (platform, count),
+    ).fetchall()
+    return [row['id'] for row in rows]
+
+def trending_diff(conn, platform):
+    """
+    Compares the two most recent snapshots of a platform.
+    Returns {'new': [...], 'dropped': [...]} as lists of entry dicts (with rank).
+    """
+    ids = latest_snapshot_ids(conn, platform)
+    if not ids:
+        return {'new': [], 'dropped': []}
+    latest, previous = ids[0], ids[1] if len(ids) > 1 else None
+    query = """
+        SELECT rank, title, url, description FROM entries
+        WHERE snapshot_id = ? AND url NOT IN (SELECT url FROM entries WHERE snapshot_id = ?)
+        ORDER BY rank
+    """
+    new = [dict(row) for row in conn.execute(query, (latest, previous))]
+    dropped = [dict(row) for row in conn.execute(query, (previous, latest))] if previous else []
+    return {'new': new, 'dropped': dropped}
+
+def trending_rank_history(conn, platform, key, days=7):
+    """
+    Rank of one entry in every snapshot from the last `days` days.
+    `key` is matched against the entry URL, the URL path (e.g. 'owner/repo') or the title.
+    Returns a list of (taken_at, rank) with rank None for snapshots the entry was missing from.
+    Each snapshot gives one rank: a URL match wins over title matches, and when several
+    entries share the title the best rank is used.
+    """
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat(timespec='seconds')
+    full_url = f"{TRENDING_CONFIG[platform]['base_url']}/{key.strip('/')}" if platform in TRENDING_CONFIG else key
+    rows = conn.execute(
+        """
+        SELECT s.taken_at, COALESCE(MIN(CASE WHEN e.url IN (?, ?) THEN e.rank END), MIN(e.rank)) AS rank
+        FROM snapshots s
+        LEFT JOIN entries e ON e.snapshot_id = s.id AND (e.url IN (?, ?) OR e.title = ?)
+        WHERE s.platform = ? AND s.taken_at >= ?
+        GROUP BY s.id
+        ORDER BY s.taken_at, s.id
+        """,
+        (key, full_url, key, full_url, key, platform, since),
+    ).fetchall()
+    return [(row['taken_at'], row['rank']) for row in rows]
+
+# --- GitHub Repository Harvesting ---
+
+def github_repos_url(username, page):
+    return f"https://github.com/{username}?tab=repositories&page={page}"
+
+def load_profile_cache(cache_path):
+    if cache_path is None or not cache_path.exists():
+        return {}
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[!] Ignoring unreadable cache {cache_path}: {e}")
+        return {}
+
+def save_profile_cache(cache_path, cache):
+    if cache_path is None:
+        return
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    tmp_path.replace(cache_path)  # Atomic swap so an interrupted run never corrupts the cache
+
+def harvest_github_repos(username, session=None, cache_dir=CACHE_DIR, workers=DEFAULT_WORKERS):
+    """
+    Collects every repository on a GitHub user's repositories tab.
+    Page 1 is fetched first to learn the page count, then the remaining pages are
+    fetched concurrently. Each page is revalidated against the local cache with its
+    ETag/Last-Modified, so unchanged pages cost a 304 and are never re-parsed.
+    Returns the list of entries, or None if nothing could be fetched or recovered from cache.
+    """
+    session = session or get_session(workers)
+    cache_path = cache_dir / 'github' / f"{username}.json" if cache_dir else None
+    cache = load_profile_cache(cache_path)
+    cached_pages = cache.get('pages', {})
+
+    # Runs in worker threads: returns (page data, html, status) and leaves the counting to the caller
+    def refresh(page):
+        cached = cached_pages.get(str(page))
+        status, html, validators = fetch_page(github_repos_url(username, page), session,
+                                              cached['validators'] if cached else None)
+        if html is None:
+            return cached, None, status  # 304, or fall back to the (possibly stale) cached page on errors
+        return {'validators': validators, 'entries': parse_github(html)}, html, status
+
+    first, first_html, status = refresh(1)
+    if first is None:
+        return None
+    statuses = [status]
+    total_pages = parse_github_total_pages(first_html) if first_html else cache.get('total_pages', 1)
+    pages = {1: first}
+    if total_pages > 1:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, total_pages - 1))) as pool:
+            futures = {pool.submit(refresh, page): page for page in range(2, total_pages + 1)}
+            for future in as_completed(futures):
+                pages[futures[future]], _, status = future.result()
+                statuses.append(status)
+
+    repos = []
+    seen = set()
+    for page in sorted(pages):
+        for entry in (pages[page] or {}).get('entries', []):
+            # A repo can slide across a page boundary between requests; keep the first copy
+            if entry['url'] not in seen:
+                seen.add(entry['url'])
+                repos.append(entry)
+    save_profile_cache(cache_path, {
+        'total_pages': total_pages,
+        'pages': {str(page): data for page, data in pages.items() if data},
+    })
+    print(f"[+] GitHub {username}: {len(repos)} repos across {total_pages} page(s) "
+          f"({sum(status not in (None, 304) for status in statuses)} fetched, {statuses.count(304)} unchanged)")
+    return repos
+
+# --- Output Renderers ---
+
+# Templates per format: 'header' and 'footer' are written once, 'row' once per entry.
+# Rows are formatted through a pre-bound `str.format`, so no template is re-parsed per entry.
+TEMPLATES = {
+    'md': {
+        'header': "# {heading}\n\n{byline}| Name | Description |\n|------|-------------|\n",
+        'byline': "__by {username}__\n\n",
+        'row': "| [{title}]({url}) | {description} |\n",
+        'footer': "",
+    },
+    'html': {
+        'header': ("<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"><title>{heading}</title></head>\n"
+                   "<body>\n<h1>{heading}</h1>\n{byline}<table>\n<tr><th>Name</th><th>Description</th></tr>\n"),
+        'byline': "<p>by <strong>{username}</strong></p>\n",
+        'row': "<tr><td><a href=\"{url}\">{title}</a></td><td>{description}</td></tr>\n",
+        'footer': "</table>\n</body>\n</html>\n",
+    },
+}
+OUTPUT_FORMATS = {'.md': 'md', '.json': 'json', '.jsonl': 'jsonl', '.html': 'html'}
+
+class StreamingRenderer:
+    """
+    Writes portfolio entries to one output file as they arrive.
+    The format comes from the file extension (.md, .json, .jsonl, .html) unless given.
+    Only the current entry is held in memory, whatever the size of the portfolio.
+    """
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.fmt = fmt or OUTPUT_FORMATS.get(Path(path).suffix.lower(), 'md')
+        self.count = 0
+        self._file = None
+        template = TEMPLATES.get(self.fmt)
+        if template:
+            self._row = template['row'].format
+            self._escape = html.escape if self.fmt == 'html' else str
+
+    def begin(self, heading, username=None):
+        self._file = open(self.path, 'w', encoding='utf-8')  # Overwrite the file by default
+        if self.fmt == 'json':
+            self._file.write("[")
+        elif self.fmt in TEMPLATES:
+            template = TEMPLATES[self.fmt]
+            byline = template['byline'].format(username=self._escape(username)) if username else ""
+            self._file.write(template['header'].format(heading=self._escape(heading), byline=byline))
+
+    def write(self, entry):
+        if self.fmt == 'json':
+            self._file.write(("\n  " if self.count == 0 else ",\n  ") + json.dumps(entry))
+        elif self.fmt == 'jsonl':
+            self._file.write(json.dumps(entry) + "\n")
         else:
-            print(f"[!] Unsupported platform for URL: {url}")
-            continue
+            escape = self._escape
+            self._file.write(self._row(title=escape(entry['title']), url=escape(entry['url']),
+                                       description=escape(entry.get('description', 'No description provided'))))
+        self.count += 1
 
-        collected.extend(entries)
+    def close(self):
+        if self._file is None:
+            return
+        if self.fmt == 'json':
+            self._file.write("\n]\n" if self.count else "]\n")
+        elif self.fmt in TEMPLATES:
+            self._file.write(TEMPLATES[self.fmt]['footer'])
+        self._file.close()
+        self._file = None
+        print(f"[+] {self.count} entries saved to {self.path}")
+
+def render_entries(entries, output_paths, heading, username=None):
+    """
+    Streams an iterable of entries into every output file in a single pass.
+    """
+    renderers = [StreamingRenderer(path) for path in output_paths]
+    try:
+        for renderer in renderers:
+            renderer.begin(heading, username)
+        for entry in entries:
+            for renderer in renderers:
+                renderer.write(entry)
+    finally:
+        for renderer in renderers:
+            renderer.close()
 
-    if fmt == 'json':
-        with open(output_path, 'w') as f:  # Overwrite the file by default
-            json.dump(collected, f, indent=2)
-        print(f"[+] Portfolio data saved to {output_path}")
+# --- Main Logic ---
+
+def parse_profile(url, html):
+    """
+    Runs the platform parser matching the URL.
+    Returns (platform, username, entries), or None for unsupported URLs.
+    """
+    platform = detect_platform(url)  # Infer platform from the URL
+    if platform == 'github':
+        # Extract the GitHub username from the URL
+        username = url.split('github.com/')[-1].split('/')[0]
+        print(f"[+] GitHub Username: {username}")
+        entries = parse_github(html)
+    elif platform == 'behance':
+        # Extract the Behance username from the URL
+        username = url.split('behance.net/')[-1].split('/')[0]
+        print(f"[+] Behance Username: {username}")
+        entries = parse_behance(html)
+    elif platform == 'dribbble':
+        # Extract the Dribbble username from the URL
+        username = url.split('dribbble.com/')[-1].split('/')[0]
+        print(f"[+] Dribbble Username: {username}")
+        entries = parse_dribbble(html)
     else:
-        with open(output_path, 'w') as f:  # Overwrite the file by default
-            f.write(f"# {platform.capitalize()} Portfolio\n\n")
-            f.write(f"__by {username}__\n\n")
-            f.write("| Name | Description |\n")
-            f.write("|------|-------------|\n")
-            for entry in collected:
-                f.write(f"| [{entry['title']}]({entry['url']}) | {entry.get('description', 'No description provided')} |\n")
-        print(f"[+] Portfolio markdown saved to {output_path}")
+        print(f"[!] Unsupported platform for URL: {url}")
+        return None
+    return platform, username, entries
+
+def github_profile_username(url):
+    """
+    Returns the username if the URL points at a GitHub profile (not a specific repo).
+    """
+    if detect_platform(url) != 'github':
+        return None
+    path = url.split('github.com/')[-1].split('?')[0].strip('/')
+    return path if path and '/' not in path else None
+
+def fetch_and_parse(url, session, cache_dir=CACHE_DIR, workers=DEFAULT_WORKERS):
+    username = github_profile_username(url)
+    if username:
+        # Profiles get the full, paginated repository list instead of the pinned overview
+        print(f"[+] GitHub Username: {username}")
+        repos = harvest_github_repos(username, session, cache_dir, workers)
+        return ('github', username, repos) if repos is not None else None
+    html = fetch_html(url, session)
+    if not html:
+        return None
+    return parse_profile(url, html)
+
+def iter_profiles(urls, workers=DEFAULT_WORKERS, cache_dir=CACHE_DIR):
+    """
+    Fetches and parses every profile URL concurrently.
+    Each page is parsed as soon as its download finishes, and results are yielded
+    in the same order as `urls` (None for failed/unsupported URLs) as soon as all
+    earlier URLs are done. Only out-of-order results are held back.
+    """
+    # Each profile worker can run its own pool of `workers` page fetches (GitHub pagination),
+    # so the session needs room for workers * workers connections to one host
+    session = get_session(max(1, workers) ** 2)
+    pending = {}
+    next_index = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(fetch_and_parse, url, session, cache_dir, workers): i
+                   for i, url in enumerate(urls)}
+        for future in as_completed(futures):
+            pending[futures.pop(future)] = future.result()
+            while next_index in pending:
+                yield pending.pop(next_index)
+                next_index += 1
+
+def generate_portfolio(urls, output_paths, fmt=None, workers=DEFAULT_WORKERS, cache_dir=CACHE_DIR):
+    """
+    Builds the portfolio and streams it into one or more output files.
+    `output_paths` is a path or a list of paths; each file's format comes from its
+    extension (`fmt` overrides it for a single path). The heading uses the first
+    profile that could be fetched.
+    """
+    if isinstance(output_paths, (str, Path)):
+        output_paths = [output_paths]
+    renderers = [StreamingRenderer(path, fmt if len(output_paths) == 1 else None) for path in output_paths]
+    started = False
+    try:
+        for result in iter_profiles(urls, workers, cache_dir):
+            if result is None:
+                continue
+            platform, username, entries = result
+            if not started:
+                for renderer in renderers:
+                    renderer.begin(f"{platform.capitalize()} Portfolio", username)
+                started = True
+            for entry in entries:
+                for renderer in renderers:
+                    renderer.write(entry)
+        if not started:
+            print("[!] No profiles could be fetched; writing an empty portfolio.")
+            for renderer in renderers:
+                renderer.begin("Portfolio")
+    finally:
+        for renderer in renderers:
+            renderer.close()
 
 # --- Entry Point ---
 
-def main():
-    parser = argparse.ArgumentParser(description="Generate a portfolio from profile links.")
-    parser.add_argument('urls', nargs='*', help='List of GitHub/Behance/Dribbble URLs')
-    parser.add_argument('--output', '-o', default='portfolio.md', help='Output file name')
-    parser.add_argument('--format', '-f', choices=['md', 'json'], default='md', help='Output format')
-    parser.add_argument('--platform', '-p', choices=['github', 'behance', 'dribbble'], default='github', help='Platform to use if no URLs are provided (default: github)')
-    args = parser.parse_args()
-    # TODO: Add more platforms like LinkedIn, Twitter, etc. in the 
-    # TODO: Add trending options for each platform
-    
+def validate_output_path(output, fmt=None):
+    """
+    Checks that an output path can be written as a regular file in a supported format.
+    Creates the parent directory if needed.
+    """
     # Validate output file extension
-    if not args.output.endswith(('.md', '.json')):
-        print("[!] Output file must have a .md or .json extension.")
-        return
+    if not output.endswith(tuple(OUTPUT_FORMATS)):
+        print("[!] Output file must have a .md, .json, .jsonl or .html extension.")
+        return False
     # Ensure the output directory exists
-    output_dir = Path(args.output).parent
+    output_dir = Path(output).parent
     if not output_dir.exists():
         output_dir.mkdir(parents=True, exist_ok=True)
         print(f"[+] Created output directory: {output_dir}")
     else:
         print(f"[+] Output directory already exists: {output_dir}")
     # Ensure the output file is writable
-    output_file = Path(args.output)
+    output_file = Path(output)
     if output_file.exists() and not output_file.is_file():
-        print(f"[!] Output path {args.output} is not a file.")
-        return
-    if output_file.exists() and not output_file.is_writable():
-        print(f"[!] Output file {args.output} is not writable.")
-        return
-    if args.format == 'json':
-        if not args.output.endswith('.json'):
-            print("[!] Output file must have a .json extension for JSON format.")
-            return
-    elif args.format == 'md':           
-        if not args.output.endswith('.md'):
-            print("[!] Output file must have a .md extension for Markdown format.")
-            return
+        print(f"[!] Output path {output} is not a file.")
+        return False
+    if output_file.exists() and not os.access(output_file, os.W_OK):
+        print(f"[!] Output file {output} is not writable.")
+        return False
+    if fmt and OUTPUT_FORMATS.get(Path(output).suffix.lower()) != fmt:
+        print(f"[!] Output file must have a .{fmt} extension for {fmt.upper()} format.")
+        return False
     # Ensure the output file is not empty
     if output_file.exists() and output_file.stat().st_size == 0:
-        print(f"[!] Output file {args.output} is empty. It will be overwritten.")
+        print(f"[!] Output file {output} is empty. It will be overwritten.")
     else:
-        print(f"[+] Output file {args.output} is ready for writing.")
+        print(f"[+] Output file {output} is ready for writing.")
     # Ensure the output file is not a directory
     if output_file.is_dir():
-        print(f"[!] Output path {args.output} is a directory, not a file.")
-        return
+        print(f"[!] Output path {output} is a directory, not a file.")
+        return False
     # Ensure the output file is not a symlink
     if output_file.is_symlink():
-        print(f"[!] Output path {args.output} is a symlink, not a regular file.")
-        return
+        print(f"[!] Output path {output} is a symlink, not a regular file.")
+        return False
     # Ensure the output file is not a special file
     if output_file.is_socket() or output_file.is_fifo():
-        print(f"[!] Output path {args.output} is a special file (socket or FIFO), not a regular file.")
-        return
+        print(f"[!] Output path {output} is a special file (socket or FIFO), not a regular file.")
+        return False
     # Ensure the output file is not a device file
     if output_file.is_block_device() or output_file.is_char_device():
-        print(f"[!] Output path {args.output} is a device file, not a regular file.")
-        return
-    # Ensure the output file is not a named pipe
-    if output_file.is_named_pipe():
-        print(f"[!] Output path {args.output} is a named pipe, not a regular file.")
-        return
+        print(f"[!] Output path {output} is a device file, not a regular file.")
+        return False
     # Ensure the output file is not a socket
     if output_file.is_socket():
-        print(f"[!] Output path {args.output} is a socket, not a regular file.")
-        return  
+        print(f"[!] Output path {output} is a socket, not a regular file.")
+        return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a portfolio from profile links.")
+    parser.add_argument('urls', nargs='*', help='List of GitHub/Behance/Dribbble URLs')
+    parser.add_argument('--output', '-o', action='append', help='Output file (.md, .json, .jsonl or .html); repeat to write several formats in one pass (default: portfolio.md)')
+    parser.add_argument('--format', '-f', choices=['md', 'json', 'jsonl', 'html'], help='Output format when a single output is given (default: from the extension)')
+    parser.add_argument('--platform', '-p', choices=['github', 'behance', 'dribbble'], default='github', help='Platform to use if no URLs are provided (default: github)')
+    parser.add_argument('--workers', '-w', type=int, default=DEFAULT_WORKERS, help=f'Number of profiles to fetch concurrently (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR), help='Directory for the per-profile page cache')
+    parser.add_argument('--no-cache', action='store_true', help='Always refetch every page and do not write the cache')
+    parser.add_argument('--snapshot-db', default=str(SNAPSHOT_DB), help='SQLite file holding trending snapshots')
+    parser.add_argument('--no-snapshot', action='store_true', help='Do not record this trending fetch in the snapshot store')
+    parser.add_argument('--diff', action='store_true', help='Show entries new/dropped since the previous trending snapshot (no scraping)')
+    parser.add_argument('--rank-history', metavar='ENTRY', help='Show the rank history of a trending entry, e.g. owner/repo (no scraping)')
+    parser.add_argument('--days', type=int, default=7, help='History window for --rank-history (default: 7)')
+    args = parser.parse_args()
+    # TODO: Add more platforms like LinkedIn, Twitter, etc. in the 
+    # TODO: Add trending options for each platform
+
+    # History queries are answered from the snapshot store alone
+    if args.diff or args.rank_history:
+        conn = open_snapshot_store(args.snapshot_db)
+        if args.diff:
+            diff = trending_diff(conn, args.platform)
+            print(f"[+] {args.platform.capitalize()} trending since the previous snapshot:")
+            for entry in diff['new']:
+                print(f"  + #{entry['rank']} {entry['title']} ({entry['url']})")
+            for entry in diff['dropped']:
+                print(f"  - #{entry['rank']} {entry['title']} ({entry['url']})")
+            if not diff['new'] and not diff['dropped']:
+                print("  (no changes)")
+        if args.rank_history:
+            print(f"[+] Rank history for {args.rank_history} over the last {args.days} day(s):")
+            for taken_at, rank in trending_rank_history(conn, args.platform, args.rank_history, args.days):
+                print(f"  {taken_at}  {'#' + str(rank) if rank else 'not trending'}")
+        conn.close()
+        return
     
+    outputs = args.output or [f"portfolio.{args.format or 'md'}"]
+    for output in outputs:
+        if not validate_output_path(output, args.format if len(outputs) == 1 else None):
+            return
+
     # Fetch trending entries if no URLs are provided
     if not args.urls:
         print(f"Fetching trending entries for {args.platform}...")
         trending_entries = fetch_trending_entries(args.platform)
-        if args.format == 'json':
-            with open(args.output, 'w') as f:
-                json.dump(trending_entries, f, indent=2)
-            print(f"[+] Trending entries saved to {args.output}")
-        else:
-            with open(args.output, 'w') as f:
-                f.write(f"# {args.platform.capitalize()} Trending Entries\n\n")
-                f.write("| Name | Description |\n")
-                f.write("|------|-------------|\n")
-                for entry in trending_entries:
-                    f.write(f"| [{entry['title']}]({entry['url']}) | {entry['description']} |\n")
-            print(f"[+] Trending entries markdown saved to ./{args.output}")
+        if trending_entries and not args.no_snapshot:
+            conn = open_snapshot_store(args.snapshot_db)
+            record_trending_snapshot(conn, args.platform, trending_entries)
+            conn.close()
+            print(f"[+] Trending snapshot recorded in {args.snapshot_db}")
+        render_entries(trending_entries, outputs, f"{args.platform.capitalize()} Trending Entries")
         return
 
-    generate_portfolio(args.urls, args.output, args.format)
+    cache_dir = None if args.no_cache else Path(args.cache_dir)
+    generate_portfolio(args.urls, outputs, args.format, args.workers, cache_dir)
 
 if __name__ == '__main__':
     main()